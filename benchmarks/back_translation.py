@@ -0,0 +1,89 @@
+"""
+Compare full-precision and dynamic-int8 MarianMT back-translation on CPU.
+
+A seeded held-out sample of sentences is back-translated with both model
+variants. The script reports load time and throughput for each and
+scores the int8 output against the full-precision output with corpus BLEU.
+The int8 load time is that of a cache hit in load_quantized_model.
+
+Usage:
+    python -m benchmarks.back_translation --ml-en MODEL_DIR --en-ml MODEL_DIR [corpus.jsonl]
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from nltk.translate.bleu_score import SmoothingFunction, corpus_bleu
+from transformers import MarianMTModel
+
+from rchar import extract_sentences
+from scripts.jsonio import iter_records
+from test_folder.b_t import EN_ML_PATH, ML_EN_PATH, BackTranslator, load_quantized_model, preprocess_content
+
+DEFAULT_CORPUS = "test_folder/samplekaggle.jsonl"
+
+
+def held_out_sample(corpus: str, size: int, seed: int) -> List[str]:
+    """Seeded sample of preprocessed, non-empty sentences from a corpus."""
+    sentences = []
+    for record in iter_records(corpus):
+        text = record.get('text') or record.get('content') or ''
+        sentences.extend(s for s in map(preprocess_content, extract_sentences(text)) if s)
+    rng = random.Random(seed)
+    return rng.sample(sentences, min(size, len(sentences)))
+
+
+def load_times(model_path: str) -> Tuple[float, float]:
+    """Seconds to load the full-precision model and the cached int8 model."""
+    start = time.perf_counter()
+    MarianMTModel.from_pretrained(model_path)
+    full_time = time.perf_counter() - start
+    load_quantized_model(model_path)  # Builds the cache if it is missing
+    start = time.perf_counter()
+    load_quantized_model(model_path)
+    return full_time, time.perf_counter() - start
+
+
+def run(translator: BackTranslator, sentences: List[str]) -> Tuple[List[str], float]:
+    start = time.perf_counter()
+    outputs = translator.back_translate_many(sentences)
+    elapsed = time.perf_counter() - start
+    return [output or "" for output in outputs], elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--ml-en", default=ML_EN_PATH)
+    parser.add_argument("--en-ml", default=EN_ML_PATH)
+    parser.add_argument("--sample", type=int, default=200, help="Held-out sentences")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    sentences = held_out_sample(args.corpus, args.sample, args.seed)
+    full_load, int8_load = load_times(args.ml_en)
+    full = BackTranslator(args.ml_en, args.en_ml, batch_size=args.batch_size, num_threads=args.threads)
+    reference, full_time = run(full, sentences)
+    del full
+    int8 = BackTranslator(args.ml_en, args.en_ml, batch_size=args.batch_size, num_threads=args.threads, quantize=True)
+    hypothesis, int8_time = run(int8, sentences)
+
+    bleu = corpus_bleu([[r.split()] for r in reference], [h.split() for h in hypothesis],
+                       smoothing_function=SmoothingFunction().method1)
+    exact = sum(r == h for r, h in zip(reference, hypothesis))
+
+    print(f"Sentences:          {len(sentences)}")
+    print(f"fp32 load:          {full_load:.2f}s")
+    print(f"int8 load (cached): {int8_load:.2f}s")
+    print(f"fp32 throughput:    {len(sentences) / full_time:.2f} sentences/sec ({full_time:.1f}s)")
+    print(f"int8 throughput:    {len(sentences) / int8_time:.2f} sentences/sec ({int8_time:.1f}s)")
+    print(f"Speedup:            {full_time / int8_time:.2f}x")
+    print(f"BLEU int8 vs fp32:  {100 * bleu:.2f}")
+    print(f"Identical outputs:  {exact}/{len(sentences)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Seeded generator of synthetic Malayalam crawl records.
+
+Documents are Malayalam sentences built from a Zipf-distributed vocabulary
+of generated words, with the noise real crawls have mixed in: English
+words, numbers, HTML tags, site boilerplate sentences repeated across
+and within documents, and near-duplicate copies of earlier paragraphs.
+The same seed and settings always produce the same corpus.
+
+Usage:
+    python -m benchmarks.corpus OUTPUT_DIR [--records 1000] [--doc-kb 4] [--files 8]
+"""
+import os
+import json
+import random
+import argparse
+from bisect import bisect
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional
+
+from scripts.executor import batched
+from scripts.jsonio import JsonlWriter
+
+CONSONANTS = [chr(c) for c in range(0x0D15, 0x0D3A) if c != 0x0D29]  # Skip the archaic NNNA
+VOWELS = [chr(c) for c in range(0x0D05, 0x0D15) if c not in (0x0D0D, 0x0D11)]
+VOWEL_SIGNS = ["", "", "ാ", "ി", "ീ", "ു", "ൂ", "െ", "േ", "ൊ", "ോ"]
+VIRAMA = "്"
+COMMON_WORDS = ["ഒരു", "ഈ", "ആ", "എന്ന", "അത്", "ഇത്", "എന്നാൽ", "കൂടി", "വേണ്ടി", "മാത്രം", "ഉണ്ട്", "ആണ്"]
+ENGLISH_WORDS = ["the", "Kerala", "news", "click", "here", "update", "login", "India", "online", "video"]
+HTML_TAGS = ['<p>', '</p>', '<br/>', '<div class="content">', '</div>', '<span>', '</span>', '<a href="/news">', '</a>']
+DOMAINS = ["example-news.in", "malayalam-daily.com", "kerala-portal.gov.in", "puzha-magazine.org", "blog.example.com"]
+SENTENCE_ENDS = [".", ".", ".", "?", "!"]
+
+KB = 1024
+
+
+class CorpusConfig:
+    """
+    Shape of a generated corpus.
+
+    Args:
+        records (int): Documents to generate
+        doc_bytes (int): Approximate UTF-8 size of each document's content
+        vocabulary (int): Distinct generated Malayalam words
+        english_rate (float): Fraction of words replaced by English words
+        number_rate (float): Fraction of words replaced by numbers
+        html_rate (float): Chance of an HTML tag after each sentence
+        boilerplate_rate (float): Chance that a paragraph is a boilerplate sentence
+        near_duplicate_rate (float): Chance that a paragraph repeats an earlier
+            one with a few words changed
+        seed (int): Random seed
+    """
+
+    def __init__(
+        self,
+        records: int = 1000,
+        doc_bytes: int = 4 * KB,
+        vocabulary: int = 5000,
+        english_rate: float = 0.05,
+        number_rate: float = 0.02,
+        html_rate: float = 0.1,
+        boilerplate_rate: float = 0.1,
+        near_duplicate_rate: float = 0.1,
+        seed: int = 13
+    ):
+        self.records = records
+        self.doc_bytes = doc_bytes
+        self.vocabulary = vocabulary
+        self.english_rate = english_rate
+        self.number_rate = number_rate
+        self.html_rate = html_rate
+        self.boilerplate_rate = boilerplate_rate
+        self.near_duplicate_rate = near_duplicate_rate
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class CorpusGenerator:
+    """
+    Generate records for a CorpusConfig. See the module docstring.
+    """
+
+    def __init__(self, config: CorpusConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.words = COMMON_WORDS + [self._word() for _ in range(config.vocabulary)]
+        # Zipf weights: the k-th most common word is drawn with weight 1/k
+        self._cumulative = list(accumulate(1.0 / rank for rank in range(1, len(self.words) + 1)))
+        self.boilerplate = {domain: [self._sentence() for _ in range(5)] for domain in DOMAINS}
+
+    def _word(self) -> str:
+        rng = self.rng
+        syllables = [rng.choice(VOWELS)] if rng.random() < 0.2 else []
+        for _ in range(rng.randint(1, 4)):
+            consonant = rng.choice(CONSONANTS)
+            if rng.random() < 0.15:
+                consonant += VIRAMA + rng.choice(CONSONANTS)
+            syllables.append(consonant + rng.choice(VOWEL_SIGNS))
+        return "".join(syllables)
+
+    def _draw_word(self) -> str:
+        rng = self.rng
+        roll = rng.random()
+        if roll < self.config.english_rate:
+            return rng.choice(ENGLISH_WORDS)
+        if roll < self.config.english_rate + self.config.number_rate:
+            return str(rng.randint(1, 99999))
+        return self.words[bisect(self._cumulative, rng.random() * self._cumulative[-1])]
+
+    def _sentence(self) -> str:
+        words = [self._draw_word() for _ in range(self.rng.randint(6, 18))]
+        return " ".join(words) + self.rng.choice(SENTENCE_ENDS)
+
+    def _paragraph(self) -> str:
+        parts = []
+        for _ in range(self.rng.randint(2, 6)):
+            parts.append(self._sentence())
+            if self.rng.random() < self.config.html_rate:
+                parts.append(self.rng.choice(HTML_TAGS))
+        return " ".join(parts)
+
+    def _near_duplicate(self, paragraph: str) -> str:
+        words = paragraph.split()
+        for _ in range(max(1, len(words) // 20)):
+            i = self.rng.randrange(len(words))
+            words[i] = self._draw_word()
+        return " ".join(words)
+
+    def document(self, domain: str) -> str:
+        config = self.config
+        paragraphs: List[str] = []
+        size = 0
+        while size < config.doc_bytes:
+            roll = self.rng.random()
+            if roll < config.boilerplate_rate:
+                paragraph = self.rng.choice(self.boilerplate[domain])
+            elif paragraphs and roll < config.boilerplate_rate + config.near_duplicate_rate:
+                paragraph = self._near_duplicate(self.rng.choice(paragraphs))
+            else:
+                paragraph = self._paragraph()
+            paragraphs.append(paragraph)
+            size += len(paragraph.encode("utf-8")) + 1
+        return "\n".join(paragraphs)
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.config.records):
+            domain = self.rng.choice(DOMAINS)
+            yield {
+                "url": f"https://{domain}/article/{i}",
+                "timestamp": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:00:00",
+                "content": self.document(domain),
+            }
+
+
+def generate_records(config: Optional[CorpusConfig] = None) -> List[Dict[str, Any]]:
+    """
+    All records of a corpus in memory.
+    """
+    return list(CorpusGenerator(config or CorpusConfig()).records())
+
+
+def write_corpus(output_dir: str, config: CorpusConfig, files: int = 1, layout: str = "jsonl") -> List[str]:
+    """
+    Write a corpus split evenly across `files` files of `layout` ("jsonl" or
+    "json" arrays) and return their paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    per_file = max(1, -(-config.records // max(1, files)))
+    paths = []
+    for number, records in enumerate(batched(CorpusGenerator(config).records(), per_file)):
+        path = os.path.join(output_dir, f"corpus-{number:04d}.{layout}")
+        if layout == "jsonl":
+            with JsonlWriter(path) as writer:
+                for record in records:
+                    writer.write(record)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("output_dir")
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--doc-kb", type=float, default=4, help="Approximate document size in KB")
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--layout", choices=["jsonl", "json"], default="jsonl")
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    config = CorpusConfig(records=args.records, doc_bytes=int(args.doc_kb * KB), seed=args.seed)
+    paths = write_corpus(args.output_dir, config, args.files, args.layout)
+    total = sum(os.path.getsize(path) for path in paths)
+    print(f"Wrote {args.records} records ({total / KB / KB:.1f} MB) to {len(paths)} files in {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
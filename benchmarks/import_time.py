@@ -0,0 +1,113 @@
+"""
+Check the import-time budget of the CLI entry point.
+
+Imports `main` in fresh interpreters under `python -X importtime` and fails
+(exit status 1) if the median cumulative import time is above the budget,
+or if any heavy module that stages load on first use was imported.
+
+Usage:
+    python -m benchmarks.import_time [--budget-ms 150] [--runs 5] [--module main]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = 150
+# Loaded only by the stages and commands that need them
+HEAVY_MODULES = ["numpy", "stopwordsiso", "pkg_resources", "transformers", "torch", "indicnlp", "pandas"]
+
+
+def import_times(module: str) -> List[Tuple[int, str, int]]:
+    """
+    Import `module` in a fresh interpreter and parse `-X importtime`.
+
+    Returns:
+        List[Tuple[int, str, int]]: (depth, module, cumulative microseconds)
+            of every import, in the order they finished (children first)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.rstrip()[1:]
+        times.append(((len(name) - len(name.lstrip())) // 2, name.strip(), int(cumulative_us)))
+    return times
+
+
+def direct_imports(times: List[Tuple[int, str, int]], module: str) -> List[Tuple[int, str]]:
+    """
+    (cumulative microseconds, name) of the imports made directly by top-level `module`.
+    """
+    children: List[Tuple[int, str]] = []
+    for depth, name, cumulative in times:
+        if depth == 0:
+            if name == module:
+                return children
+            children = []
+        elif depth == 1:
+            children.append((cumulative, name))
+    return []
+
+
+def median_import_ms(module: str, runs: int = 5) -> Tuple[float, List[Tuple[int, str, int]]]:
+    """
+    Median cumulative import time of `module` over `runs` fresh interpreters,
+    after one warm-up run that writes .pyc files.
+
+    Returns:
+        Tuple[float, List]: (median milliseconds, import_times of the last run)
+    """
+    import_times(module)
+    timed = [import_times(module) for _ in range(runs)]
+    total_ms = statistics.median(
+        next(cumulative for depth, name, cumulative in times if depth == 0 and name == module) / 1000
+        for times in timed
+    )
+    return total_ms, timed[-1]
+
+
+def budget_failures(total_ms: float, times: List[Tuple[int, str, int]], budget_ms: float) -> List[str]:
+    """
+    Reasons an import run fails the check: over the budget, or a heavy module imported.
+    """
+    failures: List[str] = []
+    if total_ms > budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms is over the {budget_ms:.0f} ms budget")
+    imported = {name for _, name, _ in times}
+    heavy = [module for module in HEAVY_MODULES if module in imported]
+    if heavy:
+        failures.append(f"heavy modules imported eagerly: {', '.join(heavy)}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Maximum median import time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time (after one warm-up)")
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+    args = parser.parse_args()
+
+    total_ms, times = median_import_ms(args.module, args.runs)
+
+    print(f"import {args.module}: {total_ms:.1f} ms median of {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    for cumulative, name in sorted(direct_imports(times, args.module), reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+    failures = budget_failures(total_ms, times, args.budget_ms)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
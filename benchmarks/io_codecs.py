@@ -0,0 +1,91 @@
+"""
+Measure write/read throughput and size of each output codec.
+
+Sample records are repeated up to a target volume and written with every
+combination of layout (pretty JSON array, JSONL, compact JSONL) and
+compression (none, gzip, zstd when installed). Throughput is in MB/s of
+default JSONL data, so rows are comparable. The size ratio is relative
+to the pretty-printed array that the writers used to produce.
+
+Usage:
+    python -m benchmarks.io_codecs [corpus.jsonl] [--mb 32]
+"""
+import os
+import time
+import argparse
+import tempfile
+from itertools import cycle, islice
+from typing import Any, List
+
+from scripts.io_codecs import DEFAULT_CODEC, orjson, with_compression
+from scripts.jsonio import JsonArrayWriter, JsonlWriter, iter_records
+
+DEFAULT_CORPUS = "test_folder/samplekaggle.jsonl"
+MB = 1024 * 1024
+
+
+def sample_records(corpus: str, megabytes: float) -> List[Any]:
+    """Repeat the corpus records until their JSONL size reaches `megabytes`."""
+    base = list(iter_records(corpus))
+    records, size = [], 0
+    for record in islice(cycle(base), 10_000_000):
+        records.append(record)
+        size += len(DEFAULT_CODEC.dumps_line(record))
+        if size >= megabytes * MB:
+            break
+    return records
+
+
+def codecs() -> List[str]:
+    available = [None, "gzip"]
+    try:
+        import zstandard  # noqa: F401
+        available.append("zstd")
+    except ImportError:
+        pass
+    return available
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--mb", type=float, default=32, help="Uncompressed JSONL volume to write")
+    args = parser.parse_args()
+
+    records = sample_records(args.corpus, args.mb)
+    volume = sum(len(DEFAULT_CODEC.dumps_line(record)) for record in records) / MB
+    print(f"{len(records)} records, {volume:.1f} MB as JSONL (orjson: {'yes' if orjson else 'no'})")
+    print(f"{'codec':<24}{'write MB/s':>12}{'read MB/s':>12}{'size MB':>10}{'ratio':>8}")
+
+    layouts = [("array-pretty", ".json", False), ("jsonl", ".jsonl", False), ("jsonl-compact", ".jsonl", True)]
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for compression in codecs():
+            for name, extension, compact in layouts:
+                path = with_compression(os.path.join(tmp, f"bench{extension}"), compression)
+                start = time.perf_counter()
+                if extension == ".json":
+                    writer = JsonArrayWriter(path, indent=2)
+                else:
+                    writer = JsonlWriter(path, compact=compact)
+                with writer:
+                    for record in records:
+                        writer.write(record)
+                write_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                count = sum(1 for _ in iter_records(path))
+                read_time = time.perf_counter() - start
+                assert count == len(records)
+
+                size = os.path.getsize(path)
+                if baseline is None:
+                    baseline = size
+                label = f"{name}+{compression}" if compression else name
+                print(f"{label:<24}{volume / write_time:>12.1f}{volume / read_time:>12.1f}"
+                      f"{size / MB:>10.2f}{baseline / size:>8.2f}")
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
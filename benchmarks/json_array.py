@@ -0,0 +1,92 @@
+"""
+Measure read throughput and peak memory of the top-level JSON array reader.
+
+A pretty-printed array of synthetic records (benchmarks.corpus) is written
+once, then read by each method in a fresh process so that peak RSS is the
+method's own: the streaming parser (buffered and memory-mapped) and
+`json.load` of the whole file.
+
+Usage:
+    python -m benchmarks.json_array [--mb 256] [--doc-kb 16]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+
+from benchmarks.corpus import KB, CorpusConfig, CorpusGenerator
+
+MB = 1024 * 1024
+METHODS = ["stream", "stream-mmap", "json.load"]
+
+
+def write_array(path: str, megabytes: float, doc_kb: float) -> int:
+    """
+    Write records to a pretty JSON array until it reaches `megabytes`.
+
+    Returns:
+        int: Records written
+    """
+    config = CorpusConfig(records=10_000_000, doc_bytes=int(doc_kb * KB))
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in CorpusGenerator(config).records():
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(record, ensure_ascii=False, indent=2))
+            count += 1
+            if f.tell() >= megabytes * MB:
+                break
+        f.write("\n]\n")
+    return count
+
+
+def read(method: str, path: str) -> None:
+    """Read `path` with `method` and print records, seconds and peak RSS as JSON."""
+    from scripts.jsonio import iter_json_array
+
+    start = time.perf_counter()
+    if method == "json.load":
+        with open(path, "r", encoding="utf-8") as f:
+            records = len(json.load(f))
+    else:
+        records = sum(1 for _ in iter_json_array(path, use_mmap=method == "stream-mmap"))
+    seconds = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux
+    print(json.dumps({"records": records, "seconds": seconds, "peak_rss_mb": peak_kb / KB}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mb", type=float, default=256, help="Size of the generated array file")
+    parser.add_argument("--doc-kb", type=float, default=16, help="Approximate document size in KB")
+    parser.add_argument("--methods", default=",".join(METHODS))
+    parser.add_argument("--read", nargs=2, metavar=("METHOD", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.read:
+        read(*args.read)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "array.json")
+        count = write_array(path, args.mb, args.doc_kb)
+        size_mb = os.path.getsize(path) / MB
+        print(f"Array: {count} records, {size_mb:.1f} MB")
+        print(f"{'method':<14}{'seconds':>10}{'MB/s':>10}{'peak RSS':>12}")
+        for method in args.methods.split(","):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.json_array", "--read", method, path],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output)
+            print(f"{method:<14}{result['seconds']:>10.2f}{size_mb / result['seconds']:>10.1f}"
+                  f"{result['peak_rss_mb']:>9.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare MinHash/LSH near-duplicate detection against the difflib scan.
+
+Sentences of each document in a JSONL corpus are run through both methods
+(with seeded near-duplicate copies mixed in, since crawl text rarely has
+enough of them on its own) and the removed sentences are compared.
+
+Usage:
+    python -m benchmarks.near_duplicates [corpus.jsonl] [--threshold 0.8]
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from rchar import detect_near_duplicates, extract_sentences, remove_repetitive_phrases
+from scripts.jsonio import iter_records
+
+DEFAULT_CORPUS = "test_folder/samplekaggle.jsonl"
+
+
+def mutate(sentence: str, rng: random.Random) -> str:
+    """Make a near-duplicate by dropping or repeating one word."""
+    words = sentence.split()
+    if len(words) < 4:
+        return sentence
+    i = rng.randrange(len(words))
+    if rng.random() < 0.5:
+        del words[i]
+    else:
+        words.insert(i, words[i])
+    return ' '.join(words)
+
+
+def with_near_duplicates(sentences: List[str], rng: random.Random, rate: float) -> List[str]:
+    out = []
+    for sentence in sentences:
+        out.append(sentence)
+        if rng.random() < rate:
+            out.append(mutate(sentence, rng))
+    rng.shuffle(out)
+    return out
+
+
+def removed_indices(sentences: List[str], kept: List[str]) -> set:
+    """Indices of sentences dropped by an order-preserving filter."""
+    removed, k = set(), 0
+    for i, sentence in enumerate(sentences):
+        if k < len(kept) and kept[k] == sentence:
+            k += 1
+        else:
+            removed.add(i)
+    return removed
+
+
+def compare(corpus: str, threshold: float, rate: float, seed: int) -> Tuple[dict, dict]:
+    rng = random.Random(seed)
+    totals = {"sentences": 0, "difflib_removed": 0, "minhash_removed": 0, "both_removed": 0}
+    timings = {"difflib": 0.0, "minhash": 0.0}
+
+    for record in iter_records(corpus):
+        text = record.get('text') or record.get('content') or ''
+        sentences = with_near_duplicates(extract_sentences(remove_repetitive_phrases(text)), rng, rate)
+
+        start = time.perf_counter()
+        reference = removed_indices(sentences, detect_near_duplicates(sentences, threshold, method='difflib'))
+        timings["difflib"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidate = removed_indices(sentences, detect_near_duplicates(sentences, threshold, method='minhash'))
+        timings["minhash"] += time.perf_counter() - start
+
+        totals["sentences"] += len(sentences)
+        totals["difflib_removed"] += len(reference)
+        totals["minhash_removed"] += len(candidate)
+        totals["both_removed"] += len(reference & candidate)
+    return totals, timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--rate", type=float, default=0.2, help="Fraction of sentences given a near-duplicate copy")
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    totals, timings = compare(args.corpus, args.threshold, args.rate, args.seed)
+    both = totals["both_removed"]
+    precision = both / totals["minhash_removed"] if totals["minhash_removed"] else 1.0
+    recall = both / totals["difflib_removed"] if totals["difflib_removed"] else 1.0
+
+    print(f"Sentences:          {totals['sentences']}")
+    print(f"Removed (difflib):  {totals['difflib_removed']}")
+    print(f"Removed (minhash):  {totals['minhash_removed']}")
+    print(f"Precision:          {precision:.4f}")
+    print(f"Recall:             {recall:.4f}")
+    print(f"difflib time:       {timings['difflib']:.3f}s")
+    print(f"minhash time:       {timings['minhash']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
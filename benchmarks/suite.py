@@ -0,0 +1,221 @@
+"""
+Time the text-processing functions and end-to-end directory runs.
+
+A synthetic corpus (benchmarks.corpus) is generated from a fixed seed, so
+two commits benchmarked with the same profile see identical input. Each
+benchmark runs `repeat` times; the fastest run is the headline number.
+Results are written as JSON, and `--compare` checks them against an
+earlier results file, failing if any benchmark slowed down by more than
+`--threshold`.
+
+Usage:
+    python -m benchmarks.suite [--profile quick] [--output results.json]
+    python -m benchmarks.suite --compare baseline.json [--threshold 0.1]
+"""
+import io
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.corpus import KB, CorpusConfig, generate_records, write_corpus
+
+PROFILES = {
+    "quick": {"records": 100, "doc_kb": 2, "repeat": 3},
+    "default": {"records": 1000, "doc_kb": 4, "repeat": 5},
+    "large": {"records": 10000, "doc_kb": 16, "repeat": 3},
+}
+DEFAULT_THRESHOLD = 0.10  # Allowed slowdown before a benchmark counts as a regression
+MB = 1024 * 1024
+
+
+def time_runs(fn: Callable[[], Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def function_benchmarks(records: List[Dict[str, Any]]) -> Dict[str, Callable[[], Any]]:
+    """
+    Benchmarks of single functions, each applied to every record's text.
+    """
+    from scripts.boilerplate import BoilerplateFilter
+    from scripts.chunk import malayalam_chunk_text
+    from scripts.quality import QualityFilter
+    from scripts.repetition import detect_near_duplicates, extract_sentences, remove_repetitive_phrases
+    from scripts.utils import clean_text, remove_repetitive_text, remove_stopwords
+
+    texts = [record["content"] for record in records]
+    cleaned = [clean_text(text) for text in texts]
+    sentences = [extract_sentences(remove_repetitive_phrases(text)) for text in texts]
+    quality_filter = QualityFilter()
+    return {
+        "quality_filter": lambda: quality_filter.reasons(texts),
+        "boilerplate_filter": lambda: BoilerplateFilter().fit(records).filter(records),
+        "clean_text": lambda: [clean_text(text) for text in texts],
+        "remove_stopwords": lambda: [remove_stopwords(text) for text in cleaned],
+        "remove_repetitive_text": lambda: [remove_repetitive_text(text) for text in cleaned],
+        "remove_repetitive_phrases": lambda: [remove_repetitive_phrases(text) for text in texts],
+        "detect_near_duplicates": lambda: [detect_near_duplicates(doc) for doc in sentences],
+        "malayalam_chunk_text": lambda: [malayalam_chunk_text(text, "", "") for text in cleaned],
+    }
+
+
+def directory_benchmarks(corpus_dir: str, work_dir: str, workers: int) -> Dict[str, Callable[[], Any]]:
+    """
+    End-to-end benchmarks over the corpus directory, writing into `work_dir`.
+    """
+    from scripts.chunk import process_json_files
+    from scripts.clean_text import process_directory
+    from scripts.pipeline import run_pipeline
+
+    def clean() -> None:
+        process_directory(corpus_dir, os.path.join(work_dir, "cleaned"), workers=workers, incremental=False)
+
+    def chunk() -> None:
+        process_json_files(corpus_dir, os.path.join(work_dir, "chunked"), workers=workers)
+
+    def pipeline() -> None:
+        run_pipeline([corpus_dir], os.path.join(work_dir, "pipeline.jsonl"), workers=workers)
+
+    return {"clean_directory": clean, "chunk_directory": chunk, "pipeline": pipeline}
+
+
+def run_suite(config: CorpusConfig, repeat: int, workers: int = 1, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Generate the corpus, run every (or every `only`) benchmark and return
+    the results document.
+    """
+    records = generate_records(config)
+    texts = [record["content"] for record in records]
+    corpus_bytes = sum(len(text.encode("utf-8")) for text in texts)
+    results = {}
+
+    def record(name: str, fn: Callable[[], Any]) -> None:
+        if only and name not in only:
+            return
+        with redirect_stdout(io.StringIO()):
+            timings = time_runs(fn, repeat)
+        best = min(timings)
+        results[name] = {
+            "repeat": repeat,
+            "min_seconds": best,
+            "median_seconds": statistics.median(timings),
+            "mb_per_s": corpus_bytes / MB / best if best else None,
+        }
+        print(f"{name:<28}{best:>10.3f}s{statistics.median(timings):>10.3f}s{results[name]['mb_per_s']:>10.2f} MB/s")
+
+    print(f"Corpus: {config.records} records, {corpus_bytes / MB:.1f} MB (seed {config.seed})")
+    print(f"{'benchmark':<28}{'min':>11}{'median':>11}{'throughput':>15}")
+    for name, fn in function_benchmarks(records).items():
+        record(name, fn)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = os.path.join(tmp, "corpus")
+        write_corpus(corpus_dir, config, files=8)
+        for name, fn in directory_benchmarks(corpus_dir, os.path.join(tmp, "work"), workers).items():
+            record(name, fn)
+
+    return {
+        "version": 1,
+        "meta": environment(),
+        "corpus": {**config.to_dict(), "bytes": corpus_bytes},
+        "workers": workers,
+        "results": results,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Compare fastest times against a baseline results document.
+
+    Returns:
+        List[str]: Benchmarks slower than the baseline by more than `threshold`
+    """
+    if current.get("corpus") != baseline.get("corpus"):
+        print("Warning: baseline was run on a different corpus; timings are not comparable")
+    regressions = []
+    print(f"{'benchmark':<28}{'baseline':>11}{'current':>11}{'change':>10}")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            print(f"{name:<28}{'-':>11}{result['min_seconds']:>10.3f}s{'new':>10}")
+            continue
+        change = result["min_seconds"] / before["min_seconds"] - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<28}{before['min_seconds']:>10.3f}s{result['min_seconds']:>10.3f}s{change:>+10.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="default")
+    parser.add_argument("--records", type=int, default=None, help="Override the profile's record count")
+    parser.add_argument("--doc-kb", type=float, default=None, help="Override the profile's document size")
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--workers", type=int, default=1, help="Workers for the directory benchmarks")
+    parser.add_argument("--only", default=None, help="Comma-separated benchmarks to run")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to check against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed fractional slowdown (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    # Keep the directory benchmarks' progress logging off the console and out of log files
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.NullHandler()])
+
+    profile = PROFILES[args.profile]
+    config = CorpusConfig(
+        records=args.records or profile["records"],
+        doc_bytes=int((args.doc_kb or profile["doc_kb"]) * KB),
+        seed=args.seed,
+    )
+    only = args.only.split(",") if args.only else None
+    results = run_suite(config, args.repeat or profile["repeat"], args.workers, only)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,369 @@
 import os
 import sys
-from scripts.clean_text import process_directory
+import tempfile
+import subprocess
+from contextlib import nullcontext
 
+import click
+
+from scripts.dedup_index import DEFAULT_INDEX_NAME
+from scripts.executor import DEFAULT_BATCH_SIZE
+from scripts.io_codecs import KEEP
+from scripts.metrics import Metrics, profiled
+from scripts.pipeline import DEFAULT_QUEUE_SIZE, DEFAULT_STAGES, STAGE_NAMES, check_stages, run_pipeline
+from scripts.sharding import RANGE_BYTES, ShardSpec
+from scripts.utils import setup_logging
+
+MB = 1024 * 1024
+COMPRESSIONS = [KEEP, "none", "gzip", "zstd"]
+
+
+def _workers(value: int):
+    return None if value == 0 else value
+
+
+def _compression(value: str):
+    return None if value == "none" else value
+
+
+def _metrics(path, trace_memory):
+    return Metrics(trace_memory) if path else None
+
+
+def _export(metrics, path):
+    if metrics is not None:
+        json_path, prom_path = metrics.export(path)
+        click.echo(metrics.summary())
+        click.echo(f"Metrics written to {json_path} and {prom_path}")
+
+
+def metrics_options(command):
+    command = click.option("--trace-memory", is_flag=True,
+                           help="Record peak memory with tracemalloc (slower)")(command)
+    return click.option("--metrics", "metrics_path", default=None,
+                        help="Write per-stage metrics as JSON here (plus a .prom Prometheus file)")(command)
+
+
+@click.group()
 def main():
     """
-    Main function to execute text processing.
-    Each input JSON file will have its own cleaned output file.
-    """
-    input_dir = r"C:\Users\Administrator\Documents\GitHub\Text cleaning\data\sample input"
-    output_dir = r"C:\Users\Administrator\Documents\GitHub\Text cleaning\data\output_data\root1"
-    
-    # Process directory
-    process_directory(
-        input_dir=input_dir,
-        output_dir=output_dir
-    )
-    
-    print("Processing complete. Each file has been processed and saved with '_cleaned' suffix.")
-    sys.exit(0)
+    Clean, deduplicate and chunk crawled Malayalam text.
+    """
+
+
+@main.command()
+@click.argument("input_dir", type=click.Path(exists=True, file_okay=False))
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option("--workers", type=int, default=0, show_default=True, help="Worker processes (0 = one per CPU core)")
+@click.option("--dedup-index", default=None, help="Persistent dedup index (default: <output_dir>/dedup_index.sqlite)")
+@click.option("--no-dedup", is_flag=True, help="Disable exact-duplicate removal")
+@click.option("--no-incremental", is_flag=True, help="Reprocess inputs that are unchanged since the last run")
+@click.option("--shard-mb", type=int, default=None, help="Pack all records into JSONL shards of about this size")
+@click.option("--compact", is_flag=True, help="Compact JSON output")
+@click.option("--compression", type=click.Choice(COMPRESSIONS), default=KEEP, show_default=True)
+@click.option("--shard-index", type=int, default=None, help="Process only this slice of the inputs (0-based)")
+@click.option("--num-shards", type=int, default=None, help="Number of slices the inputs are split into")
+@click.option("--range-mb", type=int, default=RANGE_BYTES // MB, show_default=True,
+              help="With sharding, JSONL inputs above this size are split into ranges of this size")
+@metrics_options
+def clean(input_dir, output_dir, workers, dedup_index, no_dedup, no_incremental, shard_mb, compact, compression,
+          shard_index, num_shards, range_mb, metrics_path, trace_memory):
+    """
+    Clean every JSON/JSONL file under INPUT_DIR into OUTPUT_DIR ('_cleaned' files).
+
+    With --shard-index I --num-shards N only slice I of the inputs is
+    processed, so N processes or hosts can split the work without a
+    coordinator; combine their output directories with `merge`.
+    """
+    from scripts.clean_text import process_directory
+
+    shard = _shard_spec(shard_index, num_shards)
+    if not no_dedup and dedup_index is None:
+        dedup_index = os.path.join(output_dir, DEFAULT_INDEX_NAME)
+    metrics = _metrics(metrics_path, trace_memory)
+    with metrics or nullcontext():
+        results = process_directory(
+            input_dir=input_dir,
+            output_dir=output_dir,
+            workers=_workers(workers),
+            dedup_index_path=None if no_dedup else dedup_index,
+            incremental=not no_incremental,
+            shard_bytes=shard_mb * MB if shard_mb else None,
+            compact=compact,
+            compression=_compression(compression),
+            metrics=metrics,
+            shard=shard,
+            range_bytes=range_mb * MB
+        )
+    _export(metrics, metrics_path)
+    click.echo("Processing complete. Each file has been processed and saved with '_cleaned' suffix.")
+    sys.exit(0 if all(result.ok for result in results) else 1)
+
+
+def _shard_spec(shard_index, num_shards):
+    if shard_index is None and num_shards is None:
+        return None
+    if shard_index is None or num_shards is None:
+        raise click.UsageError("--shard-index and --num-shards must be given together")
+    try:
+        return ShardSpec(shard_index, num_shards)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+
+@main.command()
+@click.argument("shard_dirs", nargs=-1, required=True, type=click.Path(exists=True, file_okay=False))
+@click.option("-o", "--output", "output_dir", required=True, type=click.Path(file_okay=False),
+              help="Merged output directory")
+@click.option("--no-dedup", is_flag=True, help="Keep records duplicated across shards")
+def merge(shard_dirs, output_dir, no_dedup):
+    """
+    Merge the output directories of all shards of a sharded `clean` run
+    (outputs, manifests and dedup indexes) into OUTPUT.
+    """
+    from scripts.sharding import merge_shard_outputs
+
+    setup_logging()
+    try:
+        stats = merge_shard_outputs(shard_dirs, output_dir, dedup=not no_dedup)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Merged {stats['shards']} shards into {output_dir}: {stats['records']} records, "
+               f"{stats['duplicates']} cross-shard duplicates dropped")
+
+
+@main.command("clean-local")
+@click.argument("input_dir", type=click.Path(exists=True, file_okay=False))
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option("--num-shards", type=int, required=True, help="Shard processes to start")
+@click.option("--workers", type=int, default=1, show_default=True, help="Worker processes per shard")
+@click.option("--no-dedup", is_flag=True, help="Disable exact-duplicate removal")
+@click.option("--shard-mb", type=int, default=None, help="Pack all records into JSONL shards of about this size")
+@click.option("--compact", is_flag=True, help="Compact JSON output")
+@click.option("--compression", type=click.Choice(COMPRESSIONS), default=KEEP, show_default=True)
+@click.option("--range-mb", type=int, default=RANGE_BYTES // MB, show_default=True)
+def clean_local(input_dir, output_dir, num_shards, workers, no_dedup, shard_mb, compact, compression, range_mb):
+    """
+    Run a sharded `clean` as NUM_SHARDS local processes, each writing to
+    OUTPUT_DIR/shards/shard-III-of-NNN, then merge them into OUTPUT_DIR.
+    Exercises a multi-host setup on one machine.
+    """
+    setup_logging()
+    if num_shards < 1:
+        raise click.BadParameter("must be at least 1", param_hint="--num-shards")
+    shard_dirs = [os.path.join(output_dir, "shards", ShardSpec(i, num_shards).name) for i in range(num_shards)]
+    options = ["--workers", str(workers), "--compression", compression, "--range-mb", str(range_mb)]
+    options += ["--no-dedup"] if no_dedup else []
+    options += ["--shard-mb", str(shard_mb)] if shard_mb else []
+    options += ["--compact"] if compact else []
+    processes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "clean", input_dir, shard_dir,
+                          "--shard-index", str(i), "--num-shards", str(num_shards), *options])
+        for i, shard_dir in enumerate(shard_dirs)
+    ]
+    failed = [i for i, process in enumerate(processes) if process.wait() != 0]
+    if failed:
+        raise click.ClickException(f"Shards {failed} failed; see text_processing.log")
+    ctx = click.get_current_context()
+    ctx.invoke(merge, shard_dirs=shard_dirs, output_dir=output_dir, no_dedup=no_dedup)
+
+
+@main.command()
+@click.argument("input_dir", type=click.Path(exists=True, file_okay=False))
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option("--workers", type=int, default=0, show_default=True, help="Worker processes (0 = one per CPU core)")
+@click.option("--max-words", type=int, default=512, show_default=True)
+@click.option("--overlap-words", type=int, default=50, show_default=True)
+@click.option("--shard-mb", type=int, default=None, help="Pack all chunked records into JSONL shards of about this size")
+@click.option("--compact", is_flag=True, help="Compact JSON output")
+@click.option("--compression", type=click.Choice(COMPRESSIONS), default=KEEP, show_default=True)
+@click.option("--tokenizer", "tokenizer_path", default=None, type=click.Path(exists=True, dir_okay=False),
+              help="Write token IDs under this vocabulary file to chunks.bin/.idx instead of JSON")
+@click.option("--verify", is_flag=True, help="With --tokenizer, check the .bin output against the JSON chunking")
+@metrics_options
+def chunk(input_dir, output_dir, workers, max_words, overlap_words, shard_mb, compact, compression, tokenizer_path,
+          verify, metrics_path, trace_memory):
+    """
+    Chunk every JSON/JSONL file in INPUT_DIR into OUTPUT_DIR ('chunked_' files),
+    or, with --tokenizer, into one memory-mappable token file for training.
+    """
+    from scripts.chunk import process_json_files
+
+    setup_logging()
+    if verify and not tokenizer_path:
+        raise click.UsageError("--verify needs --tokenizer")
+    metrics = _metrics(metrics_path, trace_memory)
+    with metrics or nullcontext():
+        process_json_files(
+            input_dir,
+            output_dir,
+            max_words=max_words,
+            overlap_words=overlap_words,
+            workers=_workers(workers),
+            shard_bytes=shard_mb * MB if shard_mb else None,
+            compact=compact,
+            compression=_compression(compression),
+            metrics=metrics,
+            tokenizer_path=tokenizer_path
+        )
+    _export(metrics, metrics_path)
+    if verify:
+        from scripts.token_bin import verify_token_bin
+
+        problems = verify_token_bin(output_dir, input_dir, tokenizer_path)
+        for problem in problems:
+            click.echo(problem, err=True)
+        if problems:
+            raise click.ClickException("The token output does not match the JSON chunking")
+        click.echo("Token output matches the JSON chunking")
+
+
+@main.command("build-vocab")
+@click.argument("input_dir", type=click.Path(exists=True, file_okay=False))
+@click.argument("vocab_file", type=click.Path(dir_okay=False))
+@click.option("--size", type=int, default=1 << 16, show_default=True,
+              help="Vocabulary size, including <unk> (65536 or less keeps uint16 token files)")
+def build_vocab(input_dir, vocab_file, size):
+    """
+    Write a word-level vocabulary of the most frequent words in INPUT_DIR's
+    JSON/JSONL files, one token per line, for `chunk --tokenizer`.
+    """
+    from scripts.token_bin import build_vocab as write_vocab, json_input_files
+
+    setup_logging()
+    click.echo(f"Wrote {write_vocab(json_input_files(input_dir), vocab_file, size)} tokens to {vocab_file}")
+
+
+@main.command()
+@click.argument("inputs", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("-o", "--output", required=True, help="Output JSONL file (.gz/.zst compressed), or shard directory")
+@click.option("--stages", default=",".join(DEFAULT_STAGES), show_default=True,
+              help=f"Comma-separated stages to run, in pipeline order ({', '.join(STAGE_NAMES)})")
+@click.option("--workers", type=int, default=1, show_default=True,
+              help="Processes per stage (0 = one per CPU core, 1 = threads only)")
+@click.option("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, show_default=True)
+@click.option("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, show_default=True,
+              help="Batches buffered between two stages")
+@click.option("--dump-dir", default=None, help="Also write each intermediate stage's output here")
+@click.option("--shard-mb", type=int, default=None, help="Write JSONL shards of about this size into OUTPUT")
+@click.option("--compact", is_flag=True, help="Compact JSON output")
+@click.option("--dedup-index", default=None, help="Persistent exact-duplicate index for the clean stage")
+@click.option("--similarity", type=float, default=0.8, show_default=True,
+              help="Near-duplicate sentence similarity threshold")
+@click.option("--corpus-near-dup", is_flag=True, help="Drop near-duplicate sentences across documents")
+@click.option("--max-words", type=int, default=512, show_default=True)
+@click.option("--overlap-words", type=int, default=50, show_default=True)
+@click.option("--min-malayalam-ratio", type=float, default=0.5, show_default=True,
+              help="Quality stage: minimum fraction of Malayalam characters")
+@click.option("--min-chars", type=int, default=100, show_default=True,
+              help="Quality stage: minimum non-whitespace characters")
+@click.option("--max-chars", type=int, default=None, help="Quality stage: maximum non-whitespace characters")
+@click.option("--min-punctuation", type=float, default=0.0, show_default=True,
+              help="Quality stage: minimum punctuation density (0 = no check)")
+@click.option("--max-punctuation", type=float, default=0.2, show_default=True,
+              help="Quality stage: maximum punctuation density")
+@click.option("--max-duplicate-lines", type=float, default=0.5, show_default=True,
+              help="Quality stage: maximum fraction of repeated lines")
+@click.option("--boilerplate-fraction", type=float, default=0.5, show_default=True,
+              help="Boilerplate stage: remove segments on more than this fraction of a domain's pages")
+@click.option("--boilerplate-min-pages", type=int, default=5, show_default=True,
+              help="Boilerplate stage: pages a domain needs before segments are removed")
+@click.option("--sketch-mb", type=float, default=16, show_default=True,
+              help="Boilerplate stage: memory of the segment-count sketch")
+@metrics_options
+def run(inputs, output, stages, workers, batch_size, queue_size, dump_dir, shard_mb, compact, dedup_index,
+        similarity, corpus_near_dup, max_words, overlap_words, min_malayalam_ratio, min_chars, max_chars,
+        min_punctuation, max_punctuation, max_duplicate_lines, boilerplate_fraction, boilerplate_min_pages,
+        sketch_mb, metrics_path, trace_memory):
+    """
+    Stream INPUTS (files or directories) through quality -> clean ->
+    repetition -> near-dup -> chunk and write only the final output.
+    Add the boilerplate stage to first count per-domain boilerplate over
+    all INPUTS and strip it after the quality stage.
+    """
+    setup_logging()
+    names = _stage_names(stages)
+    stage_options = {}
+    if "quality" in names:
+        from scripts.quality import QualityFilter
+
+        stage_options["quality_filter"] = QualityFilter(
+            min_malayalam_ratio=min_malayalam_ratio,
+            min_chars=min_chars,
+            max_chars=max_chars,
+            min_punctuation=min_punctuation,
+            max_punctuation=max_punctuation,
+            max_duplicate_lines=max_duplicate_lines
+        )
+    if "boilerplate" in names:
+        from scripts.boilerplate import BoilerplateFilter
+
+        stage_options["boilerplate_filter"] = BoilerplateFilter(
+            max_fraction=boilerplate_fraction,
+            min_pages=boilerplate_min_pages,
+            memory_mb=sketch_mb
+        )
+    metrics = _metrics(metrics_path, trace_memory)
+    with metrics or nullcontext():
+        run_pipeline(
+            inputs,
+            output,
+            stages=names,
+            workers=_workers(workers),
+            batch_size=batch_size,
+            queue_size=queue_size,
+            dump_dir=dump_dir,
+            shard_bytes=shard_mb * MB if shard_mb else None,
+            compact=compact,
+            dedup_index_path=dedup_index,
+            metrics=metrics,
+            similarity_threshold=similarity,
+            corpus_near_dup=corpus_near_dup,
+            max_words=max_words,
+            overlap_words=overlap_words,
+            **stage_options
+        )
+    _export(metrics, metrics_path)
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--stages", default=",".join(DEFAULT_STAGES), show_default=True,
+              help="Comma-separated pipeline stages to profile")
+@click.option("--stats", default="profile.prof", show_default=True, help="Where to save the cProfile stats")
+@click.option("--sort", default="cumulative", show_default=True, help="pstats sort key for the printed summary")
+@click.option("--no-cprofile", is_flag=True,
+              help="Run without cProfile, e.g. under `py-spy record -- python main.py profile ...`")
+def profile(input_file, stages, stats, sort, no_cprofile):
+    """
+    Profile the pipeline on INPUT_FILE alone, running every stage in the
+    main thread (no stage threads or worker pools), so all of them show up
+    in one profile.
+    """
+    setup_logging()
+    names = _stage_names(stages)
+    click.echo(f"Profiling {input_file} in process {os.getpid()}")
+    metrics = Metrics()
+    with tempfile.TemporaryDirectory() as tmp, metrics, profiled(None if no_cprofile else stats, sort):
+        run_pipeline([input_file], os.path.join(tmp, "output.jsonl"), stages=names, workers=1, metrics=metrics,
+                     serial=True)
+    click.echo(metrics.summary())
+    if not no_cprofile:
+        click.echo(f"cProfile stats saved to {stats}")
+
+
+def _stage_names(stages):
+    names = [name.strip() for name in stages.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(STAGE_NAMES))
+    if unknown:
+        raise click.BadParameter(f"unknown stages {unknown}; choose from {', '.join(STAGE_NAMES)}",
+                                 param_hint="--stages")
+    try:
+        check_stages(names)
+    except ImportError as e:
+        raise click.ClickException(str(e))
+    return names
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,143 +1,91 @@
 import json
-import re
-from collections import Counter
-import difflib
 import os
 import logging
 import traceback
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s: %(message)s',
-    handlers=[
-        logging.FileHandler('json_processing.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+from scripts.executor import DEFAULT_BATCH_SIZE, ParallelExecutor
+from scripts.io_codecs import is_json_file
+from scripts.jsonio import JsonlWriter, detect_layout, iter_records
+from scripts.repetition import (
+    detect_near_duplicates,
+    extract_sentences,
+    remove_repetitive_phrases
 )
+from scripts.utils import setup_logging
+
 logger = logging.getLogger(__name__)
 
 def safe_json_load(file_path):
-    """Safely load JSON or JSONL file."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+    """Safely stream records from a JSON or JSONL file.
 
-        if file_path.lower().endswith('.jsonl'):  # For JSONL (one object per line)
-            parsed_objects = []
-            for line in content.splitlines():
-                line = line.strip()
-                if line:  # Skip empty lines
-                    try:
-                        parsed_objects.append(json.loads(line))
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Error decoding JSON in line: {line}. Error: {e}")
-            if not parsed_objects:
-                raise ValueError(f"No valid JSON found in {file_path}")
-            return parsed_objects
+    Yields one record at a time; malformed JSONL lines are logged with their
+    line number and skipped.
+    """
+    if not is_json_file(file_path.lower()):
+        raise ValueError("File format not supported. Use .json or .jsonl (optionally .gz/.zst)")
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
 
-        elif file_path.lower().endswith('.json'):  # For standard JSON
-            return json.loads(content)
-        else:
-            raise ValueError(f"File format not supported. Use .json or .jsonl")
+    count = 0
+    for record in iter_records(file_path):
+        count += 1
+        yield record
+    if count == 0 and detect_layout(file_path) == "jsonl":
+        raise ValueError(f"No valid JSON found in {file_path}")
 
-    except FileNotFoundError:
-        raise FileNotFoundError(f"File not found: {file_path}")
-    except Exception as e:
-        raise Exception(f"An error occurred: {e}")
+def process_entry(idx, entry):
+    """Remove repetitive content and near-duplicates from one entry.
 
-def preprocess_text(text):
-    """Preprocess text for repetition detection."""
-    if not isinstance(text, str):
-        text = str(text)
-    
-    # Remove extra whitespaces
-    text = re.sub(r'\s+', ' ', text).strip()
-    # Remove unwanted characters except Malayalam-specific punctuations
-    text = re.sub(r'[^\u0D00-\u0D7F\s.,!?]', '', text)
-    return text
+    Returns the processed entry, or None if the entry has no text.
+    """
+    text = entry.get('text', '')
+    if not text:
+        logger.warning(f"No 'text' key found in entry {idx}")
+        return None
 
-def extract_sentences(text):
-    """Extract sentences from Malayalam text."""
-    sentences = re.split(r'[.\n!?]+', text)
-    sentences = [s.strip() for s in sentences if s.strip()]
-    return sentences
+    logger.debug("Original text length (entry %d): %d", idx, len(text))
 
-def detect_near_duplicates(sentences, similarity_threshold=0.8):
-    """Detect near-duplicate sentences using difflib."""
-    unique_sentences = []
-    for i, sentence in enumerate(sentences):
-        is_duplicate = False
-        for existing in unique_sentences:
-            similarity = difflib.SequenceMatcher(None, sentence, existing).ratio()
-            if similarity >= similarity_threshold:
-                is_duplicate = True
-                break
-        if not is_duplicate:
-            unique_sentences.append(sentence)
-    return unique_sentences
+    processed_text = remove_repetitive_phrases(text)
+    sentences = extract_sentences(processed_text)
+    unique_sentences = detect_near_duplicates(sentences)
+    final_text = ' '.join(unique_sentences)
+    return {"text": final_text}
 
-def remove_repetitive_phrases(text, min_phrase_length=5, max_repetitions=3):
-    """Remove repetitive phrases from text."""
-    preprocessed_text = preprocess_text(text)
-    words = preprocessed_text.split()
-    phrases = []
-    for i in range(len(words) - min_phrase_length + 1):
-        for length in range(min_phrase_length, min(min_phrase_length + 5, len(words) - i + 1)):
-            phrase = ' '.join(words[i:i+length])
-            phrases.append(phrase)
-    phrase_counts = Counter(phrases)
-    filtered_words = []
-    i = 0
-    while i < len(words):
-        current_phrase = ' '.join(words[i:i+min_phrase_length])
-        if phrase_counts[current_phrase] <= max_repetitions:
-            filtered_words.append(words[i])
-            i += 1
-        else:
-            i += min_phrase_length
-    return ' '.join(filtered_words)
+def process_entries(indexed_entries):
+    """Process a batch of (index, entry) pairs. Unit of work for the pool."""
+    return [process_entry(idx, entry) for idx, entry in indexed_entries]
 
-def process_single_jsonl_file(input_path, output_path):
-    """Process a single JSONL file for repetition removal."""
+def process_single_jsonl_file(input_path, output_path, workers=1, batch_size=DEFAULT_BATCH_SIZE, compact=False):
+    """Process a single JSONL file for repetition removal.
+
+    Entries are processed in batches across `workers` processes
+    (None = one per CPU core); output order matches the input.
+    Input and output may be .gz/.zst compressed (by suffix); `compact`
+    writes JSON without separator spaces. Returns True on success.
+    """
     try:
         logger.info(f"Processing file: {input_path}")
         
-        # Load JSONL file
+        # Stream records from the input file
         data = safe_json_load(input_path)
         
-        # Process each JSON object
-        processed_data = []
-        for idx, entry in enumerate(data):
-            text = entry.get('text', '')
-            if not text:
-                logger.warning(f"No 'text' key found in entry {idx}")
-                continue
-            
-            logger.info(f"Original text length (entry {idx}): {len(text)}")
-            
-            # Remove repetitive content and near-duplicates
-            processed_text = remove_repetitive_phrases(text)
-            sentences = extract_sentences(processed_text)
-            unique_sentences = detect_near_duplicates(sentences)
-            final_text = ' '.join(unique_sentences)
-            
-            # Store processed entry
-            processed_data.append({"text": final_text})
-        
-        # Save processed data to a new file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for entry in processed_data:
-                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        # Process each JSON object and write it as soon as its batch is done
+        with ParallelExecutor(workers) as executor, JsonlWriter(output_path, compact=compact) as writer:
+            for entry in executor.imap_batches(process_entries, enumerate(data), batch_size):
+                if entry is not None:
+                    writer.write(entry)
         
         logger.info(f"File successfully processed and saved to {output_path}")
+        return True
     
     except Exception as e:
         logger.error(f"Failed to process {input_path}: {e}")
         logger.error(traceback.format_exc())
+        return False
 
 # Example for processing a single file
 if __name__ == "__main__":
+    setup_logging('json_processing.log')
     input_file = r'C:\Users\Administrator\Documents\GitHub\Text cleaning\data\output_data\root1\cleaned_data.jsonl'
     output_file = r'C:\Users\Administrator\Documents\GitHub\Text cleaning\data\output_data\root2\processed_output.jsonl'
     
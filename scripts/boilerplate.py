@@ -0,0 +1,249 @@
+import re
+import hashlib
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from .metrics import count
+
+MB = 1024 * 1024
+DEFAULT_SKETCH_MB = 16  # Memory of the count-min sketch, whatever the corpus size
+DEFAULT_DEPTH = 4  # Hash rows of the sketch; estimates are the minimum over rows
+FLUSH_SEGMENTS = 100_000  # Segment hashes buffered before a vectorized sketch update
+_MAX_COUNT = np.iinfo(np.uint32).max
+
+# A run of text up to and including its sentence-ending punctuation, or the
+# unterminated rest of the line; the pieces of a line join back to the line
+_SENTENCE_RE = re.compile(r'[^.!?]*[.!?]+|[^.!?]+')
+
+
+class CountMinSketch:
+    """
+    Fixed-size frequency table: counts of arbitrary 16-byte keys are
+    over-estimated by hash collisions but never under-estimated. Updates are
+    conservative (only the smallest counters of a key grow), which keeps
+    collision error low.
+
+    Args:
+        memory_mb (float): Size of the counter table
+        depth (int): Number of hash rows
+    """
+
+    def __init__(self, memory_mb: float = DEFAULT_SKETCH_MB, depth: int = DEFAULT_DEPTH):
+        width = int(memory_mb * MB) // (depth * np.dtype(np.uint32).itemsize)
+        if width < 1:
+            raise ValueError(f"Count-min sketch of {memory_mb} MB is too small for depth {depth}")
+        self.depth = depth
+        self.width = width
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+
+    def _indexes(self, keys: Sequence[bytes]) -> np.ndarray:
+        # Row i uses h1 + i * h2 (double hashing) from the two halves of each key
+        halves = np.frombuffer(b''.join(keys), dtype=np.uint64).reshape(-1, 2)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((halves[:, 0] + rows * halves[:, 1]) % np.uint64(self.width)).astype(np.int64)
+
+    def _lookup(self, indexes: np.ndarray) -> np.ndarray:
+        return self.table[np.arange(self.depth)[:, None], indexes].min(axis=0)
+
+    def add(self, keys: Sequence[bytes], increments: Optional[np.ndarray] = None) -> None:
+        """
+        Add `increments` (default 1 each) to the counts of distinct `keys`.
+        """
+        if not keys:
+            return
+        indexes = self._indexes(keys)
+        if increments is None:
+            increments = np.ones(len(keys), dtype=np.int64)
+        target = np.minimum(self._lookup(indexes).astype(np.int64) + increments, _MAX_COUNT).astype(np.uint32)
+        for row in range(self.depth):
+            np.maximum.at(self.table[row], indexes[row], target)
+
+    def estimate(self, keys: Sequence[bytes]) -> np.ndarray:
+        """
+        Estimated counts of `keys`.
+        """
+        if not keys:
+            return np.zeros(0, dtype=np.uint32)
+        return self._lookup(self._indexes(keys))
+
+
+def url_domain(url: Any) -> str:
+    """
+    Lowercase host of `url` without a leading "www." ("" if there is none).
+    """
+    if not isinstance(url, str):
+        return ""
+    try:
+        host = urlsplit(url.strip()).hostname or ""
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _normalize(segment: str) -> str:
+    # Same result as dedup_index.normalize_for_hash, several times faster than its regex
+    return ' '.join(segment.split()).casefold()
+
+
+def _segment_key(domain: str, segment: str) -> bytes:
+    return hashlib.blake2b(f"{domain}\n{segment}".encode('utf-8'), digest_size=16).digest()
+
+
+def _split_lines(text: str) -> List[Tuple[str, List[str]]]:
+    return [(line, _SENTENCE_RE.findall(line)) for line in text.split('\n')]
+
+
+class BoilerplateFilter:
+    """
+    Two-pass removal of per-site boilerplate (menus, footers, greetings):
+    segments - lines and the sentences within them - that appear on more
+    than `max_fraction` of a URL domain's pages.
+
+    `fit` streams the corpus once and counts, per domain, the pages each
+    normalized segment appears on in a CountMinSketch, so memory is the
+    sketch plus one page counter per domain; `filter` then strips the
+    frequent segments. Records without a URL domain, and domains with fewer
+    than `min_pages` pages, are left untouched.
+
+    Args:
+        max_fraction (float): Segments on more than this fraction of their
+            domain's pages are boilerplate
+        min_pages (int): Pages a domain needs before anything is removed
+        min_chars (int): Shorter normalized segments are never removed
+        memory_mb (float): Size of the count-min sketch
+        depth (int): Hash rows of the count-min sketch
+    """
+
+    def __init__(
+        self,
+        max_fraction: float = 0.5,
+        min_pages: int = 5,
+        min_chars: int = 20,
+        memory_mb: float = DEFAULT_SKETCH_MB,
+        depth: int = DEFAULT_DEPTH
+    ):
+        self.max_fraction = max_fraction
+        self.min_pages = min_pages
+        self.min_chars = min_chars
+        self.sketch = CountMinSketch(memory_mb, depth)
+        self.pages: Dict[str, int] = Counter()
+
+    def _page_keys(self, domain: str, text: str) -> set:
+        keys = set()
+        for line, sentences in _split_lines(text):
+            for segment in [line, *sentences] if len(sentences) > 1 else [line]:
+                normalized = _normalize(segment)
+                if len(normalized) >= self.min_chars:
+                    keys.add(_segment_key(domain, normalized))
+        return keys
+
+    def fit(self, records: Iterable[Any], field: str = "content") -> "BoilerplateFilter":
+        """
+        First pass: count every page's distinct segments per domain.
+
+        Args:
+            records (Iterable[Any]): Records with a "url" and a `field`; other items are ignored
+            field (str): Text field to count
+
+        Returns:
+            BoilerplateFilter: self
+        """
+        pending: List[bytes] = []
+        for record in records:
+            if not isinstance(record, dict) or not isinstance(record.get(field), str):
+                continue
+            domain = url_domain(record.get("url"))
+            if not domain:
+                continue
+            self.pages[domain] += 1
+            pending.extend(self._page_keys(domain, record[field]))
+            if len(pending) >= FLUSH_SEGMENTS:
+                self._flush(pending)
+                pending = []
+        self._flush(pending)
+        logging.getLogger(__name__).info(
+            f"Boilerplate sketch: {sum(self.pages.values())} pages from {len(self.pages)} domains"
+        )
+        return self
+
+    def _flush(self, keys: List[bytes]) -> None:
+        # Boilerplate repeats across a buffer, so add each key once with its count
+        counts = Counter(keys)
+        self.sketch.add(list(counts), np.fromiter(counts.values(), dtype=np.int64, count=len(counts)))
+
+    def filter(self, records: Sequence[Any], field: str = "content") -> List[Any]:
+        """
+        Second pass: remove boilerplate lines, then boilerplate sentences of
+        the remaining lines, from each record's `field`. Removals are counted
+        as "boilerplate.lines_removed", "boilerplate.sentences_removed" and
+        "boilerplate.chars_removed" (see scripts.metrics).
+        """
+        # Gather every candidate segment of the batch for one sketch lookup
+        keys: List[bytes] = []
+        thresholds: List[float] = []
+        pages = []
+        for record in records:
+            text = record.get(field) if isinstance(record, dict) else None
+            domain = url_domain(record.get("url")) if isinstance(text, str) else ""
+            if self.pages.get(domain, 0) < self.min_pages:
+                pages.append(None)
+                continue
+            lines = []
+            for line, sentences in _split_lines(text):
+                segments = [line, *sentences] if len(sentences) > 1 else [line]
+                positions = []
+                for segment in segments:
+                    normalized = _normalize(segment)
+                    if len(normalized) >= self.min_chars:
+                        positions.append(len(keys))
+                        keys.append(_segment_key(domain, normalized))
+                        thresholds.append(self.max_fraction * self.pages[domain])
+                    else:
+                        positions.append(None)
+                lines.append((line, sentences, positions))
+            pages.append(lines)
+
+        boilerplate = self.sketch.estimate(keys) > np.asarray(thresholds)
+
+        def is_boilerplate(position: Optional[int]) -> bool:
+            return position is not None and bool(boilerplate[position])
+
+        output = []
+        lines_removed = sentences_removed = chars_removed = 0
+        for record, lines in zip(records, pages):
+            if lines is None:
+                output.append(record)
+                continue
+            kept_lines = []
+            for line, sentences, positions in lines:
+                if is_boilerplate(positions[0]):
+                    lines_removed += 1
+                    chars_removed += len(line)
+                    continue
+                if len(sentences) > 1:
+                    kept = [sentence for sentence, position in zip(sentences, positions[1:])
+                            if not is_boilerplate(position)]
+                    sentences_removed += len(sentences) - len(kept)
+                    if len(kept) < len(sentences):
+                        chars_removed += len(line)
+                        line = ''.join(kept).strip()
+                        chars_removed -= len(line)
+                        if not line:
+                            continue
+                kept_lines.append(line)
+            output.append({**record, field: '\n'.join(kept_lines)})
+        count("boilerplate.lines_removed", lines_removed)
+        count("boilerplate.sentences_removed", sentences_removed)
+        count("boilerplate.chars_removed", chars_removed)
+        return output
+
+
+def boilerplate_stage(batch: List[Any], boilerplate_filter: BoilerplateFilter) -> List[Any]:
+    """
+    Pipeline stage: strip the segments a fitted BoilerplateFilter found on most pages of each record's domain.
+    """
+    return boilerplate_filter.filter(batch)
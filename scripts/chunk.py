@@ -1,7 +1,20 @@
 import json
 import re
 import os
-from typing import List, Dict, Any
+import logging
+from array import array
+from functools import partial
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+
+from .executor import ParallelExecutor, log_results, order_by_size
+from .io_codecs import KEEP, get_codec, is_json_file, open_text, output_compression, split_compression, with_compression
+from .jsonio import JsonlWriter, atomic_open, detect_layout, iter_records
+from .manifest import MANIFEST_NAME
+from .metrics import RECORDS_IN, Metrics, count
+from .shards import MANIFEST_SUFFIX, ShardWriter, write_sharded
+from .tokens import TokenizedText
+
+_WORD_RE = re.compile(r'\S+')
 
 def is_malayalam_word(word: str) -> bool:
     """
@@ -16,116 +29,343 @@ def malayalam_word_tokenizer(text: str) -> List[str]:
     text = re.sub(r'\s+', ' ', text).strip()
     return text.split()
 
+def word_offsets(text: str) -> Tuple[array, array]:
+    """
+    Character offsets of every whitespace-separated word, computed once.
+
+    Returns:
+        Tuple[array, array]: start and end offset of each word
+    """
+    starts, ends = array('q'), array('q')
+    for match in _WORD_RE.finditer(text):
+        starts.append(match.start())
+        ends.append(match.end())
+    return starts, ends
+
+def iter_chunk_spans(
+    num_words: int,
+    max_words: int = 512,
+    overlap_words: int = 50,
+    min_chunk_words: int = 100
+) -> Iterator[Tuple[int, int]]:
+    """
+    Lazily yield (start, end) word spans of overlapping chunks.
+    Stops once a chunk reaches the last word, so no trailing window that
+    lies entirely inside the previous chunk is produced.
+    """
+    if num_words <= max_words:
+        yield 0, num_words
+        return
+    step = max_words - overlap_words
+    if step <= 0:
+        raise ValueError("overlap_words must be smaller than max_words")
+    start = 0
+    while start < num_words:
+        end = min(start + max_words, num_words)
+        if end - start >= min_chunk_words:
+            yield start, end
+        if end == num_words:
+            break
+        start += step
+
+def iter_malayalam_chunks(
+    text: Union[str, TokenizedText],
+    url: str,
+    timestamp: str,
+    max_words: int = 512,
+    overlap_words: int = 50,
+    min_chunk_words: int = 100,
+    emit_text: bool = True
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield chunks of `text` with metadata. See malayalam_chunk_text.
+    """
+    tokenized = isinstance(text, TokenizedText)
+    starts, ends = text.word_offsets() if tokenized else word_offsets(text)
+    num_words = len(starts)
+    
+    if num_words <= max_words:
+        chunk = {
+            "metadata": {
+                "url": url,
+                "timestamp": timestamp,
+                "chunk_index": 0,
+                "total_chunks": 1
+            }
+        }
+        if emit_text:
+            chunk = {"text": str(text), **chunk}
+        else:
+            text_length = (int(ends[-1]) if num_words else 0) if tokenized else len(text)
+            chunk["metadata"].update(char_start=0, char_end=text_length)
+        yield chunk
+        return
+    
+    spans = iter_chunk_spans(num_words, max_words, overlap_words, min_chunk_words)
+    total_chunks = sum(1 for _ in spans)
+    
+    spans = iter_chunk_spans(num_words, max_words, overlap_words, min_chunk_words)
+    for chunk_index, (start, end) in enumerate(spans):
+        char_start, char_end = int(starts[start]), int(ends[end - 1])
+        metadata = {
+            "url": url,
+            "timestamp": timestamp,
+            "chunk_index": chunk_index,
+            "start_idx": start,
+            "end_idx": end
+        }
+        if emit_text:
+            chunk_text = text.text(start, end) if tokenized else ' '.join(text[char_start:char_end].split())
+            chunk = {"text": chunk_text, "metadata": metadata}
+        else:
+            metadata.update(char_start=char_start, char_end=char_end)
+            chunk = {"metadata": metadata}
+        metadata["total_chunks"] = total_chunks
+        yield chunk
+
 def malayalam_chunk_text(
-    text: str,
+    text: Union[str, TokenizedText],
     url: str,
     timestamp: str,
     max_words: int = 512,
     overlap_words: int = 50,
-    min_chunk_words: int = 100
+    min_chunk_words: int = 100,
+    emit_text: bool = True
 ) -> List[Dict[str, Any]]:
     """
     Chunk text with linguistically aware method while preserving metadata.
     
+    Word boundaries are located once as character offsets; each chunk is
+    a span over them, so no per-chunk word lists are built.
+    
     Args:
-        text (str): Input text
+        text (Union[str, TokenizedText]): Input text; a TokenizedText is
+            chunked by slicing its word IDs, and offsets refer to its text
         url (str): Source URL
         timestamp (str): Document timestamp
         max_words (int): Maximum words per chunk
         overlap_words (int): Number of words to overlap
         min_chunk_words (int): Minimum words to form a chunk
+        emit_text (bool): Include chunk text. If False, each chunk instead
+            carries "char_start"/"char_end" metadata referencing the source
+            text; the chunk text is text[char_start:char_end] with
+            whitespace collapsed to single spaces
     
     Returns:
         List[Dict]: Chunks of text with metadata
     """
-    words = malayalam_word_tokenizer(text)
+    return list(iter_malayalam_chunks(
+        text, url, timestamp, max_words, overlap_words, min_chunk_words, emit_text
+    ))
+
+def chunk_record(
+    data: Dict[str, Any],
+    max_words: int = 512,
+    overlap_words: int = 50,
+    emit_text: bool = True
+) -> Dict[str, Any]:
+    """
+    Chunk the content of one record into the chunked output structure.
+    With emit_text=False chunks hold character offsets into the record's
+    "content" instead of copies of the text.
+    """
+    # Extract all required fields; non-string content is chunked as ""
+    content = data.get('content', '')
+    if not isinstance(content, str):
+        content = ''
+    url = data.get('url', '')
+    timestamp = data.get('timestamp', '')
     
-    if len(words) <= max_words:
-        return [{
-            "text": text,
-            "metadata": {
-                "url": url,
-                "timestamp": timestamp,
-                "chunk_index": 0,
-                "total_chunks": 1
-            }
-        }]
+    # Chunk the text with metadata
+    chunks = malayalam_chunk_text(
+        text=content,
+        url=url,
+        timestamp=timestamp,
+        max_words=max_words,
+        overlap_words=overlap_words,
+        emit_text=emit_text
+    )
     
-    chunks = []
-    start = 0
-    chunk_index = 0
-    
-    while start < len(words):
-        end = min(start + max_words, len(words))
-        chunk_words = words[start:end]
-        chunk_text = ' '.join(chunk_words)
-        
-        if len(chunk_words) >= min_chunk_words:
-            chunks.append({
-                "text": chunk_text,
-                "metadata": {
-                    "url": url,
-                    "timestamp": timestamp,
-                    "chunk_index": chunk_index,
-                    "start_idx": start,
-                    "end_idx": end
-                }
-            })
-            chunk_index += 1
-        
-        start += (max_words - overlap_words)
-    
-    # Add total_chunks to metadata
-    for chunk in chunks:
-        chunk["metadata"]["total_chunks"] = len(chunks)
-    
-    return chunks
-
-def process_json_files(input_directory: str, output_directory: str, max_words: int = 512, overlap_words: int = 50) -> None:
-    """
-    Process all JSON files in a directory with chunking.
+    # Create output structure
+    return {
+        "original_url": url,
+        "original_timestamp": timestamp,
+        "chunks": chunks
+    }
+
+def chunk_records(
+    input_path: str,
+    max_words: int = 512,
+    overlap_words: int = 50,
+    emit_text: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Chunk every record of a JSON or JSONL file in memory (sharded output).
+    """
+    return [
+        chunk_record(data, max_words, overlap_words, emit_text)
+        for data in iter_records(input_path) if isinstance(data, dict)
+    ]
+
+def chunk_json_file(
+    input_path: str,
+    output_path: str,
+    max_words: int = 512,
+    overlap_words: int = 50,
+    emit_text: bool = True,
+    compact: bool = False
+) -> int:
+    """
+    Chunk a single JSON or JSONL file and write the chunked output.
+    A single JSON object is written as one pretty-printed object (compact
+    with `compact=True`); arrays and JSONL are streamed to JSONL with one
+    chunked record per line. Paths ending in .gz/.zst are (de)compressed.
+    
+    Args:
+        input_path (str): Path to the input file
+        output_path (str): Path to save the chunked output
+        max_words (int): Maximum words per chunk
+        overlap_words (int): Number of words to overlap
+        emit_text (bool): Write chunk text (False writes character offsets only)
+        compact (bool): Compact JSON output
+    
+    Returns:
+        int: Number of chunks written
+    """
+    total_chunks = 0
+    if detect_layout(input_path) == "object":
+        with open_text(input_path) as f:
+            data = json.load(f)
+        count(RECORDS_IN)
+        output_data = chunk_record(data, max_words, overlap_words, emit_text)
+        total_chunks = len(output_data["chunks"])
+        with atomic_open(output_path) as f:
+            f.write(get_codec(compact).dumps(output_data, indent=None if compact else 2))
+    else:
+        with JsonlWriter(output_path, compact=compact) as writer:
+            for data in iter_records(input_path):
+                if not isinstance(data, dict):
+                    continue
+                count(RECORDS_IN)
+                output_data = chunk_record(data, max_words, overlap_words, emit_text)
+                total_chunks += len(output_data["chunks"])
+                writer.write(output_data)
+    
+    print(f"Processed {os.path.basename(input_path)}: {total_chunks} chunks")
+    return total_chunks
+
+def process_json_files(
+    input_directory: str,
+    output_directory: str,
+    max_words: int = 512,
+    overlap_words: int = 50,
+    workers: Optional[int] = 1,
+    emit_text: bool = True,
+    shard_bytes: Optional[int] = None,
+    compact: bool = False,
+    compression: Optional[str] = KEEP,
+    metrics: Optional[Metrics] = None,
+    tokenizer_path: Optional[str] = None
+) -> None:
+    """
+    Process all JSON and JSONL files in a directory with chunking.
     
     Args:
         input_directory (str): Path to input JSON files
         output_directory (str): Path to save chunked JSON files
         max_words (int): Maximum words per chunk
         overlap_words (int): Number of words to overlap
+        workers (int): Worker processes (None = one per CPU core, 1 = serial)
+        emit_text (bool): Write chunk text; False writes character offsets
+            into each source document instead of duplicated text
+        shard_bytes (int): Pack chunked records into `chunked-NNNNN.jsonl`
+            shards of about this size (with `chunked.manifest.json`) instead
+            of writing one output per input
+        compact (bool): Compact JSON output
+        compression (str): Output compression: "gzip", "zstd", None, or "keep"
+            to match each input
+        metrics (Metrics): Collects the "chunk" stage's time, chunk counts and
+            file bytes (per-file output only)
+        tokenizer_path (str): Write the chunks' token IDs under this
+            vocabulary file to one memory-mappable chunks.bin/.idx pair
+            instead of JSON (see scripts.token_bin)
     """
+    if tokenizer_path:
+        from .token_bin import write_token_bin  # token_bin imports this module
+
+        chunks, tokens = write_token_bin(
+            input_directory, output_directory, tokenizer_path, max_words, overlap_words, workers
+        )
+        print(f"Wrote {chunks} chunks ({tokens} tokens) to {output_directory}")
+        return
+
     os.makedirs(output_directory, exist_ok=True)
     
+    jobs = []
     for filename in os.listdir(input_directory):
-        if filename.endswith('.json'):
+        if (is_json_file(filename) and filename != MANIFEST_NAME
+                and not filename.endswith(MANIFEST_SUFFIX)):
             input_path = os.path.join(input_directory, filename)
-            output_path = os.path.join(output_directory, f'chunked_{filename}')
-            
-            with open(input_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Extract all required fields
-            content = data.get('content', '')
-            url = data.get('url', '')
-            timestamp = data.get('timestamp', '')
-            
-            # Chunk the text with metadata
-            chunks = malayalam_chunk_text(
-                text=content,
-                url=url,
-                timestamp=timestamp,
-                max_words=max_words,
-                overlap_words=overlap_words
+            base_name, _ = split_compression(filename)
+            output_name = f'chunked_{base_name}'
+            if detect_layout(input_path) != "object":
+                output_name = f'chunked_{os.path.splitext(base_name)[0]}.jsonl'
+            output_name = with_compression(output_name, output_compression(input_path, compression))
+            output_path = os.path.join(output_directory, output_name)
+            jobs.append((input_path, output_path))
+    
+    if shard_bytes:
+        sources = sorted((os.path.basename(input_path), input_path) for input_path, _ in jobs)
+        load = partial(chunk_records, max_words=max_words, overlap_words=overlap_words, emit_text=emit_text)
+        with ParallelExecutor(workers) as executor, \
+                ShardWriter(output_directory, prefix="chunked", target_bytes=shard_bytes, compact=compact,
+                            compression=None if compression == KEEP else compression) as writer:
+            results = write_sharded(writer, sources, load, executor)
+        succeeded, failed = log_results(results, logging.getLogger(__name__))
+        print(f"Chunked {succeeded} files ({failed} failed) into {len(writer.shards)} shards")
+        return
+
+    jobs = order_by_size(jobs)
+    with ParallelExecutor(workers) as executor:
+        futures = [
+            executor.submit_task(
+                chunk_json_file, input_path, output_path, max_words, overlap_words, emit_text, compact
             )
-            
-            # Create output structure
-            output_data = {
-                "original_url": url,
-                "original_timestamp": timestamp,
-                "chunks": chunks
-            }
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, ensure_ascii=False, indent=2)
-            
-            print(f"Processed {filename}: {len(chunks)} chunks")
+            for input_path, output_path in jobs
+        ]
+        results = [future.result() for future in futures]
+    if metrics is not None:
+        stage = metrics.stage("chunk")
+        for (input_path, output_path), result in zip(jobs, results):
+            if result.metrics is not None:
+                # One chunked record per input record; chunks are counted separately
+                stage.add({
+                    **result.metrics,
+                    "records_out": result.metrics.get("records_in", 0),
+                    "counters": {**result.metrics["counters"], "chunks": result.records},
+                    "bytes_in": os.path.getsize(input_path),
+                    "bytes_out": os.path.getsize(output_path),
+                })
+    
+    succeeded, failed = log_results(results, logging.getLogger(__name__))
+    print(f"Chunked {succeeded} files ({failed} failed)")
+
+def chunk_stage(batch: List[Any], max_words: int = 512, overlap_words: int = 50) -> List[Any]:
+    """
+    Pipeline stage: chunk each record (as chunk_record does). Records with
+    no content left are dropped; non-dict items are passed through.
+    """
+    chunked = []
+    chunks = 0
+    for record in batch:
+        if not isinstance(record, dict):
+            chunked.append(record)
+        elif record.get("content"):
+            record = chunk_record(record, max_words, overlap_words)
+            chunks += len(record["chunks"])
+            chunked.append(record)
+    count("chunks", chunks)
+    return chunked
 
 if __name__ == "__main__":
     input_dir = r"C:\Users\Administrator\Documents\GitHub\Text cleaning\data\output_data\root1"
@@ -136,4 +376,4 @@ if __name__ == "__main__":
         output_directory=output_dir,
         max_words=512,
         overlap_words=50
-    )
\ No newline at end of file
+    )
@@ -1,91 +1,698 @@
 import os
 import json
 import logging
-from typing import List
-
-from .utils import (
-    # is_malayalam, 
-    clean_text, 
-    remove_stopwords, 
-    setup_logging,
-    remove_repetitive_text
+from functools import partial
+from itertools import chain
+from concurrent.futures import as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .utils import setup_logging
+from .cleaning import get_pipeline
+from .executor import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_SPLIT_BYTES,
+    ParallelExecutor,
+    TaskResult,
+    batched,
+    log_results,
+    order_by_size
+)
+from .dedup_index import DedupIndex, content_key
+from .jsonio import (
+    PART_SUFFIX,
+    JsonArrayWriter,
+    JsonlWriter,
+    atomic_open,
+    detect_layout,
+    iter_json_array,
+    iter_jsonl_offsets
+)
+from .io_codecs import (
+    KEEP,
+    get_codec,
+    is_json_file,
+    is_seekable_output,
+    open_text,
+    output_compression,
+    split_compression,
+    with_compression
+)
+from .manifest import (
+    DEFAULT_CHECKPOINT_BYTES,
+    Checkpoint,
+    Manifest,
+    config_hash,
+    fingerprint_for
+)
+from .metrics import RECORDS_IN, Metrics, count, measured_call, measuring, unwrap_measured
+from .shards import ShardWriter, iter_loaded, write_sharded
+from .sharding import (
+    RANGE_BYTES,
+    ShardSpec,
+    WorkItem,
+    align_to_line,
+    plan_work,
+    range_output_path,
+    write_sharding_info
 )
 
-def process_json_file(file_path: str, output_dir: str) -> None:
+def clean_content(content: str) -> str:
     """
-    Process a single JSON file and save it with '_cleaned' suffix,
-    maintaining exact input structure.
+    Run the cleaning stages on a single content string.
+    """
+    return get_pipeline().run(content)
+
+def clean_item(item: Any, index: Optional[DedupIndex] = None, source: Optional[str] = None) -> Any:
+    """
+    Clean the "content" field of a record, returning a copy.
+    Non-dict items are returned as is. With a dedup `index`, records whose
+    cleaned text was seen before return None before the expensive stages run;
+    `source` identifies the record's position in its input for the index.
+    """
+    if not isinstance(item, dict):
+        return item
+    keep = None
+    if index is not None:
+        keep = partial(index.add, url=item.get("url", ""), timestamp=item.get("timestamp"), source=source)
+    cleaned_content = get_pipeline().run(item.get("content", ""), keep)
+    if cleaned_content is None:
+        return None
+    item_copy = item.copy()
+    item_copy["content"] = cleaned_content
+    return item_copy
+
+def clean_stage(batch: List[Any], index: Optional[DedupIndex] = None) -> List[Any]:
     """
+    Pipeline stage: clean each record's content, dropping records already
+    in the dedup `index`. Non-dict items are passed through, as in every stage.
+    """
+    cleaned = []
+    for record in batch:
+        record = clean_item(record, index)
+        if record is not None:
+            cleaned.append(record)
+    return cleaned
+
+def _source(source_key: str, position: Any) -> str:
+    # A record's dedup index source: its input key and line offset or item number
+    return f"{source_key}:{position[0] if isinstance(position, tuple) else position}"
+
+def clean_batch(
+    batch: List[Tuple[Any, Any]],
+    index: Optional[DedupIndex] = None,
+    source_key: str = ""
+) -> List[Tuple[Any, bool, Any]]:
+    """
+    Clean a batch of (position, record) pairs. Used as the unit of work for
+    split files. Records are identified in the dedup index as
+    "<source_key>:<position>", where `source_key` is the input's path
+    relative to the input directory.
+
+    Returns:
+        List[Tuple]: (position, keep, cleaned record); keep is False for duplicates
+    """
+    count(RECORDS_IN, len(batch))
+    cleaned = []
+    for position, item in batch:
+        if isinstance(item, dict):
+            item = clean_item(item, index, _source(source_key, position))
+            if item is None:
+                cleaned.append((position, False, None))
+                continue
+        cleaned.append((position, True, item))
+    return cleaned
+
+def dedup_entries(batch: List[Tuple[Any, Any]], source_key: str = "") -> List[Tuple[str, str, Any, str]]:
+    """
+    Dedup index entries (key, url, timestamp, source) of a batch of
+    (position, record) pairs, for the text each record is checked with
+    while cleaning. Only the stages before the dedup check run.
+    """
+    entries = []
+    pipeline = get_pipeline()
+    checked: List[str] = []
+
+    def check(text: str) -> bool:
+        checked.append(text)
+        return False  # Stop before the expensive stages
+
+    for position, item in batch:
+        if not isinstance(item, dict) or not isinstance(item.get("content", ""), str):
+            continue  # Cleaned to "", which is never deduplicated
+        checked.clear()
+        pipeline.run(item.get("content", ""), check)
+        key = content_key(checked[0]) if checked else None
+        if key is not None:
+            entries.append((key, item.get("url", ""), item.get("timestamp"), _source(source_key, position)))
+    return entries
+
+def file_dedup_entries(file_path: str, source_keys: Dict[str, str]) -> List[Tuple[str, str, Any, str]]:
+    """
+    dedup_entries of every record of one file.
+    """
+    return dedup_entries(list(_record_pairs(file_path)), source_keys[file_path])
+
+def get_output_path(file_path: str, output_dir: str, compression: Optional[str] = KEEP) -> str:
+    """
+    Build the '_cleaned' output path for an input file
+    ("a.jsonl.gz" -> "a_cleaned.jsonl.gz" unless `compression` overrides it).
+    """
+    filename, _ = split_compression(os.path.basename(file_path))
+    name, ext = os.path.splitext(filename)
+    output_name = with_compression(f"{name}_cleaned{ext}", output_compression(file_path, compression))
+    return os.path.join(output_dir, output_name)
+
+def _clean_stream(
+    pairs: Iterable[Tuple[Any, Any]],
+    source_key: str,
+    executor: Optional[ParallelExecutor],
+    batch_size: int,
+    index: Optional[DedupIndex]
+) -> Iterator[Tuple[Any, bool, Any]]:
+    clean = partial(clean_batch, index=index, source_key=source_key)
+    if executor is None:
+        return chain.from_iterable(map(clean, batched(pairs, batch_size)))
+    # Worker-side counters and CPU time come back with each batch
+    return unwrap_measured(executor.imap_batches(partial(measured_call, clean), pairs, batch_size))
+
+def _record_pairs(file_path: str, byte_range: Optional[Tuple[int, Optional[int]]] = None) -> Iterator[Tuple[Any, Any]]:
+    """
+    (position, record) pairs of any input layout, positioned as in
+    clean_json_file, or of the JSONL lines starting in `byte_range`.
+    """
+    if byte_range is not None:
+        start, end = byte_range
+        for line_start, line_end, record in iter_jsonl_offsets(file_path, align_to_line(file_path, start), end):
+            yield (line_start, line_end), record
+        return
+    layout = detect_layout(file_path)
+    if layout == "object":
+        with open_text(file_path) as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"Unsupported top-level JSON type: {type(data).__name__}")
+        yield 0, data
+    elif layout == "jsonl":
+        for start, end, record in iter_jsonl_offsets(file_path):
+            yield (start, end), record
+    else:
+        yield from enumerate(iter_json_array(file_path))
+
+def clean_records(
+    file_path: str,
+    index: Optional[DedupIndex] = None,
+    source_keys: Optional[Dict[str, str]] = None
+) -> List[Any]:
+    """
+    Clean one file in memory and return its kept records (sharded output).
+    `source_keys` maps input paths to their keys for the dedup index.
+    """
+    source_key = (source_keys or {}).get(file_path, file_path)
+    cleaned = _clean_stream(_record_pairs(file_path), source_key, None, DEFAULT_BATCH_SIZE, index)
+    return [item for _, keep, item in cleaned if keep]
+
+def _resume_checkpoint(file_path: str, output_path: str, config: str) -> Optional[Checkpoint]:
+    """
+    The checkpoint an interrupted run left for cleaning the unchanged
+    `file_path` with `config` into `output_path`, or None if there is none
+    to resume from.
+    """
+    checkpoint = Checkpoint(output_path, fingerprint_for(file_path, config))
+    part_path = output_path + PART_SUFFIX
+    if (
+        is_seekable_output(output_path)
+        and checkpoint.load()
+        and os.path.exists(part_path)
+        and os.path.getsize(part_path) >= checkpoint.output_bytes
+    ):
+        return checkpoint
+    return None
+
+def _clean_jsonl_resumable(
+    file_path: str,
+    output_path: str,
+    executor: Optional[ParallelExecutor],
+    batch_size: int,
+    index: Optional[DedupIndex],
+    config: str,
+    checkpoint_bytes: int,
+    compact: bool = False,
+    byte_range: Optional[Tuple[int, Optional[int]]] = None,
+    source_key: Optional[str] = None
+) -> int:
+    """
+    Clean a JSONL file, or the lines starting in `byte_range` (the start
+    must be a line start), checkpointing the input byte offset every
+    `checkpoint_bytes` so an interrupted run resumes mid-file. Compressed
+    outputs cannot be truncated back to a checkpoint and are not resumed.
+    """
+    start, end = byte_range or (0, None)
     logger = logging.getLogger(__name__)
+    resumable = is_seekable_output(output_path)
+    checkpoint = _resume_checkpoint(file_path, output_path, config)
+    resumed = checkpoint is not None
+    if resumed:
+        # Drop anything written after the last checkpoint
+        os.truncate(output_path + PART_SUFFIX, checkpoint.output_bytes)
+        logger.info(f"Resuming {file_path} from byte {checkpoint.input_offset}")
+    else:
+        checkpoint = Checkpoint(output_path, fingerprint_for(file_path, config))
+        checkpoint.input_offset = start
 
-    try:
-        # Read the input file exactly as it is
-        with open(file_path, 'r', encoding='utf-8') as f:
+    pairs = (
+        ((line_start, line_end), record)
+        for line_start, line_end, record in iter_jsonl_offsets(file_path, checkpoint.input_offset, end)
+    )
+    with JsonlWriter(output_path, append=resumed, compact=compact, keep_partial=resumable) as writer:
+        writer.count = checkpoint.records
+        stream = _clean_stream(pairs, source_key or file_path, executor, batch_size, index)
+        for (_, line_end), keep, item in stream:
+            if keep:
+                writer.write(item)
+            if resumable and line_end - checkpoint.input_offset >= checkpoint_bytes:
+                writer.sync()
+                checkpoint.save(line_end, writer.tell(), writer.count)
+    checkpoint.clear()
+    return writer.count
+
+def clean_json_file(
+    file_path: str,
+    output_dir: str,
+    executor: Optional[ParallelExecutor] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    index: Optional[DedupIndex] = None,
+    config: str = "",
+    checkpoint_bytes: int = DEFAULT_CHECKPOINT_BYTES,
+    compact: bool = False,
+    compression: Optional[str] = KEEP,
+    source_key: Optional[str] = None
+) -> int:
+    """
+    Clean a single JSON or JSONL file and return the number of records written.
+    Records are streamed from disk and written incrementally to a temporary
+    file that is renamed into place when complete; lists are cleaned in
+    batches on `executor` when one is given. Duplicates found in `index` are
+    dropped, and a single-object file that is a duplicate writes no output.
+    JSONL inputs are checkpointed and resumed for the same `config`.
+    `compact` drops pretty-printing and separator spaces; `compression`
+    ("gzip", "zstd", None or "keep") selects the output codec.
+    `source_key` (default: `file_path`) identifies the input in the dedup
+    index; pass the path relative to the input directory.
+    Raises on failure.
+    """
+    layout = detect_layout(file_path)
+    output_path = get_output_path(file_path, output_dir, compression)
+    source_key = source_key or file_path
+
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    if layout == "object":
+        # For single JSON object
+        with open_text(file_path) as f:
             original_data = json.load(f)
+        if not isinstance(original_data, dict):
+            raise ValueError(f"Unsupported top-level JSON type: {type(original_data).__name__}")
+        count(RECORDS_IN)
+        processed_data = clean_item(original_data, index, f"{source_key}:0")
+        if processed_data is None:
+            logging.getLogger(__name__).info(f"Skipped duplicate: {file_path}")
+            return 0
+        with atomic_open(output_path) as f:
+            f.write(get_codec(compact).dumps(processed_data, indent=None if compact else 2))
+        records = 1
+    elif layout == "jsonl":
+        records = _clean_jsonl_resumable(
+            file_path, output_path, executor, batch_size, index, config, checkpoint_bytes, compact,
+            source_key=source_key
+        )
+    else:
+        # For list of JSON objects; non-dict items are maintained as is.
+        # Write processed data in exact same structure as input.
+        cleaned = _clean_stream(enumerate(iter_json_array(file_path)), source_key, executor, batch_size, index)
+        with JsonArrayWriter(output_path, indent=None if compact else 2, compact=compact) as writer:
+            for _, keep, item in cleaned:
+                if keep:
+                    writer.write(item)
+        records = writer.count
+
+    logging.getLogger(__name__).info(f"Processed and saved: {output_path}")
+    return records
+
+def clean_jsonl_range(
+    file_path: str,
+    output_dir: str,
+    part: int,
+    byte_range: Tuple[int, Optional[int]],
+    executor: Optional[ParallelExecutor] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    index: Optional[DedupIndex] = None,
+    config: str = "",
+    checkpoint_bytes: int = DEFAULT_CHECKPOINT_BYTES,
+    compact: bool = False,
+    compression: Optional[str] = KEEP,
+    source_key: Optional[str] = None
+) -> int:
+    """
+    Clean the records of a large JSONL file whose lines start in
+    `byte_range` (range `part` of a sharded run) into their own range
+    output, "<name>_cleaned.rNNNNN.jsonl". merge_shard_outputs joins the
+    ranges back into one file. Checkpointed like whole JSONL files.
+    """
+    output_path = range_output_path(get_output_path(file_path, output_dir, compression), part)
+    os.makedirs(output_dir, exist_ok=True)
+    start, end = byte_range
+    records = _clean_jsonl_resumable(
+        file_path, output_path, executor, batch_size, index, f"{config}#{part}", checkpoint_bytes, compact,
+        (align_to_line(file_path, start), end), source_key
+    )
+    logging.getLogger(__name__).info(f"Processed and saved: {output_path}")
+    return records
 
-        # Process based on original structure
-        if isinstance(original_data, dict):
-            # For single JSON object
-            content = original_data.get("content", "")
-            cleaned_content = clean_text(content)
-            cleaned_content = remove_stopwords(cleaned_content)
-            cleaned_content = remove_repetitive_text(cleaned_content)
-            original_data["content"] = cleaned_content
-            processed_data = original_data
-            
-        elif isinstance(original_data, list):
-            # For list of JSON objects
-            processed_data = []
-            for item in original_data:
-                if isinstance(item, dict):
-                    content = item.get("content", "")
-                    cleaned_content = clean_text(content)
-                    cleaned_content = remove_stopwords(cleaned_content)
-                    cleaned_content = remove_repetitive_text(cleaned_content)
-                    item_copy = item.copy()
-                    item_copy["content"] = cleaned_content
-                    processed_data.append(item_copy)
-                else:
-                    processed_data.append(item)  # Maintain non-dict items as is
-
-        # Create output filename with '_cleaned' suffix
-        filename = os.path.basename(file_path)
-        name, ext = os.path.splitext(filename)
-        output_filename = f"{name}_cleaned{ext}"
-        output_path = os.path.join(output_dir, output_filename)
-
-        # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Write processed data in exact same structure as input
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(processed_data, f, ensure_ascii=False, indent=2)
-
-        logger.info(f"Processed and saved: {output_path}")
+def process_json_file(file_path: str, output_dir: str) -> bool:
+    """
+    Process a single JSON file and save it with '_cleaned' suffix,
+    maintaining exact input structure.
+
+    Returns:
+        bool: True if the file was processed successfully
+    """
+    logger = logging.getLogger(__name__)
 
+    try:
+        clean_json_file(file_path, output_dir)
+        return True
     except Exception as e:
         logger.error(f"Error processing {file_path}: {e}")
+        return False
 
-def process_directory(input_dir: str, output_dir: str) -> None:
+def process_directory(
+    input_dir: str,
+    output_dir: str,
+    workers: Optional[int] = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    split_bytes: int = DEFAULT_SPLIT_BYTES,
+    dedup_index_path: Optional[str] = None,
+    incremental: bool = True,
+    checkpoint_bytes: int = DEFAULT_CHECKPOINT_BYTES,
+    shard_bytes: Optional[int] = None,
+    compact: bool = False,
+    compression: Optional[str] = KEEP,
+    metrics: Optional[Metrics] = None,
+    shard: Optional[ShardSpec] = None,
+    range_bytes: int = RANGE_BYTES
+) -> List[TaskResult]:
     """
-    Process all JSON files in directory, maintaining individual files.
+    Process all JSON and JSONL files in directory, maintaining individual files,
+    or, with `shard_bytes`, packing all records into JSONL shards.
+
+    With `shard`, only this shard's slice of the inputs is processed (see
+    scripts.sharding.plan_work): whole files, and byte ranges of JSONL
+    files larger than `range_bytes`, which get "<name>_cleaned.rNNNNN.jsonl"
+    range outputs. The slice and run options are recorded in
+    `<output_dir>/sharding.json`; merge_shard_outputs combines the output
+    directories of all shards.
+
+    Args:
+        input_dir (str): Directory to search for JSON files
+        output_dir (str): Root of the mirrored output tree
+        workers (int): Worker processes (None = one per CPU core, 1 = serial)
+        batch_size (int): Records per batch when a large file is split
+        split_bytes (int): Files at least this large are split into record batches
+        dedup_index_path (str): Persistent exact-duplicate index; records already
+            in it are skipped (None disables deduplication). Within a run, the
+            first copy in input path order is kept, whatever the worker count
+        incremental (bool): Skip inputs the output manifest shows as unchanged
+            since the last run with the same configuration
+        checkpoint_bytes (int): Input bytes between JSONL resume checkpoints
+        shard_bytes (int): Write `shard-NNNNN.jsonl` files of about this size
+            plus `shard.manifest.json` instead of one output per input. Shards
+            are rebuilt on every run (no incremental skipping or checkpoints).
+        compact (bool): Write compact JSON (no indentation or separator spaces)
+        compression (str): Output compression: "gzip", "zstd", None, or "keep"
+            to match each input (.gz / .zst inputs are read transparently)
+        metrics (Metrics): Collects the "clean" stage's time, records,
+            file bytes and cleaning counters of the files processed
+        shard (ShardSpec): Process only this slice of the inputs
+        range_bytes (int): Byte range size for splitting large JSONL inputs across shards
+
+    Returns:
+        List[TaskResult]: Per-file success/failure
     """
     logger = setup_logging()
-    total_files = 0
 
     if not os.path.exists(input_dir):
         logger.error(f"Input directory not found: {input_dir}")
+        return []
+
+    sharding_options = {
+        "shard_bytes": shard_bytes,
+        "compact": compact,
+        "compression": compression,
+        "dedup": dedup_index_path is not None,
+        "range_bytes": range_bytes,
+    }
+
+    if shard_bytes:
+        index = DedupIndex(dedup_index_path) if dedup_index_path else None
+        paths = sorted(os.path.join(root, file) for root, _, files in os.walk(input_dir)
+                       for file in files if is_json_file(file))
+        items = plan_work(input_dir, paths, shard, range_bytes)
+        with ParallelExecutor(workers) as executor:
+            results = _process_sharded(output_dir, items, executor, batch_size,
+                                       split_bytes, index, shard_bytes, compact, compression, metrics)
+        if shard is not None:
+            write_sharding_info(output_dir, shard, items, sharding_options, all(result.ok for result in results))
+        return _finish(results, index, dedup_index_path, logger)
+
+    pipeline = get_pipeline()
+    config = config_hash({
+        "stages": pipeline.stages,
+        "language": pipeline.language,
+        "max_repeats": pipeline.max_repeats,
+        "dedup": dedup_index_path is not None,
+        "compact": compact,
+        "compression": compression,
+    })
+    manifest = Manifest(output_dir)
+
+    results = []
+    jobs = []
+    current = set()  # Keys of inputs with a part skipped as unchanged
+    paths = [os.path.join(root, file) for root, _, files in os.walk(input_dir) for file in files if is_json_file(file)]
+    items = plan_work(input_dir, paths, shard, range_bytes)
+    for item in items:
+        # Create corresponding output directory structure
+        rel_path = os.path.relpath(os.path.dirname(item.path), input_dir)
+        output_subdir = os.path.join(output_dir, rel_path)
+        key = item.source_key
+        if incremental and manifest.is_current(key, item.path, config):
+            records = manifest.entries[key].get("records", 0)
+            results.append(TaskResult(item.path, True, records=records))
+            current.add(item.key)
+            continue
+        jobs.append((item.path, output_subdir, item))
+    if results:
+        logger.info(f"Skipped {len(results)} unchanged files")
+
+    index = DedupIndex(dedup_index_path) if dedup_index_path else None
+    if index is not None:
+        # Inputs cleaned again from the start are deduplicated afresh; only a
+        # resumed input keeps the index rows of the records it already wrote
+        resumed = {
+            item.key for _, output_subdir, item in jobs
+            if _resume_checkpoint(item.path, _item_output_path(item, output_subdir, compression),
+                                  _item_config(item, config))
+        }
+        for key in sorted({item.key for _, _, item in jobs} - current - resumed):
+            index.forget(key)
+
+    def record(result: TaskResult, output_subdir: str, item: WorkItem) -> None:
+        results.append(result)
+        if result.ok:
+            output_path = _item_output_path(item, output_subdir, compression)
+            outputs = [output_path] if os.path.exists(output_path) else []
+            _add_metrics(metrics, result, outputs)
+            manifest.mark_done(item.source_key, result.path, config, outputs, result.records)
+            manifest.save_periodically()
+
+    def task(item: WorkItem, output_subdir: str) -> Tuple[Any, ...]:
+        if item.part is None:
+            return clean_json_file, item.path, output_subdir
+        return clean_jsonl_range, item.path, output_subdir, item.part, item.byte_range
+
+    # Duplicates are decided in input path order, whatever the worker count:
+    # serial runs clean in that order, parallel runs reserve it in the index first
+    jobs.sort(key=lambda job: (job[2].key, job[2].part or 0))
+    with ParallelExecutor(workers) as executor:
+        if executor.workers > 1 and index is not None:
+            _reserve_first_occurrences([item for _, _, item in jobs], executor, batch_size, split_bytes, index)
+        # Largest files first; huge ones are fanned out as record batches
+        futures = {}
+        for file_path, output_subdir, item in order_by_size(jobs) if executor.workers > 1 else jobs:
+            func, *args = task(item, output_subdir)
+            size = item.end - item.start if item.part is not None else os.path.getsize(file_path)
+            if executor.workers > 1 and size >= split_bytes:
+                try:
+                    with measuring() as measurement:
+                        records = func(
+                            *args, executor, batch_size, index, config, checkpoint_bytes, compact, compression,
+                            item.key
+                        )
+                    measurement["records_out"] = records
+                    record(TaskResult(file_path, True, records=records, metrics=measurement), output_subdir, item)
+                except Exception as e:
+                    record(TaskResult(file_path, False, error=f"{type(e).__name__}: {e}"), output_subdir, item)
+            else:
+                future = executor.submit_task(
+                    func, *args, None, batch_size, index, config, checkpoint_bytes, compact, compression,
+                    item.key
+                )
+                futures[future] = (output_subdir, item)
+        for future in as_completed(futures):
+            record(future.result(), *futures[future])
+    manifest.save()
+    if shard is not None:
+        write_sharding_info(output_dir, shard, items, sharding_options, all(result.ok for result in results))
+    return _finish(results, index, dedup_index_path, logger)
+
+def _item_output_path(item: WorkItem, output_subdir: str, compression: Optional[str]) -> str:
+    """
+    Output file of a work item in per-file mode.
+    """
+    output_path = get_output_path(item.path, output_subdir, compression)
+    return output_path if item.part is None else range_output_path(output_path, item.part)
+
+def _item_config(item: WorkItem, config: str) -> str:
+    """
+    Configuration a work item's checkpoint is written for (see clean_jsonl_range).
+    """
+    return config if item.part is None else f"{config}#{item.part}"
+
+def _reserve_first_occurrences(
+    items: List[WorkItem],
+    executor: ParallelExecutor,
+    batch_size: int,
+    split_bytes: int,
+    index: DedupIndex
+) -> None:
+    """
+    Record in `index`, in item order, the first occurrence of every text
+    the items are deduplicated on, before they are cleaned in parallel.
+    Cleaning then keeps only the reserved copy of each text (see
+    DedupIndex.add), so which duplicate survives does not depend on
+    worker timing. Small files are read whole in the pool; larger ones
+    and byte ranges in record batches. Unreadable inputs are skipped here
+    and reported when cleaned.
+    """
+    logger = logging.getLogger(__name__)
+    small: List[WorkItem] = []
+
+    def flush_small() -> None:
+        source_keys = dict((work.path, work.key) for work in small)
+        paths = [work.path for work in small]
+        for _, entries, _, _ in iter_loaded(paths, partial(file_dedup_entries, source_keys=source_keys), executor):
+            if entries is not None:
+                index.reserve(entries)
+        small.clear()
+
+    for work in items:
+        if work.part is None and os.path.getsize(work.path) < split_bytes:
+            small.append(work)
+            continue
+        flush_small()
+        pairs = _record_pairs(work.path, work.byte_range)
+        try:
+            index.reserve(executor.imap_batches(partial(dedup_entries, source_key=work.key), pairs, batch_size))
+        except Exception as e:
+            logger.warning(f"Could not pre-scan {work.path} for duplicates: {type(e).__name__}: {e}")
+    flush_small()
+
+def _process_sharded(
+    output_dir: str,
+    items: List[WorkItem],
+    executor: ParallelExecutor,
+    batch_size: int,
+    split_bytes: int,
+    index: Optional[DedupIndex],
+    shard_bytes: int,
+    compact: bool = False,
+    compression: Optional[str] = KEEP,
+    metrics: Optional[Metrics] = None
+) -> List[TaskResult]:
+    """
+    Clean the work items in order into shards. Runs of small files are
+    cleaned whole in the pool; files of at least `split_bytes` and byte
+    ranges of split inputs are streamed through the pool in record batches.
+    """
+    logger = logging.getLogger(__name__)
+    results: List[TaskResult] = []
+    if index is not None:
+        # Sharded runs always clean every input from the start
+        for key in sorted({item.key for item in items}):
+            index.forget(key)
+    if executor.workers > 1 and index is not None:
+        _reserve_first_occurrences(items, executor, batch_size, split_bytes, index)
+    if compression == KEEP:
+        compression = None  # Shards mix inputs; "keep" means uncompressed here
+    with ShardWriter(output_dir, target_bytes=shard_bytes, compact=compact, compression=compression) as writer:
+        small: List[Tuple[str, str]] = []
+
+        def flush_small() -> None:
+            source_keys = dict((path, key) for key, path in small)
+            load = partial(clean_records, index=index, source_keys=source_keys)
+            results.extend(write_sharded(writer, small, load, executor))
+            small.clear()
+
+        for work in items:
+            file_path = work.path
+            if work.part is None and (executor.workers == 1 or os.path.getsize(file_path) < split_bytes):
+                small.append((work.key, file_path))
+                continue
+            flush_small()
+            records = 0
+            try:
+                with measuring() as measurement:
+                    pairs = _record_pairs(file_path, work.byte_range)
+                    cleaned = _clean_stream(pairs, work.key, executor, batch_size, index)
+                    for _, keep, item in cleaned:
+                        if keep:
+                            writer.write(item, work.source_key)
+                            records += 1
+                measurement["records_out"] = records
+                results.append(TaskResult(file_path, True, records=records, metrics=measurement))
+            except Exception as e:
+                results.append(TaskResult(file_path, False, records=records, error=f"{type(e).__name__}: {e}"))
+        flush_small()
+    for result in results:
+        _add_metrics(metrics, result, [])
+    if metrics is not None:
+        metrics.stage("clean").bytes_out += sum(shard["bytes"] for shard in writer.shards)
+    logger.info(f"Wrote {writer.count} records to {len(writer.shards)} shards in {output_dir}")
+    return results
+
+def _add_metrics(metrics: Optional[Metrics], result: TaskResult, outputs: List[str]) -> None:
+    """
+    Add a file's measurement to the "clean" stage, with file sizes as bytes in/out.
+    """
+    if metrics is None or result.metrics is None:
         return
+    metrics.stage("clean").add({
+        **result.metrics,
+        "bytes_in": os.path.getsize(result.path),
+        "bytes_out": sum(os.path.getsize(path) for path in outputs),
+    })
+
+def _finish(
+    results: List[TaskResult],
+    index: Optional[DedupIndex],
+    dedup_index_path: Optional[str],
+    logger: logging.Logger
+) -> List[TaskResult]:
+    if index is not None:
+        logger.info(f"Dedup index {dedup_index_path}: {len(index)} unique documents")
+        index.close()
 
-    for root, _, files in os.walk(input_dir):
-        for file in files:
-            if file.endswith(".json"):
-                # Create corresponding output directory structure
-                rel_path = os.path.relpath(root, input_dir)
-                output_subdir = os.path.join(output_dir, rel_path)
-                
-                file_path = os.path.join(root, file)
-                process_json_file(file_path, output_subdir)
-                total_files += 1
-
-    logger.info(f"Total Files Processed: {total_files}")
\ No newline at end of file
+    succeeded, failed = log_results(results, logger)
+    logger.info(f"Total Files Processed: {succeeded} (failed: {failed})")
+    return results
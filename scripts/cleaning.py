@@ -0,0 +1,191 @@
+import re
+import logging
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from .metrics import count, counting
+
+STAGES = ("clean", "stopwords", "repetition")
+
+# Same patterns as utils.clean_text / utils.remove_repetitive_text, compiled once
+_WHITESPACE_RE = re.compile(r'\s+')
+_DISALLOWED_RE = re.compile(r'[^\u0D00-\u0D7F\s.,!?]+')
+_SENTENCE_RE = re.compile(r'[^.!?]*[.!?]')
+
+
+class CleaningPipeline:
+    """
+    Precompiled, fused version of clean_text -> remove_stopwords ->
+    remove_repetitive_text, built once and reused for every record.
+
+    When "clean" and "stopwords" both run, they are fused into one regex
+    pass plus one split: stripping disallowed characters never touches
+    whitespace, so the words are the same as after whitespace collapsing.
+
+    Args:
+        stages (Sequence[str]): Stages to run, any of "clean", "stopwords",
+            "repetition" (always applied in that order)
+        language (str): Stopword language
+        max_repeats (int): Maximum allowed repetitions for a sentence
+    """
+
+    def __init__(self, stages: Sequence[str] = STAGES, language: str = "ml", max_repeats: int = 3):
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown cleaning stages: {sorted(unknown)}")
+        self.stages = tuple(stage for stage in STAGES if stage in stages)
+        self.language = language
+        self.max_repeats = max_repeats
+        self.stop_words: Optional[frozenset] = None
+        if "stopwords" in self.stages:
+            self.stop_words = load_stopwords(language)
+
+    def _clean_and_filter(self, text: str, keep: Optional[Callable[[str], bool]], measure: bool = False) -> Optional[str]:
+        do_clean = "clean" in self.stages
+        do_stopwords = self.stop_words is not None
+
+        if do_clean and do_stopwords:
+            words = _DISALLOWED_RE.sub('', text).split()
+            if measure:
+                count("clean_text.chars_stripped", len(text) - sum(map(len, words)) - max(len(words) - 1, 0))
+            if keep is not None and not keep(' '.join(words)):
+                return None
+            stop_words = self.stop_words
+            kept = [word for word in words if word not in stop_words]
+            if measure:
+                count("remove_stopwords.words_removed", len(words) - len(kept))
+            return ' '.join(kept)
+
+        if do_clean:
+            cleaned = _DISALLOWED_RE.sub('', _WHITESPACE_RE.sub(' ', text)).strip()
+            if measure:
+                count("clean_text.chars_stripped", len(text) - len(cleaned))
+            text = cleaned
+        if keep is not None and not keep(text):
+            return None
+        if do_stopwords:
+            stop_words = self.stop_words
+            words = text.split()
+            kept = [word for word in words if word not in stop_words]
+            if measure:
+                count("remove_stopwords.words_removed", len(words) - len(kept))
+            text = ' '.join(kept)
+        return text
+
+    def _remove_repetition(self, text: str, measure: bool = False) -> str:
+        sentences = _SENTENCE_RE.findall(text)
+        if not sentences:
+            return text  # If no sentence boundaries, return original text
+        sentence_counts = Counter(sentences)
+        max_repeats = self.max_repeats
+        kept = [s for s in sentences if sentence_counts[s] <= max_repeats]
+        if measure:
+            count("remove_repetitive_text.sentences_in", len(sentences))
+            count("remove_repetitive_text.sentences_removed", len(sentences) - len(kept))
+        return " ".join(kept)
+
+    def run(self, text: str, keep: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        Clean one text.
+
+        Args:
+            text (str): Input text
+            keep (Callable): Optional hook called with the cleaned text before
+                stopword and repetition removal; returning False drops the
+                text (used for deduplication). Whitespace in the text passed
+                to the hook may already be normalized.
+
+        Returns:
+            Optional[str]: Cleaned text, or None if `keep` rejected it
+
+        Inside a scripts.metrics collecting() block, characters, words and
+        sentences removed by each stage are counted.
+        """
+        if not isinstance(text, str):
+            logging.warning(f"Non-string input in clean_text: {type(text)}")
+            text = ""
+        measure = counting()
+        if measure:
+            count("clean_text.chars_in", len(text))
+        text = self._clean_and_filter(text, keep, measure)
+        if text is None:
+            if measure:
+                count("dedup.duplicates_dropped")
+            return None
+        if "repetition" in self.stages:
+            text = self._remove_repetition(text, measure)
+        return text
+
+    def clean_many(self, texts: Iterable[str]) -> List[str]:
+        """
+        Clean a batch of texts.
+        """
+        run = self.run
+        return [run(text) for text in texts]
+
+    def reference(self, text: str) -> str:
+        """
+        Run the selected stages through the original functions in utils.
+        """
+        from .utils import clean_text, remove_repetitive_text, remove_stopwords
+
+        if "clean" in self.stages:
+            text = clean_text(text)
+        elif not isinstance(text, str):
+            text = ""
+        if "stopwords" in self.stages:
+            text = remove_stopwords(text, self.language)
+        if "repetition" in self.stages:
+            text = remove_repetitive_text(text, self.max_repeats)
+        return text
+
+    def check_equivalence(self, texts: Iterable[str]) -> List[int]:
+        """
+        Compare the pipeline against the original functions.
+
+        Returns:
+            List[int]: Indices of texts whose outputs differ (empty if equivalent)
+        """
+        return [i for i, text in enumerate(texts) if self.run(text) != self.reference(text)]
+
+
+def load_stopwords(language: str = "ml") -> Optional[frozenset]:
+    """
+    Load the stopword set once. Returns None if it cannot be loaded,
+    in which case stopword removal leaves text unchanged.
+    """
+    try:
+        import stopwordsiso
+        return frozenset(stopwordsiso.stopwords(language))
+    except Exception as e:
+        logging.error(f"Stopword removal failed: {e}")
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_pipeline(stages: Sequence[str] = STAGES, language: str = "ml", max_repeats: int = 3) -> CleaningPipeline:
+    """
+    Return a per-process shared pipeline for the given configuration.
+    """
+    return CleaningPipeline(tuple(stages), language, max_repeats)
+
+
+# Stage selections and edge-case texts covered by the equivalence check
+EQUIVALENCE_STAGES = (STAGES, ("clean",), ("clean", "repetition"), ("stopwords", "repetition"), ("repetition",))
+EQUIVALENCE_TEXTS = ["", "   ", "a. a. a. a. b", "ഒന്ന്. ഒന്ന്. ഒന്ന്. ഒന്ന്. രണ്ട്!", "abc\t\nകേരളം <b>x</b>  ?", None]
+
+
+if __name__ == "__main__":
+    import sys
+    from .jsonio import iter_records
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "test_folder/samplekaggle.jsonl"
+    texts = [r.get("content", r.get("text", "")) for r in iter_records(path) if isinstance(r, dict)]
+    extra = EQUIVALENCE_TEXTS
+    failures = 0
+    for stages in EQUIVALENCE_STAGES:
+        mismatches = CleaningPipeline(stages).check_equivalence(texts + extra)
+        failures += len(mismatches)
+        print(f"{'+'.join(stages)}: {len(texts) + len(extra) - len(mismatches)}/{len(texts) + len(extra)} identical")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,227 @@
+import os
+import re
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DEFAULT_INDEX_NAME = "dedup_index.sqlite"  # File name of an output directory's index
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    hash TEXT PRIMARY KEY,
+    url TEXT,
+    timestamp TEXT,
+    source TEXT
+) WITHOUT ROWID
+"""
+
+
+def normalize_for_hash(text: str) -> str:
+    """
+    Normalize cleaned text before hashing so whitespace and case
+    differences do not hide an exact duplicate.
+    """
+    return _WHITESPACE_RE.sub(' ', text).strip().casefold()
+
+
+def content_hash(text: str) -> str:
+    """
+    Hash of the normalized text, used as the index key.
+    """
+    return hashlib.blake2b(normalize_for_hash(text).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def content_key(text: str) -> Optional[str]:
+    """
+    Index key of a text, or None for text that is empty once normalized
+    (never deduplicated).
+    """
+    normalized = normalize_for_hash(text)
+    if not normalized:
+        return None
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class DedupIndex:
+    """
+    Corpus-wide exact-duplicate index persisted in SQLite.
+
+    Safe to share between pool workers: each process opens its own
+    connection on first use, the database runs in WAL mode, and the
+    check-and-insert is a single atomic INSERT OR IGNORE, so exactly one
+    writer wins for any hash.
+
+    Args:
+        path (str): SQLite database file (created if missing)
+        timeout (float): Seconds to wait on a locked database
+    """
+
+    def __init__(self, path: str, timeout: float = 60.0):
+        self.path = path
+        self.timeout = timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Connections cannot cross process boundaries; workers reconnect
+        return {"path": self.path, "timeout": self.timeout}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"], state["timeout"])
+
+    def __enter__(self) -> "DedupIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            if "source" not in columns:
+                self._conn.execute("ALTER TABLE documents ADD COLUMN source TEXT")
+            self._pid = os.getpid()
+        return self._conn
+
+    def add(self, text: str, url: str = "", timestamp: Optional[str] = None,
+            source: Optional[str] = None) -> bool:
+        """
+        Record a document if its content has not been seen before.
+
+        Args:
+            text (str): Cleaned document text
+            url (str): Source URL, kept for the first occurrence
+            timestamp (str): Document timestamp (defaults to now)
+            source (str): Position of the record in its input (e.g. "file:offset").
+                A record re-added from the same source, as happens when an
+                interrupted run is resumed, still counts as new.
+
+        Returns:
+            bool: True if the content is new, False if it is a duplicate.
+                Empty text (after normalization) is never recorded and is always new.
+        """
+        key = content_key(text)
+        if key is None:
+            return True
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc).isoformat()
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO documents (hash, url, timestamp, source) VALUES (?, ?, ?, ?)",
+            (key, url, str(timestamp), source)
+        )
+        if cursor.rowcount == 1:
+            return True
+        if source is None:
+            return False
+        row = self.conn.execute("SELECT source FROM documents WHERE hash = ?", (key,)).fetchone()
+        return row is not None and row[0] == source
+
+    def reserve(self, entries: Iterable[Tuple[str, str, Optional[str], Optional[str]]]) -> None:
+        """
+        Record (key, url, timestamp, source) entries in order, in one
+        transaction; keys already present keep their first entry. A
+        document later passed to `add` from the reserved source counts as
+        new, and from any other source as a duplicate.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO documents (hash, url, timestamp, source) VALUES (?, ?, ?, ?)",
+                ((key, url, now if timestamp is None else str(timestamp), source)
+                 for key, url, timestamp, source in entries)
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def lookup(self, text: str) -> Optional[Tuple[str, str]]:
+        """
+        Return (first_url, first_timestamp) for a seen document, else None.
+        """
+        row = self.conn.execute(
+            "SELECT url, timestamp FROM documents WHERE hash = ?", (content_hash(text),)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def __contains__(self, text: str) -> bool:
+        return self.lookup(text) is not None
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def forget(self, source_key: str) -> int:
+        """
+        Remove the documents first recorded from input `source_key` (sources
+        "<source_key>:<position>"), so a changed input is deduplicated afresh
+        rather than against the positions of its previous version.
+
+        Returns:
+            int: Documents removed
+        """
+        prefix = f"{source_key}:"
+        cursor = self.conn.execute(
+            "DELETE FROM documents WHERE substr(source, 1, ?) = ?", (len(prefix), prefix)
+        )
+        return cursor.rowcount
+
+    def merge(self, other_path: str) -> int:
+        """
+        Add the documents of another index file that this one lacks. For a
+        hash in both, this index's first occurrence is kept.
+
+        Returns:
+            int: Documents added
+        """
+        before = len(self)
+        self.conn.execute("ATTACH DATABASE ? AS other", (other_path,))
+        try:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO documents (hash, url, timestamp, source) "
+                "SELECT hash, url, timestamp, source FROM other.documents"
+            )
+        finally:
+            self.conn.execute("DETACH DATABASE other")
+        return len(self) - before
+
+    def compact(self) -> None:
+        """
+        Fold the write-ahead log back into the database and reclaim free pages.
+        """
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("VACUUM")
+
+    def close(self) -> None:
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._pid = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or compact a dedup index")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("path", help="SQLite index file")
+    args = parser.parse_args()
+
+    with DedupIndex(args.path) as index:
+        if args.command == "compact":
+            index.compact()
+        print(f"{args.path}: {len(index)} documents, {os.path.getsize(args.path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
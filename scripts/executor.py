@@ -0,0 +1,173 @@
+import os
+import logging
+import multiprocessing
+import traceback
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .metrics import measuring
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_SPLIT_BYTES = 64 * 1024 * 1024  # Files above this are split into record batches
+
+
+class TaskResult:
+    """
+    Outcome of one unit of work, reported back from a worker to the parent.
+    `metrics` is the task's measurement (see scripts.metrics.sample), if taken.
+    """
+
+    def __init__(self, path: str, ok: bool, records: int = 0, error: Optional[str] = None,
+                 metrics: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.ok = ok
+        self.records = records
+        self.error = error
+        self.metrics = metrics
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else f"failed: {self.error}"
+        return f"TaskResult({self.path!r}, {status}, records={self.records})"
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    """
+    Resolve the worker count; None or 0 means one worker per CPU core.
+    """
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def order_by_size(jobs: Sequence[Tuple[str, Any]]) -> List[Tuple[str, Any]]:
+    """
+    Order (path, ...) jobs largest file first so the long tasks start early.
+    Ties keep their original order.
+    """
+    def size(job: Tuple[str, Any]) -> int:
+        try:
+            return os.path.getsize(job[0])
+        except OSError:
+            return 0
+
+    return sorted(jobs, key=size, reverse=True)
+
+
+def run_task(func: Callable[..., int], path: str, *args: Any) -> TaskResult:
+    """
+    Run `func(path, *args)` and wrap its record count or exception in a TaskResult,
+    together with the task's time and metrics counters.
+    Must stay module-level so it can be pickled into worker processes.
+    """
+    try:
+        with measuring() as measurement:
+            records = func(path, *args) or 0
+        measurement["records_out"] = records
+        return TaskResult(path, True, records=records, metrics=measurement)
+    except Exception as e:
+        logging.getLogger(__name__).debug(traceback.format_exc())
+        return TaskResult(path, False, error=f"{type(e).__name__}: {e}")
+
+
+def batched(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """
+    Yield lists of up to `batch_size` consecutive items.
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class _InlineExecutor:
+    """
+    Executor stand-in that runs every call immediately in the current process.
+    Used for workers=1 so the serial path needs no pickling or forking.
+    """
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        pass
+
+
+class ParallelExecutor:
+    """
+    Process pool shared by the file-level entry points.
+
+    Args:
+        workers (int): Number of worker processes (None = CPU count, 1 = run inline)
+        start_method (str): Multiprocessing start method for the pool
+            (None = platform default; "spawn" is safe to use from threads)
+    """
+
+    def __init__(self, workers: Optional[int] = None, start_method: Optional[str] = None):
+        self.workers = resolve_workers(workers)
+        if self.workers == 1:
+            self._pool = _InlineExecutor()
+        else:
+            context = multiprocessing.get_context(start_method) if start_method else None
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def __enter__(self) -> "ParallelExecutor":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        return self._pool.submit(fn, *args)
+
+    def submit_task(self, func: Callable[..., int], path: str, *args: Any) -> Future:
+        """
+        Submit a file task; the future resolves to a TaskResult.
+        """
+        return self._pool.submit(run_task, func, path, *args)
+
+    def imap_batches(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        items: Iterable[Any],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_pending: Optional[int] = None
+    ) -> Iterator[Any]:
+        """
+        Apply `fn` to consecutive batches of `items` in the pool and yield the
+        flattened results in input order. At most `max_pending` batches are in
+        flight, so the input iterable is consumed lazily.
+        """
+        max_pending = max_pending or self.workers * 2
+        pending: deque = deque()
+        for batch in batched(items, batch_size):
+            pending.append(self._pool.submit(fn, batch))
+            while len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def log_results(results: Iterable[TaskResult], logger: logging.Logger) -> Tuple[int, int]:
+    """
+    Log failed tasks and return (succeeded, failed) counts.
+    """
+    succeeded = failed = 0
+    for result in results:
+        if result.ok:
+            succeeded += 1
+        else:
+            failed += 1
+            logger.error(f"Error processing {result.path}: {result.error}")
+    return succeeded, failed
@@ -0,0 +1,228 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import argparse
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .manifest import config_hash
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+EVICT_TO = 0.9  # Evict down to this fraction of max_bytes
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+
+
+def normalize_input(text: str) -> str:
+    """
+    Normalize model input before hashing: NFC, collapsed whitespace, stripped.
+    Case is kept, since it can change model output.
+    """
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def cache_key(model: str, params: Dict[str, Any], text: str) -> str:
+    """
+    Key for one model call: model path, generation parameters and input.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(config_hash(params).encode('ascii'))
+    digest.update(b'\0')
+    digest.update(normalize_input(text).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class InferenceCache:
+    """
+    On-disk key-value cache for model outputs, persisted in SQLite.
+
+    Entries are evicted least-recently-used first once the stored values
+    exceed `max_bytes`. Like DedupIndex it is safe to share between pool
+    workers: each process opens its own connection, the database runs in
+    WAL mode and writes are single transactions. Hit/miss counters are per
+    process.
+
+    Args:
+        path (str): SQLite database file (created if missing)
+        max_bytes (int): Size budget for cached values
+        timeout (float): Seconds to wait on a locked database
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, timeout: float = 60.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Connections cannot cross process boundaries; workers reconnect
+        return {"path": self.path, "max_bytes": self.max_bytes, "timeout": self.timeout}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"], state["max_bytes"], state["timeout"])
+
+    def __enter__(self) -> "InferenceCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(_INDEX)
+            self._pid = os.getpid()
+        return self._conn
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """
+        Look up keys and mark the found entries as recently used.
+
+        Returns:
+            Dict[str, str]: Cached value per found key
+        """
+        unique = list(dict.fromkeys(keys))
+        found: Dict[str, str] = {}
+        for start in range(0, len(unique), 500):  # Stay under SQLite's variable limit
+            chunk = unique[start:start + 500]
+            marks = ','.join('?' * len(chunk))
+            found.update(self.conn.execute(
+                f"SELECT key, value FROM entries WHERE key IN ({marks})", chunk
+            ).fetchall())
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+            )
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[str, str]) -> None:
+        """
+        Store values, then evict the least recently used entries if the
+        cache is over budget.
+        """
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, value, len(value.encode('utf-8')), now) for key, value in items.items()]
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def put(self, key: str, value: str) -> None:
+        self.put_many({key: value})
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT TOTAL(size) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes * EVICT_TO
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def cached(
+        self,
+        model: str,
+        params: Dict[str, Any],
+        texts: Sequence[str],
+        compute: Callable[[List[str]], List[Optional[str]]]
+    ) -> List[Optional[str]]:
+        """
+        Return outputs for `texts`, calling `compute` once on the misses only.
+        Identical inputs within the batch are computed once. None results
+        (failures) are returned but not cached.
+        """
+        keys = [cache_key(model, params, text) for text in texts]
+        found = self.get_many(keys)
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            computed = compute(list(missing.values()))
+            new = {key: value for key, value in zip(missing, computed) if value is not None}
+            self.put_many(new)
+            found.update(new)
+        return [found.get(key) for key in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self.conn.execute("SELECT COUNT(*), TOTAL(size) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": int(size),
+        }
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.1%} hit rate), {stats['entries']} entries, {stats['bytes']} bytes")
+
+    def close(self) -> None:
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._pid = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or clear an inference cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("path", help="SQLite cache file")
+    args = parser.parse_args()
+
+    with InferenceCache(args.path) as cache:
+        if args.command == "clear":
+            cache.conn.execute("DELETE FROM entries")
+            cache.conn.execute("VACUUM")
+        print(f"{args.path}: {cache.summary()}")
+
+
+if __name__ == "__main__":
+    main()
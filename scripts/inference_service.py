@@ -0,0 +1,486 @@
+import os
+import sys
+import stat
+import time
+import queue
+import logging
+import secrets
+import tempfile
+import argparse
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ADDRESS_ENV = "INFERENCE_SERVICE"
+KEY_SUFFIX = ".key"  # The server's random authkey is written next to its socket
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_LATENCY = 0.02  # Seconds the first request may wait for others to join its batch
+
+BatchFn = Callable[[List[str]], List[Any]]
+
+
+def runtime_dir() -> str:
+    """
+    Per-user directory for the socket and key: $XDG_RUNTIME_DIR/data-wrangling,
+    or data-wrangling-<uid> in the temp directory. Created with mode 0700;
+    raises PermissionError if it exists but is not private to this user.
+    """
+    if sys.platform == "win32":
+        path = os.path.join(tempfile.gettempdir(), "data-wrangling")  # The temp directory is per-user
+        os.makedirs(path, exist_ok=True)
+        return path
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    path = os.path.join(base, "data-wrangling") if base else \
+        os.path.join(tempfile.gettempdir(), f"data-wrangling-{os.getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory owned by the current user with mode 0700")
+    return path
+
+
+def default_address() -> str:
+    """
+    Unix socket in runtime_dir(), or a named pipe on Windows.
+    """
+    if sys.platform == "win32":
+        return r"\\.\pipe\data-wrangling-inference"
+    return os.path.join(runtime_dir(), "inference.sock")
+
+
+def _is_pipe(address: str) -> bool:
+    return address.startswith("\\\\")
+
+
+def key_path(address: str) -> str:
+    """
+    File holding the authkey of the server at `address`.
+    """
+    if _is_pipe(address):
+        return os.path.join(runtime_dir(), "inference" + KEY_SUFFIX)
+    return address + KEY_SUFFIX
+
+
+def write_key(path: str, key: bytes) -> None:
+    """
+    Write an authkey to a new file readable only by this user.
+    """
+    if os.path.lexists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key.hex().encode("ascii"))
+
+
+def read_key(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return bytes.fromhex(f.read().decode("ascii"))
+
+
+class _Request:
+    __slots__ = ("reply", "request_id", "texts", "arrived")
+
+    def __init__(self, reply: Callable[[Tuple], None], request_id: int, texts: List[str]):
+        self.reply = reply
+        self.request_id = request_id
+        self.texts = texts
+        self.arrived = time.monotonic()
+
+
+class BatchStats:
+    """
+    Batch-size and queue-depth statistics for one model.
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.requests = 0
+        self.items = 0
+        self.max_batch = 0
+        self.max_queue_depth = 0
+        self.queue_depth = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def record(self, requests: List[_Request], items: int, queue_depth: int, started: float, finished: float) -> None:
+        self.batches += 1
+        self.requests += len(requests)
+        self.items += items
+        self.max_batch = max(self.max_batch, items)
+        self.queue_depth = queue_depth
+        self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+        self.busy_seconds += finished - started
+        self.wait_seconds += sum(started - request.arrived for request in requests)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "items": self.items,
+            "mean_batch": self.items / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "mean_wait_ms": 1000 * self.wait_seconds / self.requests if self.requests else 0.0,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+
+class _ModelWorker:
+    """
+    Owns one model: loads it once, then merges queued requests into
+    batches of up to `max_batch` texts, waiting at most `max_latency`
+    after the oldest request arrived.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], BatchFn], max_batch: int, max_latency: float):
+        self.name = name
+        self.loader = loader
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self.stats = BatchStats()
+        self.thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        batch = [first]
+        size = len(first.texts)
+        deadline = first.arrived + self.max_latency
+        while size < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            size += len(request.texts)
+        return batch, False
+
+    def _run(self) -> None:
+        logging.info(f"Loading model '{self.name}'")
+        load_error = None
+        try:
+            batch_fn = self.loader()
+        except Exception as e:
+            logging.error(f"Failed to load model '{self.name}': {e}")
+            batch_fn = None
+            load_error = str(e)
+        stopping = False
+        while not stopping:
+            first = self.queue.get()
+            if first is None:
+                break
+            batch, stopping = self._collect(first)
+            texts = [text for request in batch for text in request.texts]
+            started = time.monotonic()
+            try:
+                if batch_fn is None:
+                    raise RuntimeError(f"Model '{self.name}' failed to load: {load_error}")
+                outputs = batch_fn(texts)
+                if len(outputs) != len(texts):
+                    raise RuntimeError(f"Model '{self.name}' returned {len(outputs)} outputs for {len(texts)} inputs")
+                offset = 0
+                for request in batch:
+                    n = len(request.texts)
+                    request.reply((request.request_id, "ok", outputs[offset:offset + n]))
+                    offset += n
+            except Exception as e:
+                logging.error(f"Batch of {len(texts)} failed on '{self.name}': {e}")
+                for request in batch:
+                    request.reply((request.request_id, "error", str(e)))
+            self.stats.record(batch, len(texts), self.queue.qsize(), started, time.monotonic())
+
+
+class InferenceServer:
+    """
+    Local inference service hosting each model once for all pipeline workers.
+
+    Clients connect over a Unix socket (a named pipe on Windows), send
+    (request_id, model, texts) and get (request_id, status, outputs) back.
+    Concurrent requests for the same model are merged into dynamic batches.
+
+    Connections are authenticated before anything is unpickled. Unless an
+    `authkey` is given, a random one is generated and written to
+    key_path(address), a file only this user can read, where clients on
+    the same account pick it up; the file is removed when the server stops.
+
+    Args:
+        loaders (Dict[str, Callable]): Model name -> zero-argument loader
+            returning a batch function (list of texts -> list of outputs)
+        address (str): Socket path or pipe name (default: in the private runtime_dir())
+        authkey (bytes): Shared secret checked on connect (default: random)
+        max_batch (int): Texts per batch before it is dispatched early
+        max_latency (float): Longest a request waits for others to join its batch
+    """
+
+    def __init__(
+        self,
+        loaders: Dict[str, Callable[[], BatchFn]],
+        address: Optional[str] = None,
+        authkey: Optional[bytes] = None,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_latency: float = DEFAULT_MAX_LATENCY
+    ):
+        self.address = address or default_address()
+        self.authkey = authkey
+        self.key_path = None if authkey else key_path(self.address)
+        self.workers = {
+            name: _ModelWorker(name, loader, max_batch, max_latency) for name, loader in loaders.items()
+        }
+        self._stopped = threading.Event()
+        self._listener: Optional[Listener] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: worker.stats.as_dict() for name, worker in self.workers.items()}
+
+    def _handle(self, conn: Connection) -> None:
+        send_lock = threading.Lock()
+
+        def reply(message: Tuple) -> None:
+            with send_lock:
+                try:
+                    conn.send(message)
+                except OSError:
+                    pass  # Client went away
+
+        try:
+            while not self._stopped.is_set():
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    break
+                request_id, command, payload = message
+                if command == "__stats__":
+                    reply((request_id, "ok", self.stats()))
+                elif command == "__shutdown__":
+                    reply((request_id, "ok", None))
+                    self.stop()
+                elif command in self.workers:
+                    worker = self.workers[command]
+                    worker.queue.put(_Request(reply, request_id, list(payload)))
+                    worker.stats.max_queue_depth = max(worker.stats.max_queue_depth, worker.queue.qsize())
+                else:
+                    reply((request_id, "error", f"Unknown model '{command}'"))
+        finally:
+            conn.close()
+
+    def serve_forever(self) -> None:
+        """
+        Start the batchers and accept clients until stopped.
+        """
+        if not _is_pipe(self.address) and os.path.lexists(self.address):
+            info = os.lstat(self.address)
+            if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+                raise FileExistsError(f"{self.address} exists and is not this user's socket")
+            os.remove(self.address)  # Stale socket from an earlier run
+        if self.key_path is not None:
+            self.authkey = secrets.token_bytes(32)
+            write_key(self.key_path, self.authkey)
+        for worker in self.workers.values():
+            worker.thread.start()
+        self._listener = Listener(self.address, authkey=self.authkey)
+        logging.info(f"Inference service listening on {self.address} ({', '.join(self.workers)})")
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError):
+                    if self._stopped.is_set():
+                        break
+                    continue
+                except Exception as e:  # Failed authentication
+                    logging.warning(f"Rejected connection: {e}")
+                    continue
+                if self._stopped.is_set():
+                    conn.close()
+                    break
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self._listener.close()
+            if self.key_path is not None and os.path.exists(self.key_path):
+                os.remove(self.key_path)
+            for worker in self.workers.values():
+                worker.queue.put(None)
+            logging.info(f"Inference service stopped: {self.stats()}")
+
+    def stop(self) -> None:
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        try:
+            Client(self.address, authkey=self.authkey).close()  # Wake the blocking accept()
+        except Exception:
+            pass
+
+
+class InferenceClient:
+    """
+    Thin, thread-safe client for InferenceServer. One connection per
+    process; reconnects after a fork.
+
+    Args:
+        address (str): Socket path or pipe name (default: $INFERENCE_SERVICE
+            or the default address)
+        authkey (bytes): Shared secret (default: read from key_path(address))
+        connect_timeout (float): Seconds to keep retrying while the server starts
+    """
+
+    def __init__(self, address: Optional[str] = None, authkey: Optional[bytes] = None,
+                 connect_timeout: float = 30.0):
+        self.address = address or os.environ.get(ADDRESS_ENV) or default_address()
+        self.authkey = authkey
+        self.connect_timeout = connect_timeout
+        self._conn: Optional[Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"address": self.address, "authkey": self.authkey, "connect_timeout": self.connect_timeout}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["address"], state["authkey"], state["connect_timeout"])
+
+    def __enter__(self) -> "InferenceClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _connection(self) -> Connection:
+        if self._conn is None or self._pid != os.getpid():
+            deadline = time.monotonic() + self.connect_timeout
+            while True:
+                try:
+                    authkey = self.authkey or read_key(key_path(self.address))
+                    self._conn = Client(self.address, authkey=authkey)
+                    break
+                except AuthenticationError:
+                    # The key file may still be a previous server's, about to be replaced
+                    if self.authkey is not None or time.monotonic() >= deadline:
+                        raise
+                    time.sleep(0.1)
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if time.monotonic() >= deadline:
+                        raise
+                    time.sleep(0.1)
+            self._pid = os.getpid()
+        return self._conn
+
+    def _request(self, command: str, payload: Any) -> Any:
+        with self._lock:
+            conn = self._connection()
+            self._next_id += 1
+            request_id = self._next_id
+            conn.send((request_id, command, payload))
+            reply_id, status, result = conn.recv()
+        if reply_id != request_id:
+            raise RuntimeError(f"Out-of-order reply {reply_id} for request {request_id}")
+        if status != "ok":
+            raise RuntimeError(f"Inference service error: {result}")
+        return result
+
+    def call(self, model: str, texts: List[str]) -> List[Any]:
+        """
+        Run `model` on `texts`; the server may batch them with other clients' texts.
+        """
+        if not texts:
+            return []
+        return self._request(model, list(texts))
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request("__stats__", None)
+
+    def shutdown(self) -> None:
+        self._request("__shutdown__", None)
+        self.close()
+
+    def close(self) -> None:
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._pid = None
+
+
+def fill_mask_loader(model: str) -> Callable[[], BatchFn]:
+    """
+    Loader for a Hugging Face fill-mask pipeline returning the top sequence.
+    """
+    def load() -> BatchFn:
+        from transformers import pipeline
+
+        fill_mask = pipeline("fill-mask", model=model)
+
+        def run(texts: List[str]) -> List[str]:
+            predictions = fill_mask(texts, batch_size=len(texts))
+            if len(texts) == 1:
+                predictions = [predictions]
+            return [p[0]["sequence"] for p in predictions]
+        return run
+    return load
+
+
+def back_translation_loader(ml_en_path: str, en_ml_path: str, batch_size: int,
+                            quantize: bool = False) -> Callable[[], BatchFn]:
+    """
+    Loader for the MarianMT back-translation models in test_folder/b_t.py.
+    """
+    def load() -> BatchFn:
+        from test_folder.b_t import BackTranslator
+
+        return BackTranslator(ml_en_path, en_ml_path, batch_size=batch_size, quantize=quantize).back_translate_many
+    return load
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Shared local inference service")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Host models and batch requests")
+    serve.add_argument("--address", default=None)
+    serve.add_argument("--fill-mask", default=None, metavar="MODEL", help="e.g. ai4bharat/IndicBART")
+    serve.add_argument("--ml-en", default=None, help="Malayalam -> English MarianMT model")
+    serve.add_argument("--en-ml", default=None, help="English -> Malayalam MarianMT model")
+    serve.add_argument("--translation-batch", type=int, default=16)
+    serve.add_argument("--quantize", action="store_true", help="Serve dynamic-int8-quantized MarianMT models")
+    serve.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    serve.add_argument("--max-latency-ms", type=float, default=DEFAULT_MAX_LATENCY * 1000)
+    for name in ("stats", "shutdown"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--address", default=None)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        loaders: Dict[str, Callable[[], BatchFn]] = {}
+        if args.fill_mask:
+            loaders["fill-mask"] = fill_mask_loader(args.fill_mask)
+        if args.ml_en and args.en_ml:
+            loaders["back-translate"] = back_translation_loader(args.ml_en, args.en_ml, args.translation_batch,
+                                                               args.quantize)
+        if not loaders:
+            parser.error("no models configured (use --fill-mask and/or --ml-en/--en-ml)")
+        server = InferenceServer(loaders, args.address, max_batch=args.max_batch,
+                                 max_latency=args.max_latency_ms / 1000)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
+    else:
+        with InferenceClient(args.address, connect_timeout=0) as client:
+            if args.command == "stats":
+                for model, stats in client.stats().items():
+                    print(f"{model}: {stats}")
+            else:
+                client.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import io
+import json
+import gzip
+from typing import Any, BinaryIO, Optional, TextIO, Tuple
+
+try:
+    import orjson
+except ImportError:  # Optional faster JSON backend
+    orjson = None
+
+WRITE_BUFFER_SIZE = 1 << 20  # Bytes buffered before a write reaches the file or compressor
+READ_BUFFER_SIZE = 1 << 20
+
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+SUFFIX_FOR = {name: suffix for suffix, name in COMPRESSION_SUFFIXES.items()}
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+KEEP = "keep"  # Output compression setting: same as the input
+
+
+def split_compression(path: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a compression suffix off a path: "a.jsonl.gz" -> ("a.jsonl", "gzip").
+    """
+    lowered = path.lower()
+    for suffix, name in COMPRESSION_SUFFIXES.items():
+        if lowered.endswith(suffix):
+            return path[:-len(suffix)], name
+    return path, None
+
+
+def is_json_file(filename: str) -> bool:
+    """
+    True for .json / .jsonl files, compressed or not.
+    """
+    return split_compression(filename)[0].endswith(('.json', '.jsonl'))
+
+
+def output_compression(input_path: str, compression: Optional[str] = KEEP) -> Optional[str]:
+    """
+    Resolve an output compression setting: KEEP ("keep") uses the input's.
+    """
+    return split_compression(input_path)[1] if compression == KEEP else compression
+
+
+def with_compression(path: str, compression: Optional[str]) -> str:
+    """
+    Append the suffix for `compression` ("gzip", "zstd" or None) to a path.
+    """
+    if compression is None:
+        return path
+    if compression not in SUFFIX_FOR:
+        raise ValueError(f"Unknown compression: {compression}")
+    return path + SUFFIX_FOR[compression]
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("Reading or writing .zst files requires the 'zstandard' package") from e
+    return zstandard
+
+
+def open_binary(path: str, mode: str = 'rb', level: Optional[int] = None, compression: str = "auto") -> BinaryIO:
+    """
+    Open a file for binary reading ('rb') or writing ('wb', 'ab'), compressing
+    or decompressing according to its suffix. Streams use large buffers.
+
+    Args:
+        path (str): File path
+        mode (str): 'rb', 'wb' or 'ab'
+        level (int): Compression level (codec default if None)
+        compression (str): "gzip", "zstd", None, or "auto" to use the suffix
+            (pass it explicitly for temporary names such as "a.jsonl.gz.part")
+    """
+    if compression == "auto":
+        _, compression = split_compression(path)
+    if mode not in ('rb', 'wb', 'ab'):
+        raise ValueError(f"Unsupported mode: {mode}")
+    writing = mode != 'rb'
+    if compression is None:
+        return open(path, mode, buffering=WRITE_BUFFER_SIZE if writing else READ_BUFFER_SIZE)
+    if level is None:
+        level = DEFAULT_LEVELS[compression]
+
+    if compression == "gzip":
+        if writing:
+            # Appending starts a new gzip member, which readers concatenate
+            return io.BufferedWriter(gzip.open(path, mode, compresslevel=level), WRITE_BUFFER_SIZE)
+        return io.BufferedReader(gzip.open(path, 'rb'), READ_BUFFER_SIZE)
+
+    zstandard = _zstandard()
+    if writing:
+        raw = open(path, mode)
+        return io.BufferedWriter(
+            zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=True), WRITE_BUFFER_SIZE
+        )
+    raw = open(path, 'rb')
+    return io.BufferedReader(
+        zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True), READ_BUFFER_SIZE
+    )
+
+
+def open_text(path: str, mode: str = 'r', level: Optional[int] = None, compression: str = "auto") -> TextIO:
+    """
+    UTF-8 text counterpart of open_binary ('r', 'w' or 'a').
+    """
+    if compression == "auto":
+        _, compression = split_compression(path)
+    if compression is None:
+        return open(path, mode, encoding='utf-8')
+    return io.TextIOWrapper(open_binary(path, mode[0] + 'b', level, compression), encoding='utf-8')
+
+
+def seek_forward(f: BinaryIO, offset: int) -> None:
+    """
+    Move a read stream to `offset`, reading and discarding data where the
+    stream (e.g. a zstd decompressor) cannot seek.
+    """
+    if f.seekable():
+        f.seek(offset)
+        return
+    remaining = offset
+    while remaining > 0:
+        block = f.read(min(remaining, READ_BUFFER_SIZE))
+        if not block:
+            break
+        remaining -= len(block)
+
+
+def is_seekable_output(path: str) -> bool:
+    """
+    True if byte positions in the written file match the serialized data
+    (needed to truncate and resume a partial output).
+    """
+    return split_compression(path)[1] is None
+
+
+class JsonCodec:
+    """
+    JSON serialization used by the readers and writers.
+
+    The default keeps the repo's existing output byte for byte:
+    `json.dumps(..., ensure_ascii=False)` with ", " / ": " separators.
+    `compact=True` drops the separator spaces and, when orjson is
+    installed, serializes with it. Parsing uses orjson when available and
+    falls back to the json module for input orjson rejects (NaN, huge ints).
+
+    Args:
+        compact (bool): Compact separators (and the orjson fast path)
+        use_orjson (bool): Allow orjson when installed
+    """
+
+    def __init__(self, compact: bool = False, use_orjson: bool = True):
+        self.compact = compact
+        self.use_orjson = use_orjson and orjson is not None
+        self._separators = (',', ':') if compact else None
+
+    def dumps(self, obj: Any, indent: Optional[int] = None) -> str:
+        return json.dumps(obj, ensure_ascii=False, indent=indent, separators=self._separators if indent is None else None)
+
+    def dumps_line(self, obj: Any) -> bytes:
+        """
+        One JSONL line (with trailing newline) as UTF-8 bytes.
+        """
+        if self.compact and self.use_orjson:
+            try:
+                return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+            except TypeError:
+                pass  # Non-str keys, big ints, ...: fall back to json
+        return (json.dumps(obj, ensure_ascii=False, separators=self._separators) + '\n').encode('utf-8')
+
+    def loads(self, data: Any) -> Any:
+        if self.use_orjson:
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass  # Re-parse with json for its NaN/bigint support and error messages
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data).decode('utf-8')
+        return json.loads(data)
+
+
+DEFAULT_CODEC = JsonCodec()
+COMPACT_CODEC = JsonCodec(compact=True)
+
+
+def get_codec(compact: bool = False) -> JsonCodec:
+    return COMPACT_CODEC if compact else DEFAULT_CODEC
+
+
+def loads(data: Any) -> Any:
+    return DEFAULT_CODEC.loads(data)
+
@@ -0,0 +1,434 @@
+import os
+import re
+import json
+import mmap
+import codecs
+import logging
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, TextIO, Tuple
+
+from .io_codecs import (
+    DEFAULT_CODEC,
+    READ_BUFFER_SIZE,
+    get_codec,
+    open_binary,
+    open_text,
+    seek_forward,
+    split_compression
+)
+
+READ_CHUNK_SIZE = 1 << 20  # Bytes read per refill of the array parser buffer
+
+_WHITESPACE = ' \t\n\r'
+_WHITESPACE_RE = re.compile(rb'[ \t\n\r]*')
+_STRUCTURE_RE = re.compile(rb'[\[\]{}"]')
+_SCALAR_END_RE = re.compile(rb'[,\]\s]')
+_QUOTE, _BACKSLASH, _COMMA, _OPEN_ARRAY, _CLOSE_ARRAY = b'"\\,[]'
+_OPENERS = b'[{'
+
+PART_SUFFIX = '.part'  # Suffix of outputs that are still being written
+
+logger = logging.getLogger(__name__)
+
+
+def detect_layout(path: str) -> str:
+    """
+    Detect how records are laid out in a file. A ".gz" / ".zst" suffix
+    is looked through, so "a.jsonl.gz" is JSONL.
+
+    Returns:
+        str: "jsonl" for JSON Lines, "array" for a top-level JSON array,
+             "object" for any other single JSON document
+    """
+    if split_compression(path)[0].lower().endswith('.jsonl'):
+        return "jsonl"
+    with open_text(path) as f:
+        while True:
+            chunk = f.read(4096)
+            if not chunk:
+                return "object"
+            stripped = chunk.lstrip(_WHITESPACE)
+            if stripped:
+                return "array" if stripped[0] == '[' else "object"
+
+
+def iter_jsonl(path: str, errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Any]:
+    """
+    Yield one parsed record per non-empty line of a JSONL file.
+    Malformed lines are logged with their line number and skipped.
+
+    Args:
+        path (str): JSONL file
+        errors (list): Optional list collecting (line_number, message) of bad lines
+    """
+    loads = DEFAULT_CODEC.loads
+    with open_text(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except json.JSONDecodeError as e:
+                logger.error(f"{path}:{line_number}: malformed JSON line skipped: {e}")
+                if errors is not None:
+                    errors.append((line_number, str(e)))
+
+
+def iter_jsonl_offsets(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int, Any]]:
+    """
+    Yield (line_start, line_end, record) for each JSONL record, reading
+    from byte offset `start` and stopping at the first line that starts at
+    or after `end`. Offsets let a caller checkpoint and resume mid-file.
+    Malformed lines are logged with their line number and skipped.
+    Offsets of compressed files are positions in the decompressed stream.
+    """
+    loads = DEFAULT_CODEC.loads
+    first_line = 1 if start == 0 else None  # Line number at `start`, counted on the first error
+    with open_binary(path) as f:
+        seek_forward(f, start)
+        offset = start
+        for lines_read, raw in enumerate(f):
+            if end is not None and offset >= end:
+                break
+            line_start, offset = offset, offset + len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                yield line_start, offset, loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                if first_line is None:
+                    first_line = count_lines(path, start) + 1
+                logger.error(f"{path}:{first_line + lines_read}: malformed JSON line skipped: {e}")
+
+
+def count_lines(path: str, end: int) -> int:
+    """
+    Number of line breaks in the first `end` bytes (decompressed) of a file.
+    """
+    lines = 0
+    with open_binary(path) as f:
+        remaining = end
+        while remaining > 0:
+            block = f.read(min(remaining, READ_BUFFER_SIZE))
+            if not block:
+                break
+            lines += block.count(b'\n')
+            remaining -= len(block)
+    return lines
+
+
+class _ValueScan:
+    """
+    Resumable search for the end of one JSON value starting at `start` in
+    a byte buffer. Only brackets and string delimiters are inspected
+    (a string's closing quote is found with bytes.find), so a value is
+    scanned once however many buffer refills it spans. UTF-8 continuation bytes
+    never look like ASCII, so scanning bytes is safe.
+    """
+
+    __slots__ = ("start", "pos", "depth", "in_string")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.pos = start
+        self.depth = 0
+        self.in_string = False
+
+    def rebase(self, shift: int) -> None:
+        self.start -= shift
+        self.pos -= shift
+
+    def find_end(self, buf: Any, eof: bool) -> Optional[int]:
+        """
+        Offset just past the value, or None if the buffer ends first.
+        """
+        size = len(buf)
+        pos = self.pos
+        if pos == self.start:
+            first = buf[pos]
+            if first == _QUOTE:
+                self.in_string = True
+                pos += 1
+            elif first in _OPENERS:
+                self.depth = 1
+                pos += 1
+            else:
+                # Number, true, false or null: runs up to a delimiter
+                match = _SCALAR_END_RE.search(buf, pos)
+                if match is not None:
+                    return match.start()
+                return size if eof else None
+
+        while True:
+            if self.in_string:
+                end = buf.find(b'"', pos)
+                if end < 0:
+                    self.pos = size
+                    return None
+                pos = end + 1
+                # A quote preceded by an odd run of backslashes is escaped
+                backslash = end - 1
+                while buf[backslash] == _BACKSLASH:
+                    backslash -= 1
+                if (end - backslash) % 2 == 0:
+                    continue
+                self.in_string = False
+                if self.depth == 0:
+                    return pos
+                continue
+            match = _STRUCTURE_RE.search(buf, pos)
+            if match is None:
+                self.pos = size
+                return None
+            char = buf[match.start()]
+            pos = match.end()
+            if char == _QUOTE:
+                self.in_string = True
+            elif char in _OPENERS:
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    return pos
+
+
+def iter_json_array(path: str, chunk_size: int = READ_CHUNK_SIZE, use_mmap: bool = False) -> Iterator[Any]:
+    """
+    Incrementally yield the items of a top-level JSON array without loading
+    the whole file.
+
+    The file is read as bytes in `chunk_size` blocks. The end of each item
+    is found by a bracket/string scan that resumes across blocks, and only
+    then is the item decoded (with orjson when installed), so memory is
+    bounded by the largest single item plus one block. With `use_mmap` an
+    uncompressed file is memory-mapped and scanned in place instead.
+
+    Raises:
+        ValueError: If the file is not a well-formed JSON array
+    """
+    loads = DEFAULT_CODEC.loads
+    compressed = split_compression(path)[1] is not None
+    with open_binary(path) as f:
+        mapped = None
+        if use_mmap and not compressed and os.path.getsize(path) > 0:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield from _parse_array(path, f, mapped, chunk_size, loads)
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+
+def _parse_array(path: str, f: BinaryIO, mapped: Optional[mmap.mmap], chunk_size: int,
+                 loads: Callable[[Any], Any]) -> Iterator[Any]:
+    consumed_lines = 1  # Line number of buf[0], for error messages
+    buf: Any = mapped if mapped is not None else b''
+    eof = mapped is not None
+
+    def refill(buf: Any, pos: int) -> Tuple[Any, int, bool]:
+        nonlocal consumed_lines
+        if mapped is not None:
+            return buf, pos, True
+        consumed_lines += buf.count(b'\n', 0, pos)
+        chunk = f.read(chunk_size)
+        return buf[pos:] + chunk, 0, not chunk
+
+    def fail(message: str, buf: Any, pos: int) -> ValueError:
+        line = consumed_lines + buf.count(b'\n', 0, pos)
+        return ValueError(f"{path}:{line}: {message}")
+
+    def skip_whitespace(buf: Any, pos: int, eof: bool) -> Tuple[Any, int, bool]:
+        pos = _WHITESPACE_RE.match(buf, pos).end()
+        while pos >= len(buf) and not eof:
+            buf, pos, eof = refill(buf, pos)
+            pos = _WHITESPACE_RE.match(buf, pos).end()
+        return buf, pos, eof
+
+    buf, pos, eof = refill(buf, 0)
+    if buf[:3] == codecs.BOM_UTF8:
+        pos = 3
+    buf, pos, eof = skip_whitespace(buf, pos, eof)
+    if pos >= len(buf) or buf[pos] != _OPEN_ARRAY:
+        raise fail("expected a top-level JSON array", buf, pos)
+    pos += 1
+    expect_item = True
+    first = True
+
+    while True:
+        buf, pos, eof = skip_whitespace(buf, pos, eof)
+        if pos >= len(buf):
+            raise fail("unterminated JSON array", buf, pos)
+
+        char = buf[pos]
+        if char == _CLOSE_ARRAY and (first or not expect_item):
+            buf, pos, eof = skip_whitespace(buf, pos + 1, eof)
+            if pos < len(buf):
+                raise fail("trailing data after JSON array", buf, pos)
+            return
+        if not expect_item:
+            if char != _COMMA:
+                raise fail(f"expected ',' or ']' but found {chr(char)!r}", buf, pos)
+            pos += 1
+            expect_item = True
+            continue
+
+        scan = _ValueScan(pos)
+        end = scan.find_end(buf, eof)
+        while end is None:
+            if eof:
+                raise fail("malformed array item: unterminated value", buf, scan.start)
+            shift = scan.start
+            buf, _, eof = refill(buf, shift)
+            scan.rebase(shift)
+            end = scan.find_end(buf, eof)
+
+        try:
+            item = loads(buf[scan.start:end])
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise fail(f"malformed array item: {getattr(e, 'msg', e)}", buf, scan.start) from e
+        yield item
+        pos = end
+        expect_item = False
+        first = False
+
+
+def iter_records(path: str, errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Any]:
+    """
+    Yield records from a JSONL file, the items of a top-level JSON array,
+    or a single JSON object, without reading everything up front.
+    """
+    layout = detect_layout(path)
+    if layout == "jsonl":
+        yield from iter_jsonl(path, errors)
+    elif layout == "array":
+        yield from iter_json_array(path)
+    else:
+        with open_text(path) as f:
+            yield json.load(f)
+
+
+@contextmanager
+def atomic_open(path: str) -> Iterator[TextIO]:
+    """
+    Open `path` for text writing via a temporary file that replaces the
+    target only if the block completes, so a killed process never leaves
+    a half-written output under the final name; the temporary file is
+    removed if the block raises. A ".gz" / ".zst" target is compressed.
+    """
+    temp_path = path + PART_SUFFIX
+    try:
+        with open_text(temp_path, 'w', compression=split_compression(path)[1]) as f:
+            yield f
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+
+
+class JsonlWriter:
+    """
+    Incrementally write records as JSON Lines.
+
+    With `atomic=True` records go to `<path>.part`, which is renamed to
+    `path` when the writer closes without an error; on error the partial
+    file is removed, or left in place with `keep_partial=True` for writes
+    that are checkpointed. `append=True` continues an existing part file
+    (used to resume from a checkpoint). Output is buffered in large blocks
+    and compressed if `path` ends in ".gz" or ".zst"; `compact=True` writes
+    records without separator spaces (via orjson when installed).
+    """
+
+    def __init__(self, path: str, atomic: bool = True, append: bool = False, compact: bool = False,
+                 keep_partial: bool = False):
+        self.path = path
+        self.atomic = atomic
+        self.append = append
+        self.keep_partial = keep_partial
+        self.temp_path = path + PART_SUFFIX if atomic else path
+        self.count = 0
+        self._codec = get_codec(compact)
+        self._file: Optional[BinaryIO] = None
+
+    def __enter__(self) -> "JsonlWriter":
+        compression = split_compression(self.path)[1]
+        self._file = open_binary(self.temp_path, 'ab' if self.append else 'wb', compression=compression)
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        self.close(commit=exc_type is None)
+
+    def _write(self, text: str) -> None:
+        self._file.write(text.encode('utf-8'))
+
+    def write(self, record: Any) -> None:
+        self._file.write(self._codec.dumps_line(record))
+        self.count += 1
+
+    def write_line(self, line: bytes) -> None:
+        """
+        Append an already serialized record (one JSON line, newline included).
+        """
+        self._file.write(line)
+        self.count += 1
+
+    def tell(self) -> int:
+        """
+        Bytes written to the output so far (uncompressed).
+        """
+        return self._file.tell()
+
+    def sync(self) -> None:
+        """
+        Flush buffered output to disk.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _finish(self) -> None:
+        pass
+
+    def close(self, commit: bool = True) -> None:
+        if self._file is None:
+            return
+        if commit:
+            self._finish()
+        self._file.close()
+        self._file = None
+        if commit and self.atomic:
+            os.replace(self.temp_path, self.path)
+        elif self.atomic and not self.keep_partial:
+            os.remove(self.temp_path)
+
+
+class JsonArrayWriter(JsonlWriter):
+    """
+    Incrementally write a top-level JSON array. The output is byte-identical
+    to `json.dump(items, f, ensure_ascii=False, indent=indent)`; with
+    `indent=None` and `compact=True`, to the same call with (',', ':')
+    separators.
+    """
+
+    def __init__(self, path: str, indent: Optional[int] = 2, atomic: bool = True, compact: bool = False):
+        super().__init__(path, atomic=atomic, compact=compact)
+        self.indent = indent
+        self._newline = '\n' + ' ' * indent if indent is not None else ''
+        self._item_separator = ',' if indent is not None or compact else ', '
+
+    def __enter__(self) -> "JsonArrayWriter":
+        super().__enter__()
+        self._write('[')
+        return self
+
+    def write(self, record: Any) -> None:
+        text = self._codec.dumps(record, indent=self.indent)
+        if self.indent is not None:
+            text = text.replace('\n', self._newline)
+        separator = self._newline if self.count == 0 else self._item_separator + self._newline
+        self._write(separator + text)
+        self.count += 1
+
+    def _finish(self) -> None:
+        self._write('\n]' if self.count and self.indent is not None else ']')
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import hashlib
+from typing import Any, Dict
+
+from .jsonio import atomic_open
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2  # Output paths relative to the output directory
+CHECKPOINT_SUFFIX = ".ckpt"
+DEFAULT_CHECKPOINT_BYTES = 16 * 1024 * 1024  # Input bytes between JSONL checkpoints
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a file, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """
+    Stable hash of a processing configuration.
+    """
+    encoded = json.dumps(config, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def input_stat(path: str) -> Dict[str, Any]:
+    """
+    Size and mtime (ns) of an input file.
+    """
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class Manifest:
+    """
+    Record of processed inputs kept in `<output_dir>/manifest.json`.
+
+    An entry is trusted only if its output file exists and the input's
+    size, mtime and configuration hash still match. If only the mtime
+    changed, the content hash decides. Output paths are stored relative to
+    `output_dir`, so the manifest stays valid from any working directory.
+    Saved atomically.
+
+    Args:
+        output_dir (str): Output directory holding the manifest
+    """
+
+    def __init__(self, output_dir: str):
+        self.root = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._last_save = time.monotonic()
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = data.get("files", {})
+            if data.get("version", 1) < MANIFEST_VERSION:
+                # Version 1 stored output paths relative to the working directory
+                for entry in self.entries.values():
+                    entry["outputs"] = [os.path.relpath(output, output_dir) for output in entry.get("outputs", [])]
+
+    def is_current(self, key: str, input_path: str, config: str) -> bool:
+        """
+        True if `input_path` was already processed unchanged with `config`.
+        """
+        entry = self.entries.get(key)
+        if not entry or entry.get("config") != config:
+            return False
+        if not all(os.path.exists(os.path.join(self.root, output)) for output in entry.get("outputs", [])):
+            return False
+        stat = input_stat(input_path)
+        if stat["size"] != entry.get("size"):
+            return False
+        if stat["mtime_ns"] == entry.get("mtime_ns"):
+            return True
+        if file_sha256(input_path) != entry.get("sha256"):
+            return False
+        entry["mtime_ns"] = stat["mtime_ns"]  # Touched but unchanged
+        return True
+
+    def mark_done(self, key: str, input_path: str, config: str, outputs: list, records: int) -> None:
+        """
+        Record a successfully processed input.
+        """
+        entry = input_stat(input_path)
+        entry.update({
+            "sha256": file_sha256(input_path),
+            "config": config,
+            "outputs": [os.path.relpath(output, self.root) for output in outputs],
+            "records": records,
+        })
+        self.entries[key] = entry
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with atomic_open(self.path) as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, ensure_ascii=False, indent=2)
+        self._last_save = time.monotonic()
+
+    def save_periodically(self, interval: float = 30.0) -> None:
+        """
+        Save if more than `interval` seconds passed since the last save.
+        """
+        if time.monotonic() - self._last_save >= interval:
+            self.save()
+
+
+class Checkpoint:
+    """
+    Byte-offset checkpoint for resuming a JSONL input mid-file, stored as
+    `<output>.ckpt` next to the partial output.
+
+    Attributes:
+        input_offset (int): Input bytes fully processed
+        output_bytes (int): Valid bytes in the partial output
+        records (int): Records written so far
+    """
+
+    def __init__(self, output_path: str, fingerprint: Dict[str, Any]):
+        self.path = output_path + CHECKPOINT_SUFFIX
+        self.fingerprint = fingerprint
+        self.input_offset = 0
+        self.output_bytes = 0
+        self.records = 0
+
+    def load(self) -> bool:
+        """
+        Load a checkpoint written for the same input and configuration.
+
+        Returns:
+            bool: True if a usable checkpoint was found
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get("fingerprint") != self.fingerprint:
+            return False
+        self.input_offset = state["input_offset"]
+        self.output_bytes = state["output_bytes"]
+        self.records = state["records"]
+        return True
+
+    def save(self, input_offset: int, output_bytes: int, records: int) -> None:
+        self.input_offset = input_offset
+        self.output_bytes = output_bytes
+        self.records = records
+        with atomic_open(self.path) as f:
+            json.dump({
+                "fingerprint": self.fingerprint,
+                "input_offset": input_offset,
+                "output_bytes": output_bytes,
+                "records": records,
+            }, f)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def fingerprint_for(input_path: str, config: str) -> Dict[str, Any]:
+    """
+    Identity of an input + configuration that a checkpoint is valid for.
+    """
+    fingerprint = input_stat(input_path)
+    fingerprint["config"] = config
+    return fingerprint
+
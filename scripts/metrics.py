@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import cProfile
+import pstats
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+PROMETHEUS_PREFIX = "data_wrangling"
+CPU_KEY = "_cpu_seconds"  # Worker CPU time carried back in a counter set
+RECORDS_IN = "records_in"  # Counter lifted into a sample's records_in field
+
+_local = threading.local()
+
+
+def count(name: str, value: float = 1) -> None:
+    """
+    Add to a counter of the innermost active `collecting()` block in this
+    thread. Does nothing (and costs almost nothing) when none is active.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1][name] += value
+
+
+def counting() -> bool:
+    """
+    True if counters are being collected in this thread.
+    """
+    return bool(getattr(_local, "stack", None))
+
+
+@contextmanager
+def collecting() -> Iterator[Counter]:
+    """
+    Collect `count()` calls made in this thread. Counts also roll up into
+    an enclosing collecting() block when this one ends.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    counters: Counter = Counter()
+    stack.append(counters)
+    try:
+        yield counters
+    finally:
+        stack.pop()
+        if stack:
+            stack[-1].update(counters)
+
+
+def merge_counts(counters: Dict[str, float]) -> None:
+    """
+    Add counters gathered elsewhere (e.g. in a worker process) to this thread's.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].update(counters)
+
+
+def record_bytes(record: Any) -> int:
+    """
+    UTF-8 size of a record's text: "content" or "text", or the chunk texts
+    of a chunked record.
+    """
+    if not isinstance(record, dict):
+        return 0
+    text = record.get("content", record.get("text"))
+    if isinstance(text, str):
+        return len(text.encode("utf-8"))
+    if hasattr(text, "utf8_size"):  # scripts.tokens.TokenizedText; not imported, it needs numpy
+        return text.utf8_size()
+    chunks = record.get("chunks")
+    if isinstance(chunks, list):
+        return sum(len(chunk.get("text", "").encode("utf-8")) for chunk in chunks if isinstance(chunk, dict))
+    return 0
+
+
+def sample(wall_seconds: float, cpu_seconds: float, counters: Dict[str, float], **fields: Any) -> Dict[str, Any]:
+    """
+    Picklable measurement of one unit of work, as merged by StageMetrics.add.
+    """
+    counters = dict(counters)
+    cpu_seconds += counters.pop(CPU_KEY, 0.0)
+    if RECORDS_IN in counters:
+        fields.setdefault("records_in", counters.pop(RECORDS_IN))
+    return {"wall_seconds": wall_seconds, "cpu_seconds": cpu_seconds, "counters": counters, **fields}
+
+
+@contextmanager
+def measuring() -> Iterator[Dict[str, Any]]:
+    """
+    Time a block (wall and this thread's CPU) while collecting its counters.
+    The yielded dict is filled with a `sample` when the block ends.
+    """
+    result: Dict[str, Any] = {}
+    wall, cpu = time.perf_counter(), time.thread_time()
+    with collecting() as counters:
+        yield result
+    result.update(sample(time.perf_counter() - wall, time.thread_time() - cpu, counters))
+
+
+def measured_call(fn: Callable[[List[Any]], List[Any]], batch: List[Any]) -> List[Tuple[List[Any], Dict[str, Any]]]:
+    """
+    Run a batch function and return [(outputs, sample)], so the measurement
+    travels back from a worker through ParallelExecutor.imap_batches.
+    """
+    with measuring() as measurement:
+        outputs = fn(batch)
+    measurement.update(
+        records_in=len(batch),
+        records_out=len(outputs),
+        bytes_in=sum(map(record_bytes, batch)),
+        bytes_out=sum(map(record_bytes, outputs)),
+    )
+    return [(outputs, measurement)]
+
+
+def unwrap_measured(results: Iterable[Tuple[List[Any], Dict[str, Any]]], stage: Optional["StageMetrics"] = None) -> Iterator[Any]:
+    """
+    Flatten measured_call results, adding each sample to `stage`, or, without
+    one, folding its counters and CPU time into this thread's collection.
+    """
+    for outputs, measurement in results:
+        if stage is not None:
+            stage.add(measurement)
+        else:
+            merge_counts({
+                **measurement["counters"],
+                RECORDS_IN: measurement.get("records_in", 0),
+                CPU_KEY: measurement["cpu_seconds"],
+            })
+        yield from outputs
+
+
+class StageMetrics:
+    """
+    Totals for one stage: wall and CPU time spent in its work, records and
+    text bytes in and out, and named event counters (e.g. characters
+    stripped). Wall time adds up across workers, so it can exceed the
+    elapsed time of a parallel run.
+    """
+
+    FIELDS = ("wall_seconds", "cpu_seconds", "records_in", "records_out", "bytes_in", "bytes_out")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.records_in = 0
+        self.records_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.counters: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, measurement: Dict[str, Any]) -> None:
+        with self._lock:
+            for field in self.FIELDS:
+                setattr(self, field, getattr(self, field) + measurement.get(field, 0))
+            self.counters.update(measurement.get("counters", {}))
+
+    @property
+    def drop_rate(self) -> float:
+        return 1 - self.records_out / self.records_in if self.records_in else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        data["drop_rate"] = self.drop_rate
+        data["counters"] = dict(sorted(self.counters.items()))
+        return data
+
+
+class Metrics:
+    """
+    Per-stage metrics for one run, exported as JSON and Prometheus text.
+
+    Use as a context manager around the run to record total wall and
+    process CPU time; with `trace_memory=True` the run's peak Python heap
+    is measured with tracemalloc (this slows the run down noticeably, and
+    only covers this process, not worker pools).
+
+    Args:
+        trace_memory (bool): Track peak memory with tracemalloc
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, StageMetrics] = {}
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_memory_bytes: Optional[int] = None
+        self._start: Optional[Tuple[float, float]] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "Metrics":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._start = (time.perf_counter(), time.process_time())
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        wall, cpu = self._start
+        self.wall_seconds = time.perf_counter() - wall
+        self.cpu_seconds = time.process_time() - cpu
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def stage(self, name: str) -> StageMetrics:
+        with self._lock:
+            if name not in self.stages:
+                self.stages[name] = StageMetrics(name)
+            return self.stages[name]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Metrics in the Prometheus text exposition format (for the node
+        exporter's textfile collector or a push gateway).
+        """
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[Dict[str, str], Any]]) -> None:
+            full_name = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+
+        metric("run_wall_seconds", "gauge", "Elapsed time of the run.", [({}, self.wall_seconds)])
+        metric("run_cpu_seconds", "gauge", "CPU time of the main process.", [({}, self.cpu_seconds)])
+        if self.peak_memory_bytes is not None:
+            metric("run_peak_memory_bytes", "gauge", "Peak traced Python memory.", [({}, self.peak_memory_bytes)])
+        stages = list(self.stages.values())
+        for field, kind, help_text in (
+            ("wall_seconds", "counter", "Wall time spent in stage work."),
+            ("cpu_seconds", "counter", "CPU time spent in stage work."),
+            ("records_in", "counter", "Records entering the stage."),
+            ("records_out", "counter", "Records leaving the stage."),
+            ("bytes_in", "counter", "Text bytes entering the stage."),
+            ("bytes_out", "counter", "Text bytes leaving the stage."),
+            ("drop_rate", "gauge", "Fraction of records the stage dropped."),
+        ):
+            name = f"stage_{field}" if kind == "gauge" else f"stage_{field}_total"
+            metric(name, kind, help_text, [({"stage": stage.name}, getattr(stage, field)) for stage in stages])
+        events = [({"stage": stage.name, "event": event}, value)
+                  for stage in stages for event, value in sorted(stage.counters.items())]
+        if events:
+            metric("stage_events_total", "counter", "Named per-stage event counts.", events)
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> Tuple[str, str]:
+        """
+        Write `path` as JSON and the same metrics as Prometheus text next to
+        it (`<path without extension>.prom`).
+
+        Returns:
+            Tuple[str, str]: The JSON and Prometheus file paths
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        prom_path = os.path.splitext(path)[0] + ".prom"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        with open(prom_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        return path, prom_path
+
+    def summary(self) -> str:
+        parts = []
+        for stage in self.stages.values():
+            parts.append(
+                f"{stage.name}: {stage.records_in}->{stage.records_out} records "
+                f"({stage.drop_rate:.1%} dropped), {stage.wall_seconds:.2f}s wall, {stage.cpu_seconds:.2f}s CPU"
+            )
+        return "; ".join(parts)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@contextmanager
+def profiled(output_path: Optional[str] = None, sort: str = "cumulative", limit: int = 30) -> Iterator[Optional[cProfile.Profile]]:
+    """
+    Profile a block with cProfile, printing the top `limit` functions and
+    saving the raw stats to `output_path` (for snakeviz, pstats, ...).
+    With `output_path` None no profiler is installed, so the block can be
+    sampled from outside instead (`py-spy record -- python main.py profile ...`).
+    """
+    if output_path is None:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(output_path)
+        pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
@@ -0,0 +1,217 @@
+import zlib
+import difflib
+from functools import lru_cache
+from typing import Dict, Hashable, List, Optional, Sequence, Set
+
+import numpy as np
+
+MERSENNE_PRIME = (1 << 31) - 1
+MAX_HASH = np.uint64(MERSENNE_PRIME)
+MAX_CELLS = 1 << 22  # Shingles x permutations computed per vectorized block
+
+
+def shingle_hashes(text: str, shingle_size: int = 3) -> np.ndarray:
+    """
+    Hash the distinct character shingles of a text to 32-bit integers.
+    Texts shorter than one shingle hash as a single shingle.
+    """
+    if len(text) <= shingle_size:
+        grams = {text}
+    else:
+        grams = {text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)}
+    return np.fromiter(
+        (zlib.crc32(gram.encode('utf-8')) for gram in grams),
+        dtype=np.uint64,
+        count=len(grams)
+    )
+
+
+@lru_cache(maxsize=None)
+def _permutation_params(num_perm: int, seed: int):
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+    b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+    return a, b
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures from character shingles using universal
+    hashing (a*x + b) mod p over a batch of texts at once.
+
+    Args:
+        num_perm (int): Number of hash permutations (signature length)
+        shingle_size (int): Characters per shingle
+        seed (int): Seed for the permutation parameters
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a, self._b = _permutation_params(num_perm, seed)
+
+    def signatures(self, texts: Sequence[str], max_cells: int = MAX_CELLS) -> np.ndarray:
+        """
+        Compute signatures for a batch of texts.
+
+        Returns:
+            np.ndarray: uint64 array of shape (len(texts), num_perm)
+        """
+        signatures = np.full((len(texts), self.num_perm), MAX_HASH, dtype=np.uint64)
+        if not texts:
+            return signatures
+
+        per_text = [shingle_hashes(text, self.shingle_size) for text in texts]
+        lengths = np.array([len(h) for h in per_text], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        hashes = np.concatenate(per_text)
+
+        # Process the concatenated shingles in blocks to bound memory; each
+        # block is reduced per text with one reduceat and merged into the result.
+        block = max(1, max_cells // self.num_perm)
+        for lo in range(0, len(hashes), block):
+            hi = min(lo + block, len(hashes))
+            permuted = (hashes[lo:hi, None] * self._a + self._b) % MAX_HASH
+            first = int(np.searchsorted(starts, lo, side='right')) - 1
+            last = int(np.searchsorted(starts, hi, side='left')) - 1
+            offsets = np.clip(starts[first:last + 1], lo, hi) - lo
+            block_min = np.minimum.reduceat(permuted, offsets, axis=0)
+            np.minimum(signatures[first:last + 1], block_min, out=signatures[first:last + 1])
+        return signatures
+
+
+def estimate_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """
+    Estimate Jaccard similarity as the fraction of agreeing signature slots.
+    """
+    return float(np.mean(sig_a == sig_b))
+
+
+class LSHIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures by banding: two
+    signatures become candidates if all rows of any band agree.
+
+    Args:
+        bands (int): Number of bands
+        rows (int): Signature slots per band (bands * rows <= num_perm)
+    """
+
+    def __init__(self, bands: int = 32, rows: int = 4):
+        self.bands = bands
+        self.rows = rows
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        if len(signature) < self.bands * self.rows:
+            raise ValueError(
+                f"Signature length {len(signature)} is smaller than bands * rows "
+                f"({self.bands} * {self.rows})"
+            )
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def insert(self, key: Hashable, signature: np.ndarray) -> None:
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band_key, []).append(key)
+
+    def query(self, signature: np.ndarray) -> Set[Hashable]:
+        candidates: Set[Hashable] = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band_key, ()))
+        return candidates
+
+
+class NearDuplicateIndex:
+    """
+    Near-duplicate filter that can be kept alive across a whole corpus.
+
+    Candidates come from LSH; with `verify=True` each candidate is confirmed
+    with difflib's SequenceMatcher ratio, so `similarity_threshold` means the
+    same as in the original quadratic scan. With `verify=False` the MinHash
+    Jaccard estimate is compared against the threshold instead and kept
+    texts are not stored.
+
+    Args:
+        similarity_threshold (float): Similarity at or above which a text is a duplicate
+        num_perm (int): Number of hash permutations
+        shingle_size (int): Characters per shingle
+        bands (int): LSH bands
+        rows (int): Signature slots per band
+        verify (bool): Confirm candidates with difflib
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.8,
+        num_perm: int = 128,
+        shingle_size: int = 3,
+        bands: int = 32,
+        rows: int = 4,
+        verify: bool = True,
+        seed: int = 1
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.verify = verify
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, seed=seed)
+        self.lsh = LSHIndex(bands=bands, rows=rows)
+        self._texts: Dict[Hashable, str] = {}
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._next_key = 0
+
+    def __len__(self) -> int:
+        return self._next_key
+
+    def _is_duplicate(self, text: str, signature: np.ndarray, candidates: Set[Hashable]) -> bool:
+        threshold = self.similarity_threshold
+        for key in sorted(candidates):
+            if self.verify:
+                # Cheap upper bounds first; ratio() only runs if they pass
+                matcher = difflib.SequenceMatcher(None, text, self._texts[key])
+                if (matcher.real_quick_ratio() >= threshold
+                        and matcher.quick_ratio() >= threshold
+                        and matcher.ratio() >= threshold):
+                    return True
+            elif estimate_jaccard(signature, self._signatures[key]) >= threshold:
+                return True
+        return False
+
+    def add_batch(self, texts: Sequence[str]) -> List[bool]:
+        """
+        Check a batch of texts in order against everything kept so far
+        (including earlier texts of the same batch). Non-duplicates are kept.
+
+        Returns:
+            List[bool]: True for each text that is a near-duplicate
+        """
+        signatures = self.hasher.signatures(texts)
+        flags = []
+        for text, signature in zip(texts, signatures):
+            duplicate = self._is_duplicate(text, signature, self.lsh.query(signature))
+            if not duplicate:
+                key = self._next_key
+                self._next_key += 1
+                self.lsh.insert(key, signature)
+                if self.verify:
+                    self._texts[key] = text
+                else:
+                    self._signatures[key] = signature
+            flags.append(duplicate)
+        return flags
+
+
+def minhash_near_duplicates(
+    sentences: Sequence[str],
+    similarity_threshold: float = 0.8,
+    index: Optional[NearDuplicateIndex] = None
+) -> List[str]:
+    """
+    Drop near-duplicate sentences, keeping the first occurrence.
+    Pass a shared `index` to deduplicate across documents.
+    """
+    if index is None:
+        index = NearDuplicateIndex(similarity_threshold=similarity_threshold)
+    flags = index.add_batch(sentences)
+    return [sentence for sentence, duplicate in zip(sentences, flags) if not duplicate]
@@ -0,0 +1,40 @@
+from array import array
+from collections import Counter
+from typing import Sequence
+
+import numpy as np
+
+HASH_BASE = 1_000_003  # Multiplier of the polynomial window hash
+
+
+def window_counts(ids: Sequence[int], length: int) -> np.ndarray:
+    """
+    Count, for every window of `length` consecutive IDs, how often that
+    exact window occurs in the sequence. Vectorized: window hashes are
+    built by Horner's rule over shifted slices (wrapping mod 2^64), grouped
+    with np.unique, and every window is checked against its group's first
+    window so hash collisions fall back to counting the windows exactly.
+
+    Returns:
+        np.ndarray: occurrence count of the window starting at each position
+    """
+    n = len(ids)
+    if length <= 0 or n < length:
+        return np.zeros(0, dtype=np.int64)
+    values = np.frombuffer(ids, dtype=np.int64) if isinstance(ids, array) else np.asarray(ids, dtype=np.int64)
+    values = values.astype(np.uint64) + np.uint64(1)
+    windows = n - length + 1
+
+    base = np.uint64(HASH_BASE)
+    hashes = np.zeros(windows, dtype=np.uint64)
+    for k in range(length):
+        hashes = hashes * base + values[k:k + windows]
+
+    _, first, inverse, counts = np.unique(hashes, return_index=True, return_inverse=True, return_counts=True)
+    representative = first[inverse]
+    for k in range(length):
+        if not np.array_equal(values[k:k + windows], values[representative + k]):
+            keys = [tuple(ids[i:i + length]) for i in range(windows)]
+            exact = Counter(keys)
+            return np.array([exact[key] for key in keys], dtype=np.int64)
+    return counts[inverse]
@@ -0,0 +1,460 @@
+import os
+import queue
+import logging
+import importlib
+import importlib.util
+import threading
+from contextlib import nullcontext
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .executor import DEFAULT_BATCH_SIZE, ParallelExecutor, batched
+from .io_codecs import is_json_file
+from .jsonio import JsonlWriter, iter_records
+from .manifest import MANIFEST_NAME
+from .metrics import Metrics, StageMetrics, measured_call, unwrap_measured
+from .shards import MANIFEST_SUFFIX, ShardWriter
+
+if TYPE_CHECKING:
+    from .boilerplate import BoilerplateFilter
+    from .dedup_index import DedupIndex
+    from .quality import QualityFilter
+
+
+class StageSpec:
+    """
+    Registry entry of a pipeline stage: where its batch function lives and
+    which third-party modules it needs. Nothing is imported until `load`, so
+    importing the pipeline (and the CLI) stays fast.
+
+    Args:
+        name (str): Stage name
+        target (str): "module:function" of the batch function, the module
+            relative to this package
+        requires (Sequence[str]): Third-party modules the stage imports
+    """
+
+    def __init__(self, name: str, target: str, requires: Sequence[str] = ()):
+        self.name = name
+        self.target = target
+        self.requires = tuple(requires)
+
+    def missing(self) -> List[str]:
+        """
+        Required modules that are not installed.
+        """
+        return [module for module in self.requires if importlib.util.find_spec(module) is None]
+
+    def check(self) -> None:
+        """
+        Raise ImportError if a required module is not installed.
+        """
+        missing = self.missing()
+        if missing:
+            raise ImportError(f"Pipeline stage {self.name} needs {', '.join(missing)}, which is not installed")
+
+    def load(self) -> Callable[..., List[Any]]:
+        """
+        Import the stage's module and return its batch function.
+        """
+        self.check()
+        module, function = self.target.split(":")
+        return getattr(importlib.import_module(module, __package__), function)
+
+
+# Every stage in pipeline order
+STAGE_REGISTRY: Dict[str, StageSpec] = {spec.name: spec for spec in [
+    StageSpec("quality", ".quality:quality_stage", ["numpy"]),
+    StageSpec("boilerplate", ".boilerplate:boilerplate_stage", ["numpy"]),
+    StageSpec("clean", ".clean_text:clean_stage"),
+    StageSpec("repetition", ".repetition:repetition_stage", ["numpy"]),
+    StageSpec("near-dup", ".repetition:near_duplicate_stage", ["numpy"]),
+    StageSpec("chunk", ".chunk:chunk_stage", ["numpy"]),
+]}
+STAGE_NAMES = tuple(STAGE_REGISTRY)
+# Boilerplate removal reads the inputs twice, so it only runs when selected
+DEFAULT_STAGES = tuple(name for name in STAGE_NAMES if name != "boilerplate")
+DEFAULT_QUEUE_SIZE = 8  # Batches buffered between two stages
+START_METHOD = "spawn"  # Stage pools start from threads, where forking is unsafe
+POLL_SECONDS = 0.1  # How often blocked stages check whether the run was aborted
+
+_END = object()  # Marks the end of a queue's stream
+
+
+def check_stages(names: Sequence[str]) -> None:
+    """
+    Raise ImportError for the first of the named stages whose required
+    modules are not installed, before any stage module is imported.
+    """
+    for name in STAGE_NAMES:
+        if name in names:
+            STAGE_REGISTRY[name].check()
+
+
+def as_text_record(record: Any) -> Any:
+    """
+    The record with a tokenized "content" (scripts.tokens.TokenizedText)
+    rebuilt into a string; other items are returned as is. Applied wherever
+    records leave the pipeline.
+    """
+    if isinstance(record, dict):
+        content = record.get("content")
+        # Duck-typed, so stages that never tokenize do not import numpy
+        if hasattr(content, "utf8_size"):
+            return {**record, "content": content.text()}
+    return record
+
+
+class PipelineAborted(Exception):
+    """
+    Raised in a stage thread when another stage has failed or the consumer stopped.
+    """
+
+
+class Stage:
+    """
+    One step of a StreamingPipeline.
+
+    Args:
+        name (str): Stage name, used in logs and dump file names
+        fn (Callable): Maps a batch of records to the records to pass on
+            (it may drop, rewrite or expand them); must be picklable if
+            `workers` > 1
+        workers (int): Processes for this stage (1 = run in the stage's thread)
+    """
+
+    def __init__(self, name: str, fn: Callable[[List[Any]], List[Any]], workers: Optional[int] = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.metrics = StageMetrics(name)
+
+    @property
+    def records_in(self) -> int:
+        return self.metrics.records_in
+
+    @property
+    def records_out(self) -> int:
+        return self.metrics.records_out
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r}, in={self.records_in}, out={self.records_out})"
+
+
+class StreamingPipeline:
+    """
+    Run stages concurrently, each in its own thread (and optionally its own
+    process pool), connected by bounded queues of record batches.
+    Stages may pass content on as a TokenizedText; it is rebuilt into text
+    only in dumps and in the records `run` yields.
+
+    A full queue blocks the stage feeding it, so a slow stage throttles
+    everything upstream and memory stays at roughly `queue_size` batches per
+    queue however large the input is. Records keep their input order. If a
+    stage raises, the other stages stop and `run` re-raises the error.
+
+    Args:
+        stages (Sequence[Stage]): Stages in execution order
+        batch_size (int): Records per batch passed between stages
+        queue_size (int): Batches buffered between two stages
+        dump_dir (str): If set, the output of each stage but the last is
+            also written to `<dump_dir>/<NN>-<stage>.jsonl`
+        compact (bool): Compact JSON in dumps
+        metrics (Metrics): Receives each stage's StageMetrics (time spent
+            in the stage's work, records and text bytes in and out, counters)
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        dump_dir: Optional[str] = None,
+        compact: bool = False,
+        metrics: Optional[Metrics] = None
+    ):
+        self.stages = list(stages)
+        if metrics is not None:
+            for stage in self.stages:
+                metrics.stages[stage.name] = stage.metrics
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.dump_dir = dump_dir
+        self.compact = compact
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def _put(self, q: queue.Queue, item: Any) -> None:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+        raise PipelineAborted()
+
+    def _iter_queue(self, q: queue.Queue) -> Iterator[Any]:
+        while True:
+            try:
+                batch = q.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise PipelineAborted()
+                continue
+            if batch is _END:
+                return
+            yield from batch
+
+    def _start(self, name: str, target: Callable[..., None], *args: Any) -> threading.Thread:
+        def run() -> None:
+            try:
+                target(*args)
+            except PipelineAborted:
+                pass
+            except BaseException as e:
+                logging.getLogger(__name__).error(f"Pipeline stage {name} failed: {type(e).__name__}: {e}")
+                self._errors.append(e)
+                self._stop.set()
+
+        thread = threading.Thread(target=run, name=f"pipeline-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _feed(self, records: Iterable[Any], q: queue.Queue) -> None:
+        for batch in batched(records, self.batch_size):
+            self._put(q, batch)
+        self._put(q, _END)
+
+    def _dump_path(self, position: int, stage: Stage) -> Optional[str]:
+        if self.dump_dir is None or position == len(self.stages) - 1:
+            return None
+        return os.path.join(self.dump_dir, f"{position:02d}-{stage.name}.jsonl")
+
+    def _run_stage(self, stage: Stage, q_in: queue.Queue, q_out: queue.Queue, dump_path: Optional[str]) -> None:
+        dump = JsonlWriter(dump_path, compact=self.compact) if dump_path else nullcontext()
+        with ParallelExecutor(stage.workers, START_METHOD) as executor, dump:
+            measured = executor.imap_batches(partial(measured_call, stage.fn), self._iter_queue(q_in), self.batch_size)
+            for batch in batched(unwrap_measured(measured, stage.metrics), self.batch_size):
+                if dump_path:
+                    for record in batch:
+                        dump.write(as_text_record(record))
+                self._put(q_out, batch)
+        self._put(q_out, _END)
+
+    def run(self, records: Iterable[Any]) -> Iterator[Any]:
+        """
+        Stream `records` through every stage and yield the final records.
+        Closing the iterator early stops all stages.
+        """
+        self._stop.clear()
+        self._errors = []
+        if self.dump_dir:
+            os.makedirs(self.dump_dir, exist_ok=True)
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [self._start("source", self._feed, records, queues[0])]
+        for position, stage in enumerate(self.stages):
+            threads.append(self._start(
+                stage.name, self._run_stage, stage, queues[position], queues[position + 1],
+                self._dump_path(position, stage)
+            ))
+        try:
+            yield from map(as_text_record, self._iter_queue(queues[-1]))
+        except PipelineAborted:
+            pass
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def run_serial(self, records: Iterable[Any]) -> Iterator[Any]:
+        """
+        Apply the stages batch by batch in the calling thread, with the same
+        output and metrics as `run` but no threads, pools or dumps. Used for
+        profiling, since cProfile only sees the thread it runs in.
+        """
+        for batch in batched(records, self.batch_size):
+            for stage in self.stages:
+                batch = list(unwrap_measured(measured_call(stage.fn, batch), stage.metrics))
+            yield from map(as_text_record, batch)
+
+
+def build_stages(
+    names: Sequence[str] = DEFAULT_STAGES,
+    workers: Optional[int] = 1,
+    dedup_index: Optional["DedupIndex"] = None,
+    quality_filter: Optional["QualityFilter"] = None,
+    boilerplate_filter: Optional["BoilerplateFilter"] = None,
+    min_phrase_length: int = 5,
+    max_repetitions: int = 3,
+    similarity_threshold: float = 0.8,
+    corpus_near_dup: bool = False,
+    max_words: int = 512,
+    overlap_words: int = 50
+) -> List[Stage]:
+    """
+    Build the named stages, always in quality -> boilerplate -> clean ->
+    repetition -> near-dup -> chunk order, importing each stage's module
+    (see STAGE_REGISTRY) only if it is selected.
+
+    Args:
+        names (Sequence[str]): Stages to run, any of STAGE_NAMES
+        workers (int): Processes per stage (None = one per CPU core, 1 = threads only)
+        dedup_index (DedupIndex): Persistent exact-duplicate index for the clean stage
+        quality_filter (QualityFilter): Thresholds of the quality stage
+            (default: QualityFilter())
+        boilerplate_filter (BoilerplateFilter): Fitted filter of the
+            boilerplate stage, required with that stage (which then runs in
+            a single thread, sharing the sketch instead of pickling it)
+        min_phrase_length (int): Words per phrase for repetition removal
+        max_repetitions (int): Allowed repetitions of a phrase
+        similarity_threshold (float): Near-duplicate sentence similarity
+        corpus_near_dup (bool): Drop near-duplicate sentences across documents
+            (the near-dup stage then runs in a single thread)
+        max_words (int): Maximum words per chunk
+        overlap_words (int): Words shared by consecutive chunks
+
+    Returns:
+        List[Stage]: Stages for a StreamingPipeline
+    """
+    unknown = set(names) - set(STAGE_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages: {sorted(unknown)}")
+    check_stages(names)
+    if "boilerplate" in names and boilerplate_filter is None:
+        raise ValueError("The boilerplate stage needs a fitted BoilerplateFilter")
+    options: Dict[str, Dict[str, Any]] = {
+        "boilerplate": {"boilerplate_filter": boilerplate_filter},
+        "clean": {"index": dedup_index},
+        "repetition": {"min_phrase_length": min_phrase_length, "max_repetitions": max_repetitions},
+        "near-dup": {"similarity_threshold": similarity_threshold, "index": None},
+        "chunk": {"max_words": max_words, "overlap_words": overlap_words},
+    }
+    if "quality" in names:
+        from .quality import QualityFilter
+
+        options["quality"] = {"quality_filter": quality_filter or QualityFilter()}
+    if "near-dup" in names and corpus_near_dup:
+        from .minhash import NearDuplicateIndex
+
+        options["near-dup"]["index"] = NearDuplicateIndex(similarity_threshold=similarity_threshold)
+    single_threaded = {"boilerplate", "near-dup"} if corpus_near_dup else {"boilerplate"}
+    return [
+        Stage(name, partial(STAGE_REGISTRY[name].load(), **options[name]), 1 if name in single_threaded else workers)
+        for name in STAGE_NAMES if name in names
+    ]
+
+
+def input_files(inputs: Sequence[str]) -> List[str]:
+    """
+    Expand files and directories into the JSON/JSONL files to read, each
+    directory walked in sorted order. Manifests are skipped.
+    """
+    paths = []
+    for path in inputs:
+        if not os.path.isdir(path):
+            paths.append(path)
+            continue
+        found = []
+        for root, _, files in os.walk(path):
+            for file in files:
+                if is_json_file(file) and file != MANIFEST_NAME and not file.endswith(MANIFEST_SUFFIX):
+                    found.append(os.path.join(root, file))
+        paths.extend(sorted(found))
+    return paths
+
+
+def iter_input_records(paths: Iterable[str]) -> Iterator[Any]:
+    for path in paths:
+        logging.getLogger(__name__).info(f"Reading {path}")
+        yield from iter_records(path)
+
+
+def run_pipeline(
+    inputs: Sequence[str],
+    output: str,
+    stages: Sequence[str] = DEFAULT_STAGES,
+    workers: Optional[int] = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    dump_dir: Optional[str] = None,
+    shard_bytes: Optional[int] = None,
+    compact: bool = False,
+    dedup_index_path: Optional[str] = None,
+    metrics: Optional[Metrics] = None,
+    serial: bool = False,
+    **stage_options: Any
+) -> int:
+    """
+    Stream the records of `inputs` through the selected stages and write
+    only the final artifact (plus per-stage dumps with `dump_dir`). With
+    the boilerplate stage, the inputs are first read once to fit its filter.
+
+    Args:
+        inputs (Sequence[str]): JSON/JSONL files or directories
+        output (str): Output JSONL file (.gz/.zst compressed by suffix), or
+            the shard directory with `shard_bytes`
+        stages (Sequence[str]): Stages to run, any of STAGE_NAMES
+        workers (int): Processes per stage (None = one per CPU core, 1 = threads only)
+        batch_size (int): Records per batch
+        queue_size (int): Batches buffered between two stages
+        dump_dir (str): Directory for intermediate per-stage outputs
+        shard_bytes (int): Write `pipeline-NNNNN.jsonl` shards of about this
+            size plus a manifest into `output`
+        compact (bool): Compact JSON output
+        dedup_index_path (str): Persistent exact-duplicate index for the clean stage
+        metrics (Metrics): Collects per-stage metrics
+        serial (bool): Run every stage in the calling thread (for profiling)
+        **stage_options: Passed to build_stages; an unfitted
+            `boilerplate_filter` (default: BoilerplateFilter()) is fitted here
+
+    Returns:
+        int: Records written
+    """
+    check_stages(stages)
+    logger = logging.getLogger(__name__)
+    paths = input_files(inputs)
+    if "boilerplate" in stages:
+        from .boilerplate import BoilerplateFilter
+
+        boilerplate_filter = stage_options.get("boilerplate_filter") or BoilerplateFilter()
+        logger.info(f"Counting boilerplate segments in {len(paths)} files")
+        stage_options["boilerplate_filter"] = boilerplate_filter.fit(iter_input_records(paths))
+    index = None
+    if dedup_index_path and "clean" in stages:
+        from .dedup_index import DedupIndex
+
+        index = DedupIndex(dedup_index_path)
+    pipeline = StreamingPipeline(
+        build_stages(stages, workers, index, **stage_options), batch_size, queue_size, dump_dir, compact, metrics
+    )
+    logger.info(f"Pipeline {' -> '.join(stage.name for stage in pipeline.stages)} over {len(paths)} files")
+
+    if shard_bytes:
+        os.makedirs(output, exist_ok=True)
+        writer = ShardWriter(output, prefix="pipeline", target_bytes=shard_bytes, compact=compact)
+    else:
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        writer = JsonlWriter(output, compact=compact)
+    try:
+        with writer:
+            run = pipeline.run_serial if serial else pipeline.run
+            for record in run(iter_input_records(paths)):
+                writer.write(record)
+    finally:
+        if index is not None:
+            index.close()
+
+    for stage in pipeline.stages:
+        logger.info(f"Stage {stage.name}: {stage.records_in} records in, {stage.records_out} out")
+        if stage.name == "quality":
+            from .quality import rejection_counts
+
+            rejected = rejection_counts(stage.metrics.counters)
+            if rejected:
+                reasons = ', '.join(f'{reason}={n}' for reason, n in rejected.items())
+                logger.info(f"Stage {stage.name} rejected: {reasons}")
+    logger.info(f"Wrote {writer.count} records to {output}")
+    return writer.count
@@ -0,0 +1,150 @@
+import string
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .metrics import count
+
+# Reason codes, in the order the checks are applied
+REASONS = ("empty", "too_short", "too_long", "low_malayalam", "low_punctuation", "high_punctuation", "duplicate_lines")
+COUNTER_PREFIX = "quality.rejected."  # Counter name prefix of per-reason rejections
+
+# Byte classes; only ASCII whitespace and punctuation are recognized
+_IS_SPACE = np.zeros(256, dtype=bool)
+_IS_SPACE[list(string.whitespace.encode('ascii'))] = True
+_IS_PUNCT = np.zeros(256, dtype=bool)
+_IS_PUNCT[list(string.punctuation.encode('ascii'))] = True
+# Malayalam (U+0D00-U+0D7F) encodes in UTF-8 as E0 B4 xx or E0 B5 xx
+_LEAD_BYTE = 0xE0
+_BLOCK_BYTES = 0xB4  # Second byte with its lowest bit cleared
+
+
+def _per_text(mask: np.ndarray, starts: np.ndarray, nonempty: np.ndarray) -> np.ndarray:
+    totals = np.zeros(len(nonempty), dtype=np.int64)
+    if len(starts):
+        # Summing uint8 into int32 is several times faster than bool into int64
+        totals[nonempty] = np.add.reduceat(mask.view(np.uint8), starts, dtype=np.int32)
+    return totals
+
+
+def text_stats(texts: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Quality statistics of a batch of texts, computed in one vectorized pass
+    over their concatenated UTF-8 bytes (line duplication is per text).
+
+    Returns:
+        Dict[str, np.ndarray]: Per-text arrays "chars" (non-whitespace
+            characters), "malayalam_ratio" and "punctuation_density"
+            (fractions of those characters) and "duplicate_lines" (fraction
+            of non-blank lines repeating an earlier line)
+    """
+    encoded = [text.encode('utf-8') for text in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    nonempty = lengths > 0
+    starts = (np.cumsum(lengths) - lengths)[nonempty]
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    malayalam = np.zeros(len(data), dtype=bool)
+    malayalam[:-1] = (data[:-1] == _LEAD_BYTE) & ((data[1:] & 0xFE) == _BLOCK_BYTES)
+    chars = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) - _per_text(_IS_SPACE[data], starts, nonempty)
+    denominator = np.maximum(chars, 1)
+
+    duplicate_lines = np.zeros(len(texts))
+    for i, text in enumerate(texts):
+        lines = [line for line in map(str.strip, text.splitlines()) if line]
+        if len(lines) > 1:
+            duplicate_lines[i] = 1 - len(set(lines)) / len(lines)
+
+    return {
+        "chars": chars,
+        "malayalam_ratio": _per_text(malayalam, starts, nonempty) / denominator,
+        "punctuation_density": _per_text(_IS_PUNCT[data], starts, nonempty) / denominator,
+        "duplicate_lines": duplicate_lines,
+    }
+
+
+class QualityFilter:
+    """
+    Cheap first-pass filter that rejects junk records (English-only pages,
+    navigation menus, catalog listings, ...) before the expensive cleaning
+    stages, with a reason code per rejected record.
+
+    Args:
+        min_malayalam_ratio (float): Minimum fraction of Malayalam characters
+        min_chars (int): Minimum non-whitespace characters
+        max_chars (int): Maximum non-whitespace characters (None = no limit)
+        min_punctuation (float): Minimum punctuation density; listings of
+            titles and names have almost none (0 = no check)
+        max_punctuation (float): Maximum punctuation density; menus and
+            link lists are mostly separators
+        max_duplicate_lines (float): Maximum fraction of repeated lines
+    """
+
+    def __init__(
+        self,
+        min_malayalam_ratio: float = 0.5,
+        min_chars: int = 100,
+        max_chars: Optional[int] = None,
+        min_punctuation: float = 0.0,
+        max_punctuation: float = 0.2,
+        max_duplicate_lines: float = 0.5
+    ):
+        self.min_malayalam_ratio = min_malayalam_ratio
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.min_punctuation = min_punctuation
+        self.max_punctuation = max_punctuation
+        self.max_duplicate_lines = max_duplicate_lines
+
+    def reasons(self, texts: Sequence[str]) -> List[Optional[str]]:
+        """
+        Reason code for rejecting each text (the first failed check, in
+        REASONS order), or None for texts that pass.
+        """
+        stats = text_stats(texts)
+        chars = stats["chars"]
+        checks = [
+            ("empty", chars == 0),
+            ("too_short", chars < self.min_chars),
+            ("too_long", chars > self.max_chars if self.max_chars is not None else np.zeros(len(texts), dtype=bool)),
+            ("low_malayalam", stats["malayalam_ratio"] < self.min_malayalam_ratio),
+            ("low_punctuation", stats["punctuation_density"] < self.min_punctuation),
+            ("high_punctuation", stats["punctuation_density"] > self.max_punctuation),
+            ("duplicate_lines", stats["duplicate_lines"] > self.max_duplicate_lines),
+        ]
+        reasons: List[Optional[str]] = [None] * len(texts)
+        for reason, failed in reversed(checks):
+            for i in np.flatnonzero(failed):
+                reasons[i] = reason
+        return reasons
+
+    def filter(self, records: Sequence[Any], field: str = "content") -> List[Any]:
+        """
+        Keep the records whose `field` passes every check; non-dict items
+        pass through. Rejections are counted per reason as
+        "quality.rejected.<reason>" (see scripts.metrics).
+        """
+        texts = [record.get(field) if isinstance(record, dict) else None for record in records]
+        texts = [text if isinstance(text, str) else "" for text in texts]
+        kept = []
+        for record, reason in zip(records, self.reasons(texts)):
+            if reason is None or not isinstance(record, dict):
+                kept.append(record)
+            else:
+                count(COUNTER_PREFIX + reason)
+        return kept
+
+
+def rejection_counts(counters: Dict[str, float]) -> Dict[str, int]:
+    """
+    Per-reason rejection counts from a stage's counters, in REASONS order.
+    """
+    return {reason: int(counters[COUNTER_PREFIX + reason]) for reason in REASONS
+            if counters.get(COUNTER_PREFIX + reason)}
+
+
+def quality_stage(batch: List[Any], quality_filter: QualityFilter) -> List[Any]:
+    """
+    Pipeline stage: drop records whose content fails the quality checks, counting them per reason.
+    """
+    return quality_filter.filter(batch)
@@ -0,0 +1,127 @@
+import re
+import difflib
+
+import numpy as np
+
+from .metrics import count
+from .minhash import NearDuplicateIndex, minhash_near_duplicates
+from .ngrams import window_counts
+from .tokens import TokenizedText
+
+def preprocess_text(text):
+    """Preprocess text for repetition detection."""
+    if not isinstance(text, str):
+        text = str(text)
+    
+    # Remove extra whitespaces
+    text = re.sub(r'\s+', ' ', text).strip()
+    # Remove unwanted characters except Malayalam-specific punctuations
+    text = re.sub(r'[^\u0D00-\u0D7F\s.,!?]', '', text)
+    return text
+
+def extract_sentences(text):
+    """Extract sentences from Malayalam text."""
+    sentences = re.split(r'[.\n!?]+', text)
+    sentences = [s.strip() for s in sentences if s.strip()]
+    return sentences
+
+def detect_near_duplicates(sentences, similarity_threshold=0.8, method='minhash', index=None):
+    """Detect near-duplicate sentences.
+
+    method='minhash' finds candidates with MinHash/LSH and confirms them with
+    difflib, so the threshold keeps its meaning; pass a shared
+    NearDuplicateIndex as `index` to deduplicate across a corpus.
+    method='difflib' runs the original pairwise scan.
+    """
+    if method == 'minhash':
+        return minhash_near_duplicates(sentences, similarity_threshold, index)
+
+    unique_sentences = []
+    for i, sentence in enumerate(sentences):
+        is_duplicate = False
+        for existing in unique_sentences:
+            similarity = difflib.SequenceMatcher(None, sentence, existing).ratio()
+            if similarity >= similarity_threshold:
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            unique_sentences.append(sentence)
+    return unique_sentences
+
+def remove_repetitive_tokens(tokens, min_phrase_length=5, max_repetitions=3):
+    """Remove repetitive phrases from a TokenizedText.
+
+    Every `min_phrase_length`-word window is counted by hashing word IDs,
+    so no phrase strings are built. Scanning left to right, a window seen
+    more than `max_repetitions` times is skipped as a whole.
+    """
+    counts = window_counts(tokens.ids, min_phrase_length)
+    if not (counts > max_repetitions).any():
+        return tokens
+    counts = counts.tolist()
+    keep = []
+    i = 0
+    while i < len(tokens):
+        if i >= len(counts) or counts[i] <= max_repetitions:
+            keep.append(i)
+            i += 1
+        else:
+            i += min_phrase_length
+    return tokens.select(np.array(keep, dtype=np.int64))
+
+def remove_repetitive_phrases(text, min_phrase_length=5, max_repetitions=3):
+    """Remove repetitive phrases from text (see remove_repetitive_tokens)."""
+    tokens = TokenizedText.from_text(preprocess_text(text))
+    return remove_repetitive_tokens(tokens, min_phrase_length, max_repetitions).text()
+
+def remove_near_duplicate_sentences(tokens, similarity_threshold=0.8, index=None):
+    """Drop near-duplicate sentences of a TokenizedText (as detect_near_duplicates
+    does for extract_sentences), returning the remaining sentences' words.
+    """
+    sentences = tokens.sentences()
+    if index is None:
+        index = NearDuplicateIndex(similarity_threshold=similarity_threshold)
+    flags = index.add_batch([' '.join(tokens.vocab.decode(ids)) for ids in sentences])
+    kept = [ids for ids, duplicate in zip(sentences, flags) if not duplicate]
+    count("detect_near_duplicates.sentences_in", len(sentences))
+    count("detect_near_duplicates.sentences_removed", len(sentences) - len(kept))
+    return TokenizedText.concatenate(kept, tokens.vocab)
+
+def repetition_stage(batch, min_phrase_length=5, max_repetitions=3):
+    """Pipeline stage: remove repetitive phrases from each record's content.
+
+    The content is tokenized here, once, and passed on as a TokenizedText.
+    Non-dict items are passed through.
+    """
+    output = []
+    for record in batch:
+        if not isinstance(record, dict):
+            output.append(record)
+            continue
+        content = record.get("content", "")
+        tokens = content if isinstance(content, TokenizedText) else TokenizedText.from_text(preprocess_text(content))
+        output.append({**record, "content": remove_repetitive_tokens(tokens, min_phrase_length, max_repetitions)})
+    return output
+
+def near_duplicate_stage(batch, similarity_threshold=0.8, index=None):
+    """Pipeline stage: drop near-duplicate sentences from each record's content.
+
+    Without an `index` each document is deduplicated on its own (as rchar.py
+    does); a shared index also drops sentences seen in earlier documents.
+    Non-dict items are passed through.
+    """
+    output = []
+    for record in batch:
+        if not isinstance(record, dict):
+            output.append(record)
+            continue
+        content = record.get("content", "")
+        if isinstance(content, TokenizedText):
+            output.append({**record, "content": remove_near_duplicate_sentences(content, similarity_threshold, index)})
+            continue
+        sentences = extract_sentences(content)
+        unique_sentences = detect_near_duplicates(sentences, similarity_threshold, index=index)
+        count("detect_near_duplicates.sentences_in", len(sentences))
+        count("detect_near_duplicates.sentences_removed", len(sentences) - len(unique_sentences))
+        output.append({**record, "content": ' '.join(unique_sentences)})
+    return output
@@ -0,0 +1,446 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .dedup_index import DEFAULT_INDEX_NAME, DedupIndex
+from .io_codecs import DEFAULT_CODEC, open_binary, open_text, split_compression
+from .jsonio import PART_SUFFIX, JsonArrayWriter, JsonlWriter, atomic_open, detect_layout, iter_json_array
+from .manifest import Manifest
+from .shards import ShardWriter, load_shard_manifest
+
+RANGE_BYTES = 64 * 1024 * 1024  # Uncompressed JSONL inputs above this are split into byte ranges across shards
+SHARDING_NAME = "sharding.json"  # Shard assignment and run options, kept in each shard's output directory
+SEEN_NAME = ".merge_seen.sqlite"  # Temporary index of merged record content
+
+_RANGE_KEY_RE = re.compile(r'^(.*)#(\d+)$')
+
+
+def stable_hash(key: str) -> int:
+    """
+    64-bit hash of a key that is the same in every process and on every
+    host (unlike hash(), which is salted per process).
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ShardSpec:
+    """
+    Slice `index` of `count` of a sharded run. Each independent process or
+    host runs one slice; together they cover every input exactly once, with
+    no coordinator.
+
+    Args:
+        index (int): This shard, from 0 to count - 1
+        count (int): Number of shards
+    """
+
+    def __init__(self, index: int, count: int):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Invalid shard {index} of {count}: need 0 <= index < count")
+        self.index = index
+        self.count = count
+
+    def owns(self, key: str) -> bool:
+        """
+        True if the work item `key` belongs to this shard.
+        """
+        return stable_hash(key) % self.count == self.index
+
+    @property
+    def name(self) -> str:
+        return f"shard-{self.index:03d}-of-{self.count:03d}"
+
+    def __repr__(self) -> str:
+        return f"ShardSpec({self.index}, {self.count})"
+
+
+class WorkItem:
+    """
+    One input file, or byte range `part` of a large JSONL input: the records
+    whose lines start in [start, end).
+    """
+
+    def __init__(self, path: str, key: str, part: Optional[int] = None, start: int = 0, end: Optional[int] = None):
+        self.path = path
+        self.key = key
+        self.part = part
+        self.start = start
+        self.end = end
+
+    @property
+    def source_key(self) -> str:
+        """
+        Manifest and shard-source key: the input's relative path, plus
+        "#<part>" for a byte range.
+        """
+        return self.key if self.part is None else range_key(self.key, self.part)
+
+    @property
+    def byte_range(self) -> Optional[Tuple[int, Optional[int]]]:
+        return None if self.part is None else (self.start, self.end)
+
+
+def range_key(key: str, part: int) -> str:
+    return f"{key}#{part}"
+
+
+def split_range_key(key: str) -> Tuple[str, Optional[int]]:
+    """
+    "a.jsonl#3" -> ("a.jsonl", 3); keys without a range part -> (key, None).
+    """
+    match = _RANGE_KEY_RE.match(key)
+    if match is None:
+        return key, None
+    return match.group(1), int(match.group(2))
+
+
+def range_output_path(output_path: str, part: int) -> str:
+    """
+    Output of one byte range: "a_cleaned.jsonl.gz" -> "a_cleaned.r00003.jsonl.gz".
+    """
+    path, _ = split_compression(output_path)
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.r{part:05d}{ext}{output_path[len(path):]}"
+
+
+def unrange_output_path(path: str, part: int) -> str:
+    """
+    Inverse of range_output_path.
+    """
+    directory, name = os.path.split(path)
+    tag = f".r{part:05d}"
+    position = name.rfind(tag)
+    return os.path.join(directory, name[:position] + name[position + len(tag):])
+
+
+def range_count(size: int, range_bytes: int) -> int:
+    return max(1, -(-size // range_bytes))
+
+
+def align_to_line(path: str, offset: int) -> int:
+    """
+    Start of the first line at or after `offset` in an uncompressed file.
+    """
+    if offset <= 0:
+        return 0
+    with open(path, 'rb') as f:
+        f.seek(offset - 1)
+        f.readline()
+        return f.tell()
+
+
+def is_splittable(path: str, range_bytes: int = RANGE_BYTES) -> bool:
+    """
+    True for uncompressed JSONL files larger than one range (compressed
+    streams cannot seek to a range start).
+    """
+    return (
+        split_compression(path)[1] is None
+        and os.path.getsize(path) > range_bytes
+        and detect_layout(path) == "jsonl"
+    )
+
+
+def plan_work(
+    input_dir: str,
+    paths: Sequence[str],
+    shard: Optional[ShardSpec] = None,
+    range_bytes: int = RANGE_BYTES
+) -> List[WorkItem]:
+    """
+    Work items for `paths` that belong to `shard` (every file, whole, without one).
+
+    Files are assigned by the stable hash of their path relative to
+    `input_dir` ('/'-separated, so Windows and POSIX hosts agree). Large
+    JSONL files are cut into `range_bytes` ranges, each assigned by the
+    hash of "<path>#<part>", so one huge input is spread over all shards.
+    """
+    items = []
+    for path in paths:
+        key = os.path.relpath(path, input_dir)
+        if shard is None:
+            items.append(WorkItem(path, key))
+            continue
+        hash_key = key.replace(os.sep, '/')
+        if is_splittable(path, range_bytes):
+            size = os.path.getsize(path)
+            for part in range(range_count(size, range_bytes)):
+                if shard.owns(range_key(hash_key, part)):
+                    items.append(WorkItem(path, key, part, part * range_bytes, (part + 1) * range_bytes))
+        elif shard.owns(hash_key):
+            items.append(WorkItem(path, key))
+    return items
+
+
+def write_sharding_info(
+    output_dir: str,
+    shard: ShardSpec,
+    items: Sequence[WorkItem],
+    options: Dict[str, Any],
+    complete: bool
+) -> None:
+    """
+    Record a shard's assignment and run options next to its outputs, for
+    merge_shard_outputs. `output_dir` is stored as given, so the merge can
+    relocate the output paths in the shard's manifest.
+    """
+    with atomic_open(os.path.join(output_dir, SHARDING_NAME)) as f:
+        json.dump({
+            "version": 1,
+            "index": shard.index,
+            "count": shard.count,
+            "output_dir": output_dir,
+            "complete": complete,
+            "options": options,
+            "items": [item.source_key for item in items],
+        }, f, ensure_ascii=False, indent=2)
+
+
+def load_sharding_info(shard_dir: str) -> Dict[str, Any]:
+    path = os.path.join(shard_dir, SHARDING_NAME)
+    if not os.path.exists(path):
+        raise ValueError(f"{shard_dir}: no {SHARDING_NAME}; not the output of a sharded run")
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _check_shards(shard_dirs: Sequence[str]) -> List[Tuple[Dict[str, Any], str]]:
+    shards = [(load_sharding_info(shard_dir), shard_dir) for shard_dir in shard_dirs]
+    if not shards:
+        raise ValueError("No shard directories given")
+    problems = []
+    counts = {info["count"] for info, _ in shards}
+    if len(counts) > 1:
+        problems.append(f"shards of runs with different shard counts {sorted(counts)}")
+    if any(info["options"] != shards[0][0]["options"] for info, _ in shards):
+        problems.append("shards were run with different options")
+    indexes = [info["index"] for info, _ in shards]
+    missing = sorted(set(range(max(counts))) - set(indexes))
+    if missing:
+        problems.append(f"missing shards {missing}")
+    repeated = sorted({index for index in indexes if indexes.count(index) > 1})
+    if repeated:
+        problems.append(f"shards given more than once {repeated}")
+    incomplete = [shard_dir for info, shard_dir in shards if not info["complete"]]
+    if incomplete:
+        problems.append(f"shards with failed inputs {incomplete}")
+    if problems:
+        raise ValueError("Cannot merge: " + "; ".join(problems))
+    return sorted(shards, key=lambda shard: shard[0]["index"])
+
+
+def _is_new(seen: DedupIndex, label: str, record: Any) -> bool:
+    if not isinstance(record, dict):
+        return True
+    return seen.add(record.get("content", ""), source=label)
+
+
+def _copy_records(
+    sources: Sequence[Tuple[str, Optional[Callable[[Any], bool]]]],
+    target: str,
+    compact: bool = False
+) -> Tuple[int, int]:
+    """
+    Write the records of `sources` (all of one layout) to `target` in order,
+    skipping those their `keep` function rejects. JSONL lines are copied
+    without re-serializing.
+
+    Returns:
+        Tuple[int, int]: Records written and dropped
+    """
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    layout = detect_layout(sources[0][0]) if os.path.getsize(sources[0][0]) else "jsonl"
+    dropped = 0
+    if layout == "jsonl":
+        with JsonlWriter(target) as writer:
+            for path, keep in sources:
+                with open_binary(path) as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        if keep is not None and not keep(DEFAULT_CODEC.loads(line)):
+                            dropped += 1
+                            continue
+                        writer.write_line(line if line.endswith(b'\n') else line + b'\n')
+        return writer.count, dropped
+    if layout == "array":
+        with JsonArrayWriter(target, indent=None if compact else 2, compact=compact) as writer:
+            for path, keep in sources:
+                for record in iter_json_array(path):
+                    if keep is not None and not keep(record):
+                        dropped += 1
+                        continue
+                    writer.write(record)
+        return writer.count, dropped
+    written = 0
+    for path, keep in sources:
+        with open_text(path) as f:
+            record = json.load(f)
+        if keep is not None and not keep(record):
+            dropped += 1
+            continue
+        shutil.copyfile(path, target + PART_SUFFIX)
+        os.replace(target + PART_SUFFIX, target)
+        written += 1
+    return written, dropped
+
+
+def _merge_mirrored(
+    shards: List[Tuple[Dict[str, Any], str]],
+    output_dir: str,
+    seen: Optional[DedupIndex]
+) -> Dict[str, int]:
+    """
+    Copy per-file outputs, join the ranges of split inputs and merge the manifests.
+    """
+    options = shards[0][0]["options"]
+    compact = options.get("compact", False)
+    manifest = Manifest(output_dir)
+    manifest.entries = {}
+    ranged: Dict[str, List[Tuple[int, Dict[str, Any], List[Tuple[str, str]], Any]]] = {}
+    records = dropped = 0
+
+    for info, shard_dir in shards:
+        keep = partial(_is_new, seen, f"shard-{info['index']}") if seen is not None else None
+        for key, entry in sorted(Manifest(shard_dir).entries.items()):
+            outputs = [(os.path.join(shard_dir, rel), rel) for rel in entry.get("outputs", [])]
+            base, part = split_range_key(key)
+            if part is not None:
+                ranged.setdefault(base, []).append((part, entry, outputs, keep))
+                continue
+            targets = []
+            written = 0
+            for source, rel in outputs:
+                target = os.path.join(output_dir, rel)
+                if keep is None:
+                    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+                    shutil.copyfile(source, target)
+                    written = entry.get("records", 0)
+                else:
+                    written, skipped = _copy_records([(source, keep)], target, compact)
+                    dropped += skipped
+                if os.path.exists(target):
+                    targets.append(rel)
+            manifest.entries[key] = {**entry, "outputs": targets, "records": written}
+            records += written
+
+    range_bytes = options["range_bytes"]
+    for key, parts in sorted(ranged.items()):
+        parts.sort(key=lambda part: part[0])
+        expected = range_count(parts[0][1]["size"], range_bytes)
+        if [part for part, *_ in parts] != list(range(expected)):
+            raise ValueError(f"Cannot merge {key}: have ranges {[part for part, *_ in parts]} of {expected}")
+        sources = [(source, keep) for _, _, outputs, keep in parts for source, _ in outputs]
+        rel = unrange_output_path(parts[0][2][0][1], 0)
+        written, skipped = _copy_records(sources, os.path.join(output_dir, rel), compact)
+        manifest.entries[key] = {**parts[0][1], "outputs": [rel], "records": written}
+        records += written
+        dropped += skipped
+
+    manifest.save()
+    return {"records": records, "duplicates": dropped}
+
+
+def _merge_packed(
+    shards: List[Tuple[Dict[str, Any], str]],
+    output_dir: str,
+    seen: Optional[DedupIndex]
+) -> Dict[str, int]:
+    """
+    Repack the shard files of every shard into one shard sequence, keeping
+    each record's source (with range parts folded into their input).
+    """
+    first = load_shard_manifest(shards[0][1])
+    dropped = 0
+    with ShardWriter(output_dir, target_bytes=first["target_bytes"], compression=first["compression"]) as writer:
+        for info, shard_dir in shards:
+            keep = partial(_is_new, seen, f"shard-{info['index']}") if seen is not None else None
+            manifest = load_shard_manifest(shard_dir)
+            spans: Dict[str, List[Tuple[int, int, str]]] = {}
+            for source, source_spans in manifest["sources"].items():
+                for span in source_spans:
+                    spans.setdefault(span["shard"], []).append(
+                        (span["line"], span["line"] + span["records"], split_range_key(source)[0])
+                    )
+            for shard in manifest["shards"]:
+                shard_spans = sorted(spans.get(shard["name"], []))
+                position = 0
+                with open_binary(os.path.join(shard_dir, shard["name"])) as f:
+                    for line_number, line in enumerate(f):
+                        while position < len(shard_spans) and shard_spans[position][1] <= line_number:
+                            position += 1
+                        source = None
+                        if position < len(shard_spans) and shard_spans[position][0] <= line_number:
+                            source = shard_spans[position][2]
+                        if keep is not None and not keep(DEFAULT_CODEC.loads(line)):
+                            dropped += 1
+                            continue
+                        writer.write_line(line, source)
+    return {"records": writer.count, "duplicates": dropped}
+
+
+def merge_shard_outputs(shard_dirs: Sequence[str], output_dir: str, dedup: bool = True) -> Dict[str, int]:
+    """
+    Combine the output directories of all shards of a sharded run into
+    `output_dir`:
+
+    - Per-file outputs are copied, and the ranges of a split JSONL input
+      are joined in order into its output file. Manifests are merged, so
+      an incremental run over `output_dir` skips the same inputs.
+    - Shard files (runs with `shard_bytes`) are repacked into one sequence
+      with a combined shard manifest.
+    - Dedup indexes are merged into `output_dir`'s index. Each shard only
+      deduplicated against itself, so with `dedup` a record whose content
+      already appeared in a lower-numbered shard is dropped.
+
+    Args:
+        shard_dirs (Sequence[str]): Output directories of shards 0..N-1, in any order
+        output_dir (str): Merged output directory
+        dedup (bool): Drop records duplicated across shards (needs the
+            shards' dedup indexes)
+
+    Returns:
+        Dict[str, int]: Number of shards, records written and cross-shard duplicates dropped
+
+    Raises:
+        ValueError: If shards are missing, repeated, incomplete or from different runs
+    """
+    logger = logging.getLogger(__name__)
+    shards = _check_shards(shard_dirs)
+    os.makedirs(output_dir, exist_ok=True)
+
+    index_paths = [os.path.join(shard_dir, DEFAULT_INDEX_NAME) for _, shard_dir in shards]
+    index_paths = [path for path in index_paths if os.path.exists(path)]
+    seen_path = os.path.join(output_dir, SEEN_NAME)
+    seen = None
+    if index_paths:
+        with DedupIndex(os.path.join(output_dir, DEFAULT_INDEX_NAME)) as index:
+            for path in index_paths:
+                index.merge(path)
+            logger.info(f"Merged {len(index_paths)} dedup indexes: {len(index)} unique documents")
+        if dedup:
+            _remove_index(seen_path)
+            seen = DedupIndex(seen_path)
+
+    merge = _merge_packed if shards[0][0]["options"].get("shard_bytes") else _merge_mirrored
+    try:
+        stats = merge(shards, output_dir, seen)
+    finally:
+        if seen is not None:
+            seen.close()
+            _remove_index(seen_path)
+    stats["shards"] = len(shards)
+    logger.info(f"Merged {len(shards)} shards into {output_dir}: {stats['records']} records, "
+                f"{stats['duplicates']} cross-shard duplicates dropped")
+    return stats
+
+
+def _remove_index(path: str) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
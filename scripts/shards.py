@@ -0,0 +1,228 @@
+import os
+import json
+import glob
+import hashlib
+from functools import partial
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .executor import ParallelExecutor, TaskResult
+from .io_codecs import get_codec, open_binary, with_compression
+from .jsonio import PART_SUFFIX, atomic_open
+from .manifest import file_sha256
+from .metrics import measuring
+
+DEFAULT_SHARD_BYTES = 256 * 1024 * 1024
+MANIFEST_SUFFIX = ".manifest.json"
+FILES_PER_TASK = 16  # Small input files handed to a worker at once
+
+
+class ShardWriter:
+    """
+    Pack records into JSONL shards of roughly `target_bytes` each, named
+    `<prefix>-00000.jsonl`, `<prefix>-00001.jsonl`, ... in write order.
+
+    A shard is closed before a record would push it past the target (a
+    single larger record gets a shard of its own). Shards are written to
+    `.part` files and renamed when complete. On a clean close,
+    `<prefix>.manifest.json` lists each shard's record count, byte size and
+    SHA-256, and maps each source to the (shard, line, records) spans
+    holding its records, where line is 0-based. Shards left over from an
+    earlier, larger run are removed.
+
+    With `compression` the shards are `.jsonl.gz` / `.jsonl.zst`; the target
+    then applies to the uncompressed data, and the manifest's size and
+    checksum describe the compressed files on disk.
+
+    Args:
+        output_dir (str): Directory for shards and manifest
+        prefix (str): Shard file name prefix
+        target_bytes (int): Target shard size
+        compact (bool): Compact JSON records
+        compression (str): None, "gzip" or "zstd"
+    """
+
+    def __init__(self, output_dir: str, prefix: str = "shard", target_bytes: int = DEFAULT_SHARD_BYTES,
+                 compact: bool = False, compression: Optional[str] = None):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.target_bytes = target_bytes
+        self.compression = compression
+        self._suffix = with_compression(".jsonl", compression)
+        self._codec = get_codec(compact)
+        self.shards: List[Dict[str, Any]] = []
+        self.sources: Dict[str, List[Dict[str, Any]]] = {}
+        self.count = 0
+        self._file: Optional[BinaryIO] = None
+        self._name = ""
+        self._digest = None
+        self._bytes = 0
+        self._records = 0
+
+    def __enter__(self) -> "ShardWriter":
+        os.makedirs(self.output_dir, exist_ok=True)
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        self.close(commit=exc_type is None)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.output_dir, self.prefix + MANIFEST_SUFFIX)
+
+    def _open(self) -> None:
+        self._name = f"{self.prefix}-{len(self.shards):05d}{self._suffix}"
+        path = os.path.join(self.output_dir, self._name) + PART_SUFFIX
+        self._file = open_binary(path, 'wb', compression=self.compression)
+        self._digest = hashlib.sha256()
+        self._bytes = 0
+        self._records = 0
+
+    def _close_shard(self) -> None:
+        self._file.close()
+        self._file = None
+        path = os.path.join(self.output_dir, self._name)
+        os.replace(path + PART_SUFFIX, path)
+        if self.compression is None:
+            size, digest = self._bytes, self._digest.hexdigest()
+        else:
+            size, digest = os.path.getsize(path), file_sha256(path)
+        self.shards.append({
+            "name": self._name,
+            "records": self._records,
+            "bytes": size,
+            "sha256": digest,
+        })
+
+    def write(self, record: Any, source: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Append a record, starting a new shard if this one is full.
+
+        Returns:
+            Tuple[str, int]: Shard name and 0-based line of the record
+        """
+        return self.write_line(self._codec.dumps_line(record), source)
+
+    def write_line(self, data: bytes, source: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Append an already serialized record (one JSON line, newline included).
+        """
+        if self._file is not None and self._bytes and self._bytes + len(data) > self.target_bytes:
+            self._close_shard()
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+        if self.compression is None:
+            self._digest.update(data)
+        line = self._records
+        self._bytes += len(data)
+        self._records += 1
+        self.count += 1
+
+        if source is not None:
+            spans = self.sources.setdefault(source, [])
+            last = spans[-1] if spans else None
+            if last and last["shard"] == self._name and last["line"] + last["records"] == line:
+                last["records"] += 1
+            else:
+                spans.append({"shard": self._name, "line": line, "records": 1})
+        return self._name, line
+
+    def close(self, commit: bool = True) -> None:
+        if self._file is not None:
+            if not commit:
+                self._file.close()
+                self._file = None
+                return
+            self._close_shard()
+        if not commit:
+            return
+        names = {shard["name"] for shard in self.shards}
+        for path in glob.glob(os.path.join(self.output_dir, f"{self.prefix}-*.jsonl*")):
+            if os.path.basename(path) not in names:
+                os.remove(path)
+        with atomic_open(self.manifest_path) as f:
+            json.dump({
+                "version": 1,
+                "target_bytes": self.target_bytes,
+                "compression": self.compression,
+                "records": self.count,
+                "shards": self.shards,
+                "sources": self.sources,
+            }, f, ensure_ascii=False, indent=2)
+
+
+def load_shard_manifest(output_dir: str, prefix: str = "shard") -> Dict[str, Any]:
+    with open(os.path.join(output_dir, prefix + MANIFEST_SUFFIX), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def verify_shards(output_dir: str, prefix: str = "shard") -> List[str]:
+    """
+    Check every shard against the manifest's size, record count and checksum.
+
+    Returns:
+        List[str]: Problems found (empty if all shards match)
+    """
+    problems = []
+    for shard in load_shard_manifest(output_dir, prefix)["shards"]:
+        path = os.path.join(output_dir, shard["name"])
+        if not os.path.exists(path):
+            problems.append(f"{shard['name']}: missing")
+            continue
+        with open_binary(path) as f:
+            lines = sum(1 for _ in f)
+        size = os.path.getsize(path)
+        if (size, lines, file_sha256(path)) != (shard["bytes"], shard["records"], shard["sha256"]):
+            problems.append(f"{shard['name']}: does not match manifest")
+    return problems
+
+
+def _load_many(
+    load: Callable[[str], List[Any]],
+    paths: List[str]
+) -> List[Tuple[str, Optional[List[Any]], Optional[str], Optional[Dict[str, Any]]]]:
+    results = []
+    for path in paths:
+        try:
+            with measuring() as measurement:
+                records = load(path)
+            measurement["records_out"] = len(records)
+            results.append((path, records, None, measurement))
+        except Exception as e:
+            results.append((path, None, f"{type(e).__name__}: {e}", None))
+    return results
+
+
+def iter_loaded(
+    paths: Sequence[str],
+    load: Callable[[str], List[Any]],
+    executor: ParallelExecutor,
+    files_per_task: int = FILES_PER_TASK
+) -> Iterator[Tuple[str, Optional[List[Any]], Optional[str], Optional[Dict[str, Any]]]]:
+    """
+    Run `load` (a picklable function returning a file's output records) on
+    each path in the pool, yielding (path, records, error, metrics) in path order.
+    """
+    return executor.imap_batches(partial(_load_many, load), paths, files_per_task)
+
+
+def write_sharded(
+    writer: ShardWriter,
+    sources: Sequence[Tuple[str, str]],
+    load: Callable[[str], List[Any]],
+    executor: ParallelExecutor
+) -> List[TaskResult]:
+    """
+    Load each (key, path) source in the pool and write its records to
+    `writer` in source order, so shard contents do not depend on worker timing.
+    """
+    keys = dict((path, key) for key, path in sources)
+    results = []
+    for path, records, error, measurement in iter_loaded([path for _, path in sources], load, executor):
+        if error is not None:
+            results.append(TaskResult(path, False, error=error))
+            continue
+        for record in records:
+            writer.write(record, keys[path])
+        results.append(TaskResult(path, True, records=len(records), metrics=measurement))
+    return results
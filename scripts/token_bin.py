@@ -0,0 +1,308 @@
+import os
+import json
+import logging
+from collections import Counter
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .chunk import chunk_record, iter_chunk_spans
+from .executor import ParallelExecutor
+from .io_codecs import is_json_file
+from .jsonio import PART_SUFFIX, iter_records
+from .manifest import MANIFEST_NAME
+from .shards import MANIFEST_SUFFIX, iter_loaded
+
+UNK_TOKEN = "<unk>"  # Vocabulary entry that out-of-vocabulary words map to
+TOKEN_BIN_PREFIX = "chunks"  # Output files: chunks.bin, chunks.idx, chunks.sources.jsonl, chunks.meta.json
+FORMAT_VERSION = 1
+# One row per chunk: first token in the .bin, number of tokens, line of the source in .sources.jsonl
+IDX_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4"), ("source", "<u4")])
+
+
+class WordTokenizer:
+    """
+    Word-level tokenizer backed by a local vocabulary file, splitting text
+    into whitespace-separated words as the chunker does.
+
+    Args:
+        vocab (Dict[str, int]): Token to ID
+        unk_token (str): Token for out-of-vocabulary words; must be in `vocab`
+    """
+
+    def __init__(self, vocab: Dict[str, int], unk_token: str = UNK_TOKEN):
+        if unk_token not in vocab:
+            raise ValueError(f"Vocabulary has no {unk_token!r} token")
+        self.vocab = vocab
+        self.unk_id = vocab[unk_token]
+        self.vocab_size = max(vocab.values()) + 1
+        self.tokens = [unk_token] * self.vocab_size
+        for token, token_id in vocab.items():
+            self.tokens[token_id] = token
+
+    @classmethod
+    def from_file(cls, path: str) -> "WordTokenizer":
+        """
+        Load a vocabulary: a text file with one token per line (ID = line
+        number), a JSON object of token to ID, or a tokenizer.json with a
+        word-level "model".
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            if not path.endswith(".json"):
+                return cls({line.rstrip("\n"): i for i, line in enumerate(f)})
+            data = json.load(f)
+        model = data.get("model") if isinstance(data.get("model"), dict) else None
+        if model is not None:
+            return cls(model["vocab"], model.get("unk_token") or UNK_TOKEN)
+        return cls(data)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        Smallest token dtype of the .bin file: uint16 if every ID fits, else uint32.
+        """
+        return np.dtype(np.uint16) if self.vocab_size <= 1 << 16 else np.dtype(np.uint32)
+
+    def encode(self, text: str) -> np.ndarray:
+        """
+        Token IDs of the words of `text`.
+        """
+        get, unk_id = self.vocab.get, self.unk_id
+        return np.array([get(word, unk_id) for word in text.split()], dtype=self.dtype)
+
+    def decode(self, ids: np.ndarray) -> str:
+        tokens = self.tokens
+        return ' '.join(tokens[i] for i in ids.tolist())
+
+
+def build_vocab(input_paths: Sequence[str], vocab_path: str, max_size: int = 1 << 16) -> int:
+    """
+    Write a vocabulary file of the `max_size` - 1 most frequent words in
+    `input_paths` (ties in first-seen order), preceded by UNK_TOKEN.
+
+    Returns:
+        int: Vocabulary size
+    """
+    counts: Counter = Counter()
+    for path in input_paths:
+        for record in iter_records(path):
+            if isinstance(record, dict) and isinstance(record.get("content"), str):
+                counts.update(record["content"].split())
+    words = [word for word, _ in counts.most_common(max_size - 1) if word != UNK_TOKEN]
+    with open(vocab_path, "w", encoding="utf-8") as f:
+        f.write('\n'.join([UNK_TOKEN, *words]) + '\n')
+    return len(words) + 1
+
+
+def json_input_files(input_directory: str) -> List[str]:
+    """
+    JSON/JSONL files directly in `input_directory` in name order, skipping manifests.
+    """
+    return [
+        os.path.join(input_directory, name) for name in sorted(os.listdir(input_directory))
+        if is_json_file(name) and name != MANIFEST_NAME and not name.endswith(MANIFEST_SUFFIX)
+    ]
+
+
+def tokenize_file(
+    path: str,
+    tokenizer: WordTokenizer,
+    max_words: int = 512,
+    overlap_words: int = 50
+) -> List[Tuple[str, str, np.ndarray, np.ndarray]]:
+    """
+    Tokenize each record of a file once and cut it into the chunker's spans.
+
+    Returns:
+        List[Tuple]: (url, timestamp, token IDs of the chunks back to back,
+            token count of each chunk) per record; empty chunks are skipped
+    """
+    output = []
+    for record in iter_records(path):
+        if not isinstance(record, dict):
+            continue
+        content = record.get("content", "")
+        ids = tokenizer.encode(content if isinstance(content, str) else "")
+        spans = [(start, end) for start, end in iter_chunk_spans(len(ids), max_words, overlap_words) if end > start]
+        if len(spans) == 1:
+            tokens = ids
+        else:
+            tokens = np.concatenate([ids[start:end] for start, end in spans]) if spans else ids[:0]
+        lengths = np.array([end - start for start, end in spans], dtype=np.uint32)
+        output.append((record.get("url", ""), record.get("timestamp", ""), tokens, lengths))
+    return output
+
+
+def _meta_path(prefix: str) -> str:
+    return prefix + ".meta.json"
+
+
+def write_token_bin(
+    input_directory: str,
+    output_directory: str,
+    tokenizer_path: str,
+    max_words: int = 512,
+    overlap_words: int = 50,
+    workers: Optional[int] = 1,
+    prefix: str = TOKEN_BIN_PREFIX
+) -> Tuple[int, int]:
+    """
+    Chunk every JSON/JSONL file in `input_directory` as process_json_files
+    does, but write the chunks' token IDs into one flat `<prefix>.bin` with
+    a `<prefix>.idx` of IDX_DTYPE rows, `<prefix>.sources.jsonl` (url and
+    timestamp of each source record) and `<prefix>.meta.json`, all in
+    `output_directory`. Files are tokenized in the pool and written in name
+    order; every file is written under a temporary name and renamed once
+    complete, the meta file last.
+
+    Args:
+        input_directory (str): Directory of input JSON/JSONL files
+        output_directory (str): Directory for the output files
+        tokenizer_path (str): Vocabulary file (see WordTokenizer.from_file)
+        max_words (int): Maximum words (tokens) per chunk
+        overlap_words (int): Words shared by consecutive chunks
+        workers (int): Worker processes (None = one per CPU core, 1 = serial)
+        prefix (str): Output file name prefix
+
+    Returns:
+        Tuple[int, int]: Chunks and tokens written
+    """
+    logger = logging.getLogger(__name__)
+    tokenizer = WordTokenizer.from_file(tokenizer_path)
+    os.makedirs(output_directory, exist_ok=True)
+    base = os.path.join(output_directory, prefix)
+    outputs = [base + ".bin", base + ".idx", base + ".sources.jsonl"]
+
+    offset = chunks = sources = 0
+    load = partial(tokenize_file, tokenizer=tokenizer, max_words=max_words, overlap_words=overlap_words)
+    with ParallelExecutor(workers) as executor, \
+            open(outputs[0] + PART_SUFFIX, "wb") as bin_file, \
+            open(outputs[1] + PART_SUFFIX, "wb") as idx_file, \
+            open(outputs[2] + PART_SUFFIX, "w", encoding="utf-8") as sources_file:
+        for path, records, error, _ in iter_loaded(json_input_files(input_directory), load, executor):
+            if error is not None:
+                raise RuntimeError(f"Error tokenizing {path}: {error}")
+            for url, timestamp, tokens, lengths in records:
+                if not len(lengths):
+                    continue
+                rows = np.zeros(len(lengths), dtype=IDX_DTYPE)
+                rows["offset"] = offset + np.cumsum(lengths, dtype=np.uint64) - lengths
+                rows["length"] = lengths
+                rows["source"] = sources
+                bin_file.write(tokens.tobytes())
+                idx_file.write(rows.tobytes())
+                sources_file.write(json.dumps({"url": url, "timestamp": timestamp}, ensure_ascii=False) + "\n")
+                offset += len(tokens)
+                chunks += len(lengths)
+                sources += 1
+            logger.info(f"Tokenized {path}")
+
+    for path in outputs:
+        os.replace(path + PART_SUFFIX, path)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "dtype": tokenizer.dtype.name,
+        "vocab_size": tokenizer.vocab_size,
+        "tokenizer": os.path.abspath(tokenizer_path),
+        "max_words": max_words,
+        "overlap_words": overlap_words,
+        "chunks": chunks,
+        "tokens": offset,
+        "sources": sources,
+    }
+    with open(_meta_path(base) + PART_SUFFIX, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(_meta_path(base) + PART_SUFFIX, _meta_path(base))
+    logger.info(f"Wrote {chunks} chunks ({offset} tokens) from {sources} records to {base}.bin")
+    return chunks, offset
+
+
+class TokenBinReader:
+    """
+    Random access to the chunks of a write_token_bin output through
+    np.memmap, with no parsing: `reader[i]` is a view of chunk i's token IDs.
+
+    Args:
+        output_directory (str): Directory holding the files
+        prefix (str): Output file name prefix
+    """
+
+    def __init__(self, output_directory: str, prefix: str = TOKEN_BIN_PREFIX):
+        self.base = os.path.join(output_directory, prefix)
+        with open(_meta_path(self.base), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported token bin format: {self.meta.get('format_version')}")
+        self.dtype = np.dtype(self.meta["dtype"])
+        # np.memmap cannot map empty files
+        self.tokens = (np.memmap(self.base + ".bin", dtype=self.dtype, mode="r")
+                       if self.meta["tokens"] else np.zeros(0, dtype=self.dtype))
+        self.index = (np.memmap(self.base + ".idx", dtype=IDX_DTYPE, mode="r")
+                      if self.meta["chunks"] else np.zeros(0, dtype=IDX_DTYPE))
+        self._sources: Optional[List[Dict[str, Any]]] = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        offset, length, _ = self.index[i]
+        return self.tokens[int(offset):int(offset) + int(length)]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def source(self, i: int) -> Dict[str, Any]:
+        """
+        Url and timestamp of the record chunk `i` came from (loaded on first use).
+        """
+        if self._sources is None:
+            with open(self.base + ".sources.jsonl", "r", encoding="utf-8") as f:
+                self._sources = [json.loads(line) for line in f]
+        return self._sources[int(self.index[i]["source"])]
+
+
+def verify_token_bin(
+    output_directory: str,
+    input_directory: str,
+    tokenizer_path: str,
+    prefix: str = TOKEN_BIN_PREFIX,
+    max_mismatches: int = 10
+) -> List[str]:
+    """
+    Round-trip check of a write_token_bin output against the JSON chunk
+    output (chunk.chunk_record) of the same inputs: every non-empty JSON
+    chunk must map, in order, to a .bin chunk holding the tokenization of
+    its text, with the same source URL.
+
+    Returns:
+        List[str]: Descriptions of the first `max_mismatches` mismatches (empty if identical)
+    """
+    reader = TokenBinReader(output_directory, prefix)
+    tokenizer = WordTokenizer.from_file(tokenizer_path)
+    max_words, overlap_words = reader.meta["max_words"], reader.meta["overlap_words"]
+    problems: List[str] = []
+    i = 0
+    for path in json_input_files(input_directory):
+        for record in iter_records(path):
+            if not isinstance(record, dict):
+                continue
+            if not isinstance(record.get("content", ""), str):
+                record = {**record, "content": ""}
+            for chunk in chunk_record(record, max_words, overlap_words)["chunks"]:
+                expected = tokenizer.encode(chunk["text"])
+                if not len(expected):
+                    continue
+                if i >= len(reader):
+                    problems.append(f"{path}: chunk {i} missing from the .bin output")
+                elif not np.array_equal(reader[i], expected):
+                    problems.append(f"{path}: chunk {i} tokens differ")
+                elif reader.source(i)["url"] != chunk["metadata"]["url"]:
+                    problems.append(f"{path}: chunk {i} source differs")
+                i += 1
+                if len(problems) >= max_mismatches:
+                    return problems
+    if i != len(reader):
+        problems.append(f"The .bin output has {len(reader)} chunks, the JSON output {i}")
+    return problems
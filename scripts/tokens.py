@@ -0,0 +1,233 @@
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAX_VOCABULARY = 2_000_000  # Words before the shared vocabulary is replaced by a fresh one
+_INITIAL_CAPACITY = 1024
+
+# Sentence separators inside a whitespace-separated word, as in repetition.extract_sentences
+_SENTENCE_END_RE = re.compile(r'[.!?]+')
+_EMPTY = -1  # Piece ID of an empty piece (a separator at the start or end of a word)
+
+
+class Vocabulary:
+    """
+    Dictionary encoding of words as dense int32 IDs, with per-ID lookup
+    tables (character and UTF-8 lengths, whether the word contains a sentence
+    separator) so that stages can work on ID arrays without the strings.
+
+    IDs are only meaningful within one process; TokenizedText re-encodes
+    itself into the receiving process's shared vocabulary when pickled.
+    Adding words is thread-safe.
+    """
+
+    def __init__(self):
+        self.words: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._char_lengths = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._byte_lengths = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._has_separator = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        self._pieces: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _add(self, word: str) -> int:
+        with self._lock:
+            word_id = self.ids.get(word)
+            if word_id is not None:
+                return word_id
+            word_id = len(self.words)
+            if word_id == len(self._char_lengths):
+                grow = len(self._char_lengths)
+                self._char_lengths = np.concatenate([self._char_lengths, np.zeros(grow, dtype=np.int32)])
+                self._byte_lengths = np.concatenate([self._byte_lengths, np.zeros(grow, dtype=np.int32)])
+                self._has_separator = np.concatenate([self._has_separator, np.zeros(grow, dtype=bool)])
+            self._char_lengths[word_id] = len(word)
+            self._byte_lengths[word_id] = len(word.encode('utf-8'))
+            self._has_separator[word_id] = _SENTENCE_END_RE.search(word) is not None
+            # Publish the word only once its table entries are written
+            self.words.append(word)
+            self.ids[word] = word_id
+            return word_id
+
+    def encode(self, words: Iterable[str]) -> np.ndarray:
+        """
+        IDs of `words`, adding unseen words to the vocabulary.
+
+        Returns:
+            np.ndarray: int32 word IDs
+        """
+        get = self.ids.get
+        ids = [get(word, _EMPTY) for word in words]
+        if _EMPTY in ids:
+            words = words if isinstance(words, list) else list(words)
+            ids = [word_id if word_id != _EMPTY else self._add(word) for word, word_id in zip(words, ids)]
+        return np.array(ids, dtype=np.int32)
+
+    def decode(self, ids: np.ndarray) -> List[str]:
+        """
+        Words of `ids`.
+        """
+        words = self.words
+        return [words[i] for i in ids.tolist()]
+
+    def char_lengths(self, ids: np.ndarray) -> np.ndarray:
+        return self._char_lengths[ids]
+
+    def byte_lengths(self, ids: np.ndarray) -> np.ndarray:
+        return self._byte_lengths[ids]
+
+    def has_separator(self, ids: np.ndarray) -> np.ndarray:
+        return self._has_separator[ids]
+
+    def pieces(self, word_id: int) -> List[int]:
+        """
+        IDs of the pieces of a word split at sentence separators (_EMPTY for
+        empty pieces); cached per word.
+        """
+        pieces = self._pieces.get(word_id)
+        if pieces is None:
+            parts = _SENTENCE_END_RE.split(self.words[word_id])
+            pieces = [int(self.encode([part])[0]) if part else _EMPTY for part in parts]
+            self._pieces[word_id] = pieces
+        return pieces
+
+
+_shared: Optional[Vocabulary] = None
+_shared_lock = threading.Lock()
+
+
+def shared_vocabulary() -> Vocabulary:
+    """
+    The per-process vocabulary shared by every stage. Once it holds
+    MAX_VOCABULARY words a fresh one is started; texts encoded earlier keep
+    a reference to theirs, so memory stays bounded without invalidating them.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None or len(_shared) >= MAX_VOCABULARY:
+            _shared = Vocabulary()
+        return _shared
+
+
+class TokenizedText:
+    """
+    A document as an int32 array of word IDs, tokenized once (whitespace
+    separated words) and rebuilt into text only when needed. The text is
+    the words joined by single spaces.
+
+    Stages pass it on in a record's "content" instead of the string, so
+    repetition counting hashes integers, sentences are split from per-word
+    tables and chunking slices the array. See pipeline.as_text_record.
+
+    Args:
+        ids (np.ndarray): int32 word IDs in `vocab`
+        vocab (Vocabulary): Vocabulary of the IDs (default: shared_vocabulary())
+    """
+
+    __slots__ = ("ids", "vocab")
+
+    def __init__(self, ids: np.ndarray, vocab: Optional[Vocabulary] = None):
+        self.ids = ids
+        self.vocab = vocab or shared_vocabulary()
+
+    @classmethod
+    def from_text(cls, text: str, vocab: Optional[Vocabulary] = None) -> "TokenizedText":
+        """
+        Tokenize `text` at whitespace.
+        """
+        vocab = vocab or shared_vocabulary()
+        return cls(vocab.encode(text.split()), vocab)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __str__(self) -> str:
+        return self.text()
+
+    def __repr__(self) -> str:
+        return f"TokenizedText({len(self.ids)} words)"
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Ship the document's own words, not IDs of this process's vocabulary
+        unique, local_ids = np.unique(self.ids, return_inverse=True)
+        return _from_local, (self.vocab.decode(unique), local_ids.astype(np.int32))
+
+    def text(self, start: int = 0, end: Optional[int] = None) -> str:
+        """
+        Text of the words in [start, end).
+        """
+        return ' '.join(self.vocab.decode(self.ids[start:end]))
+
+    def utf8_size(self) -> int:
+        """
+        UTF-8 size of the text, without building it.
+        """
+        return int(self.vocab.byte_lengths(self.ids).sum()) + max(len(self.ids) - 1, 0)
+
+    def word_offsets(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Character offsets of every word in the text, without building it.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: start and end offset of each word
+        """
+        lengths = self.vocab.char_lengths(self.ids).astype(np.int64)
+        ends = np.cumsum(lengths + 1) - 1
+        return ends - lengths, ends
+
+    def select(self, keep: np.ndarray) -> "TokenizedText":
+        """
+        The words selected by a boolean mask or an index array.
+        """
+        return TokenizedText(self.ids[keep], self.vocab)
+
+    def sentences(self) -> List[np.ndarray]:
+        """
+        Word IDs of each sentence: the text split at runs of ".", "!" and
+        "?", which may fall inside a word, with empty sentences dropped
+        (as repetition.extract_sentences splits the text).
+        """
+        ids = self.ids
+        separators = np.flatnonzero(self.vocab.has_separator(ids))
+        if not len(separators):
+            return [ids] if len(ids) else []
+        sentences: List[np.ndarray] = []
+        current: List[Any] = []
+
+        def close() -> None:
+            if current:
+                sentences.append(np.concatenate(current).astype(np.int32))
+
+        previous = 0
+        for position in separators.tolist():
+            if position > previous:
+                current.append(ids[previous:position])
+            first, *rest = self.vocab.pieces(int(ids[position]))
+            if first != _EMPTY:
+                current.append([first])
+            for piece in rest:
+                close()
+                current = [[piece]] if piece != _EMPTY else []
+            previous = position + 1
+        if previous < len(ids):
+            current.append(ids[previous:])
+        close()
+        return sentences
+
+    @classmethod
+    def concatenate(cls, parts: Sequence[np.ndarray], vocab: Vocabulary) -> "TokenizedText":
+        """
+        The words of `parts` (ID arrays in `vocab`) in order.
+        """
+        ids = np.concatenate(parts).astype(np.int32) if len(parts) else np.zeros(0, dtype=np.int32)
+        return cls(ids, vocab)
+
+
+def _from_local(words: List[str], local_ids: np.ndarray) -> TokenizedText:
+    vocab = shared_vocabulary()
+    return TokenizedText(vocab.encode(words)[local_ids], vocab)
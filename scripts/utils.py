@@ -1,23 +1,55 @@
+import os
 import re
+import queue
+import atexit
 import logging
-import stopwordsiso
+import logging.handlers
 from collections import Counter
-from typing import List
+from typing import List, Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
 
 def setup_logging(log_file: str = 'text_processing.log') -> logging.Logger:
     """
     Configure and set up logging for the text processing module.
+
+    Records go through a QueueHandler to a background QueueListener that
+    writes the log file and console, so logging never blocks processing.
+    Does nothing if the root logger is already configured. The log file is
+    created when the first record is written.
     """
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s: %(message)s',
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+    global _listener
+    root = logging.getLogger()
+    if not root.handlers:
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s: %(message)s')
+        handlers = [logging.FileHandler(log_file, encoding='utf-8', delay=True), logging.StreamHandler()]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        root.setLevel(logging.INFO)
     return logging.getLogger(__name__)
 
+def _log_directly_after_fork() -> None:
+    """
+    A forked worker has no listener thread, so it writes to the handlers directly.
+    """
+    global _listener
+    if _listener is not None:
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                root.removeHandler(handler)
+        for handler in _listener.handlers:
+            root.addHandler(handler)
+        _listener = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_log_directly_after_fork)
+
 # def is_malayalam(text: str) -> bool:
 #     """
 #     Check if text contains Malayalam characters.
@@ -94,6 +126,8 @@ def remove_stopwords(text: str, language: str = "ml") -> str:
     Remove stopwords from the given text.
     """
     try:
+        import stopwordsiso  # Slow to import; loaded on first use
+
         stop_words = set(stopwordsiso.stopwords(language))
         words = text.split()
         filtered_words = [word for word in words if word not in stop_words]
@@ -1,47 +1,230 @@
+"""
+Back-translate processed_output.jsonl (Malayalam -> English -> Malayalam) for data augmentation.
+
+Usage (from the repository root):
+    python -m test_folder.b_t [--input ...] [--output ...] [--quantize] [--service ADDRESS]
+"""
 import json
 import re
 import os
-from transformers import MarianMTModel, MarianTokenizer
+import time
+import pickle
+import argparse
+from functools import lru_cache
+from typing import Iterator, List, Optional
+
+import torch
+import transformers
+from transformers import GenerationConfig, MarianConfig, MarianMTModel, MarianTokenizer
 from tqdm import tqdm
 
+from scripts.inference_cache import DEFAULT_MAX_BYTES, InferenceCache
+from scripts.inference_service import InferenceClient
+
+QUANTIZED_DIR = "quantized-int8"  # Created inside each model directory
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_WINDOW = 512  # Records read ahead and length-bucketed together
+MAX_LENGTH = 512
+
+def _model_stamp(model_path):
+    """Sizes and mtimes of the model files, used to invalidate a converted copy."""
+    stamp = {"torch": torch.__version__, "transformers": transformers.__version__}
+    for name in sorted(os.listdir(model_path)):
+        path = os.path.join(model_path, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            stamp[name] = [stat.st_size, stat.st_mtime_ns]
+    return stamp
+
+def _quantize(model):
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _skeleton(model_path):
+    """An untrained MarianMT model with the architecture and generation settings of `model_path`."""
+    model = MarianMTModel(MarianConfig.from_pretrained(model_path))
+    try:
+        model.generation_config = GenerationConfig.from_pretrained(model_path)
+    except OSError:
+        pass  # No generation_config.json: keep the settings derived from the config
+    return model
+
+def load_quantized_model(model_path):
+    """
+    Load a dynamic-int8-quantized copy of a MarianMT model for CPU inference.
+
+    Linear layers are converted with torch dynamic quantization and the
+    quantized state_dict is cached in `<model_path>/quantized-int8/`. Only
+    tensors are cached (loaded with weights_only=True): on a cache hit the
+    module is an untrained model built from the config, quantized and
+    filled with the cached tensors, so neither the full-precision weights
+    nor pickled transformers classes are loaded. The cache is rebuilt if
+    the model files or the torch or transformers version change, or if it
+    cannot be loaded.
+    """
+    cache_dir = os.path.join(model_path, QUANTIZED_DIR)
+    model_file = os.path.join(cache_dir, "state_dict.pt")
+    stamp_file = os.path.join(cache_dir, "source.json")
+    stamp = _model_stamp(model_path)
+    try:
+        with open(stamp_file, "r", encoding="utf-8") as f:
+            cached = json.load(f) == stamp
+        if cached:
+            quantized = _quantize(_skeleton(model_path))
+            quantized.load_state_dict(torch.load(model_file, weights_only=True))
+            return quantized
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, RuntimeError, pickle.UnpicklingError) as e:
+        print(f"Ignoring unusable quantized cache in {cache_dir}: {e}")
+
+    quantized = _quantize(MarianMTModel.from_pretrained(model_path))
+    print(f"Caching int8-quantized {model_path} in {cache_dir}")
+    os.makedirs(cache_dir, exist_ok=True)
+    torch.save(quantized.state_dict(), model_file + ".part")
+    os.replace(model_file + ".part", model_file)
+    with open(stamp_file, "w", encoding="utf-8") as f:
+        json.dump(stamp, f)
+    return quantized
+
 # Define translation functions
-def load_model_and_tokenizer(model_path):
+def load_model_and_tokenizer(model_path, quantize=False):
     try:
         tokenizer = MarianTokenizer.from_pretrained(model_path)
-        model = MarianMTModel.from_pretrained(model_path)
+        if quantize:
+            model = load_quantized_model(model_path)
+        else:
+            model = MarianMTModel.from_pretrained(model_path)
+        model.eval()
         return tokenizer, model
     except Exception as e:
         print(f"Error loading model/tokenizer from {model_path}: {e}")
         return None, None
 
 def translate_text(text, tokenizer, model):
+    translated = translate_batch([text], tokenizer, model)
+    return translated[0] if translated else None
+
+def translate_batch(texts: List[str], tokenizer, model) -> Optional[List[str]]:
+    """
+    Translate a batch of texts with one padded `generate` call.
+
+    Returns:
+        Optional[List[str]]: Translations in input order, or None on error
+    """
     try:
-        inputs = tokenizer([text], return_tensors="pt", max_length=512, truncation=True)
-        translated_tokens = model.generate(**inputs)
-        return tokenizer.batch_decode(translated_tokens, skip_special_tokens=True)[0]
+        inputs = tokenizer(texts, return_tensors="pt", padding=True, max_length=MAX_LENGTH, truncation=True)
+        with torch.inference_mode():
+            translated_tokens = model.generate(**inputs)
+        return tokenizer.batch_decode(translated_tokens, skip_special_tokens=True)
     except Exception as e:
         print(f"Translation error: {e}")
         return None
 
-def back_translate(content, ml_en_path, en_ml_path):
-    try:
-        ml_en_tokenizer, ml_en_model = load_model_and_tokenizer(ml_en_path)
-        en_ml_tokenizer, en_ml_model = load_model_and_tokenizer(en_ml_path)
 
-        if ml_en_tokenizer is None or ml_en_model is None or en_ml_tokenizer is None or en_ml_model is None:
-            return None
+class BackTranslator:
+    """
+    Malayalam -> English -> Malayalam back-translation with both MarianMT
+    models loaded once.
+
+    Texts are sorted by length and translated in batches of similar length,
+    so padding (and wasted decoder work) stays small.
+
+    Args:
+        ml_en_path (str): Malayalam -> English model directory
+        en_ml_path (str): English -> Malayalam model directory
+        batch_size (int): Sentences per `generate` call
+        num_threads (int): Torch intra-op threads (None = torch default)
+        cache (InferenceCache): Optional cache of earlier back-translations
+        quantize (bool): Run dynamic-int8-quantized models (CPU only)
+    """
+
+    def __init__(self, ml_en_path: str, en_ml_path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 num_threads: Optional[int] = None, cache: Optional[InferenceCache] = None,
+                 quantize: bool = False):
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.batch_size = batch_size
+        self.cache = cache
+        self.model_id = f"{os.path.abspath(ml_en_path)}|{os.path.abspath(en_ml_path)}"
+        self.params = {"max_length": MAX_LENGTH, "quantized": quantize}
+        self.ml_en_tokenizer, self.ml_en_model = load_model_and_tokenizer(ml_en_path, quantize)
+        self.en_ml_tokenizer, self.en_ml_model = load_model_and_tokenizer(en_ml_path, quantize)
+        if self.ml_en_model is None or self.en_ml_model is None:
+            raise RuntimeError("Could not load back-translation models")
+
+    def length_buckets(self, texts: List[str]) -> Iterator[List[int]]:
+        """
+        Yield index batches of `texts`, grouped by similar length.
+        """
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), self.batch_size):
+            yield order[start:start + self.batch_size]
+
+    def back_translate_many(self, texts: List[str]) -> List[Optional[str]]:
+        """
+        Back-translate texts in length-bucketed batches. With a cache, only
+        inputs not seen before reach the models.
+
+        Returns:
+            List[Optional[str]]: Results in input order (None where a batch failed)
+        """
+        if self.cache is not None:
+            return self.cache.cached(self.model_id, self.params, texts, self._translate_many)
+        return self._translate_many(texts)
+
+    def _translate_many(self, texts: List[str]) -> List[Optional[str]]:
+        results: List[Optional[str]] = [None] * len(texts)
+        for bucket in self.length_buckets(texts):
+            batch = [texts[i] for i in bucket]
+            intermediate = translate_batch(batch, self.ml_en_tokenizer, self.ml_en_model)
+            if intermediate is None:
+                continue
+            back_translated = translate_batch(intermediate, self.en_ml_tokenizer, self.en_ml_model)
+            if back_translated is None:
+                continue
+            for i, text in zip(bucket, back_translated):
+                results[i] = text
+        return results
+
+
+class RemoteBackTranslator:
+    """
+    Same interface as BackTranslator, but the models live in a shared
+    inference service (`python -m scripts.inference_service serve --ml-en ... --en-ml ...`)
+    that batches requests from all workers.
 
-        intermediate = translate_text(content, ml_en_tokenizer, ml_en_model)
-        if intermediate is None:
-            return None
-        print("Intermediate (English):", intermediate)
+    Args:
+        client (InferenceClient): Client connected to the service
+        ml_en_path (str): Model path the service was started with (cache key)
+        en_ml_path (str): Model path the service was started with (cache key)
+        cache (InferenceCache): Optional cache of earlier back-translations
+        quantize (bool): Whether the service runs the quantized models (cache key)
+    """
 
-        back_translated = translate_text(intermediate, en_ml_tokenizer, en_ml_model)
-        if back_translated is None:
-            return None
-        print("Back-translated content (Malayalam):", back_translated)
+    def __init__(self, client: InferenceClient, ml_en_path: str, en_ml_path: str,
+                 cache: Optional[InferenceCache] = None, quantize: bool = False):
+        self.client = client
+        self.cache = cache
+        self.model_id = f"{os.path.abspath(ml_en_path)}|{os.path.abspath(en_ml_path)}"
+        self.params = {"max_length": MAX_LENGTH, "quantized": quantize}
 
-        return back_translated
+    def back_translate_many(self, texts: List[str]) -> List[Optional[str]]:
+        if self.cache is not None:
+            return self.cache.cached(self.model_id, self.params, texts, self._translate_many)
+        return self._translate_many(texts)
+
+    def _translate_many(self, texts: List[str]) -> List[Optional[str]]:
+        return self.client.call("back-translate", texts)
+
+
+@lru_cache(maxsize=None)
+def get_back_translator(ml_en_path, en_ml_path):
+    return BackTranslator(ml_en_path, en_ml_path)
+
+def back_translate(content, ml_en_path, en_ml_path):
+    try:
+        return get_back_translator(ml_en_path, en_ml_path).back_translate_many([content])[0]
     except Exception as e:
         print("Back-translation error:", e)
         return None
@@ -61,46 +244,122 @@ def augment_text(content, ml_en_path, en_ml_path):
         return ""
     return back_translate(preprocessed, ml_en_path, en_ml_path)
 
-# File paths
-input_file = r"C:\Users\Administrator\Documents\GitHub\Text_cleaning\data\output_data\root2\processed_output.jsonl"
-output_file = r"C:\Users\Administrator\Documents\GitHub\Text_cleaning\data\output_data\root2\augmented_malayalam_data.json"  
-ml_en_path = r"C:\Users\Administrator\Documents\GitHub\ml-models\malayalam_back-translation\ml-en"
-en_ml_path = r"C:\Users\Administrator\Documents\GitHub\ml-models\malayalam_back-translation\en-ml"
 
-# Create output directory
-os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-augmented_data = []  # List to store augmented data
-
-try:
+def _read_texts(input_file: str) -> Iterator[str]:
     with open(input_file, "r", encoding="utf-8") as infile:
-        for line in tqdm(infile, desc="Processing lines"):  # Iterate through lines
+        for line in infile:
             try:
                 item = json.loads(line)  # Load each line as JSON
-                if "text" in item:
-                    original_text = item["text"]
-                    preprocessed_text = preprocess_content(original_text)
-                    if preprocessed_text:
-                        augmented_text = augment_text(preprocessed_text, ml_en_path, en_ml_path)
-                        augmented_data.append({"original": original_text, "augmented": augmented_text if augmented_text else original_text})
-                    else:
-                        augmented_data.append({"original": original_text, "augmented": original_text})
-                else:
-                    print("Warning: 'text' key not found in a line. Skipping.")
             except json.JSONDecodeError as e:
                 print(f"JSONDecodeError in line: {line.strip()}: {e}") #print the problematic line
                 continue  # Skip to the next line if there's a JSON error
+            if "text" in item:
+                yield item["text"]
+            else:
+                print("Warning: 'text' key not found in a line. Skipping.")
+
+
+def augment_file(
+    input_file: str,
+    output_file: str,
+    translator,
+    window: int = DEFAULT_WINDOW
+) -> int:
+    """
+    Stream `input_file` (JSONL with a "text" field) through back-translation
+    and append {"original", "augmented"} records to `output_file` (JSONL)
+    as each window of records finishes. Records keep their input order.
+    `translator` is a BackTranslator or RemoteBackTranslator.
+
+    Returns:
+        int: Records written
+    """
+    written = 0
+    translated = 0
+    start = time.perf_counter()
+    with open(output_file, "w", encoding="utf-8") as outfile, tqdm(desc="Processing lines") as progress:
+        texts: List[str] = []
+
+        def flush():
+            nonlocal written, translated
+            preprocessed = [preprocess_content(text) for text in texts]
+            pending = [i for i, text in enumerate(preprocessed) if text]
+            augmented = translator.back_translate_many([preprocessed[i] for i in pending])
+            results = dict(zip(pending, augmented))
+            for i, original_text in enumerate(texts):
+                augmented_text = results.get(i)
+                record = {"original": original_text, "augmented": augmented_text if augmented_text else original_text}
+                outfile.write(json.dumps(record, ensure_ascii=False) + "\n")
+            outfile.flush()
+            written += len(texts)
+            translated += len(pending)
+            progress.update(len(texts))
+            elapsed = time.perf_counter() - start
+            progress.set_postfix(sent_per_s=f"{translated / elapsed:.2f}" if elapsed else "-")
+            texts.clear()
+
+        for text in _read_texts(input_file):
+            texts.append(text)
+            if len(texts) >= window:
+                flush()
+        if texts:
+            flush()
+
+    elapsed = time.perf_counter() - start
+    rate = translated / elapsed if elapsed else 0.0
+    print(f"Back-translated {translated} sentences ({written} records) in {elapsed:.1f}s: {rate:.2f} sentences/sec")
+    if translator.cache is not None:
+        print(translator.cache.summary())
+    return written
+
+
+# File paths
+INPUT_FILE = r"C:\Users\Administrator\Documents\GitHub\Text_cleaning\data\output_data\root2\processed_output.jsonl"
+OUTPUT_FILE = r"C:\Users\Administrator\Documents\GitHub\Text_cleaning\data\output_data\root2\augmented_malayalam_data.jsonl"
+ML_EN_PATH = r"C:\Users\Administrator\Documents\GitHub\ml-models\malayalam_back-translation\ml-en"
+EN_ML_PATH = r"C:\Users\Administrator\Documents\GitHub\ml-models\malayalam_back-translation\en-ml"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back-translate processed_output.jsonl for data augmentation")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--ml-en", default=ML_EN_PATH)
+    parser.add_argument("--en-ml", default=EN_ML_PATH)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=None, help="Torch intra-op threads")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="Records bucketed together")
+    parser.add_argument("--cache", default=None, help="SQLite inference cache (disabled if omitted)")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024))
+    parser.add_argument("--quantize", action="store_true",
+                        help="Use dynamic-int8-quantized models (converted once, cached next to the models)")
+    parser.add_argument("--service", default=None, metavar="ADDRESS",
+                        help="Use a running inference service instead of loading the models here")
+    args = parser.parse_args()
+    cache = InferenceCache(args.cache, max_bytes=args.cache_mb * 1024 * 1024) if args.cache else None
+
+    # Create output directory
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    try:
+        if args.service:
+            translator = RemoteBackTranslator(InferenceClient(args.service), args.ml_en, args.en_ml,
+                                              cache=cache, quantize=args.quantize)
+        else:
+            translator = BackTranslator(args.ml_en, args.en_ml, batch_size=args.batch_size,
+                                        num_threads=args.threads, cache=cache, quantize=args.quantize)
+        written = augment_file(args.input, args.output, translator, window=args.window)
+        if written:
+            print("Data augmentation complete. Augmented file saved to:", args.output)
+        else:
+            print("No data was augmented. Check your input data.")
+    except FileNotFoundError:
+        print(f"Error: Input file not found: {args.input}")
+    except PermissionError:
+        print(f"Error: Permission denied to write to output file: {args.output}")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
 
-    if augmented_data:
-        with open(output_file, "w", encoding="utf-8") as outfile:
-            json.dump(augmented_data, outfile, ensure_ascii=False, indent=4)
-        print("Data augmentation complete. Augmented file saved to:", output_file)
-    else:
-        print("No data was augmented. Check your input data.")
-
-except FileNotFoundError:
-    print(f"Error: Input file not found: {input_file}")
-except PermissionError:
-    print(f"Error: Permission denied to write to output file: {output_file}")
-except Exception as e:
-    print(f"An unexpected error occurred: {e}")
+if __name__ == "__main__":
+    main()
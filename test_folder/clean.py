@@ -1,83 +1,118 @@
 import json
 import re
+import argparse
 import pandas as pd
-import os
 import glob
 from pathlib import Path
 
-def clean_data(input_pattern, output_dir):
-    """Cleans Malayalam text data from JSON files and saves to CSV."""
+# Compiled once and applied column-wise with Series.str.replace
+TAG_RE = re.compile(r"<.*?>")
+NON_MALAYALAM_RE = re.compile(r"[^\u0D00-\u0D7F\s]")
+WHITESPACE_RE = re.compile(r"\s+")
+DOMAIN_RE = r"^[A-Za-z][A-Za-z0-9+.-]*://(?:[^@/?#]*@)?([^/?#:]+)"
+UNKNOWN_DOMAIN = "unknown"
+FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+
+def load_frame(json_files):
+    """Loads all JSON files into one DataFrame (records keep file order)."""
+    frames = []
+    for input_file in json_files:
+        try:
+            with open(input_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            print(f"Warning: JSONDecodeError in {input_file}: {e}")
+            continue
+        except OSError as e:
+            print(f"Error processing {input_file}: {e}")
+            continue
+        if not isinstance(data, list):  # Check if data is a list
+            data = [data]  # Wrap single object in a list
+        if not data:
+            print(f"Warning: No data in {input_file}")
+            continue
+        df = pd.DataFrame(data)
+        if "content" not in df.columns:
+            print(f"Warning: 'content' column missing in {input_file}")
+            continue
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["content"])
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+def clean_content(content):
+    """Vectorized equivalent of the per-row clean_text: strips tags and
+    non-Malayalam characters and collapses whitespace. Non-strings become ""."""
+    # Blank non-strings first: .str fails on a column holding no strings at all
+    content = content.where(content.map(lambda value: isinstance(value, str)), "").astype(object)
+    return (
+        content.str.replace(TAG_RE, "", regex=True)
+        .str.replace(NON_MALAYALAM_RE, "", regex=True)
+        .str.replace(WHITESPACE_RE, " ", regex=True)
+        .str.strip()
+    )
+
+def url_domains(urls):
+    """Lower-cased host of each URL ("unknown" if missing or unparsable)."""
+    return urls.str.extract(DOMAIN_RE, expand=False).str.lower().fillna(UNKNOWN_DOMAIN)
+
+def clean_data(input_pattern, output_dir, output_format="parquet"):
+    """Cleans Malayalam text data from JSON files and saves one dataset
+    partitioned by domain (`<output_dir>/domain=<host>/part-0.parquet`).
+
+    All matched files are cleaned as a single frame and deduplicated
+    globally, keeping the first occurrence of each cleaned content.
+    """
     try:
-        print(f"Input pattern: {input_pattern}")  # Debug: Print the input pattern
-        json_files = glob.glob(input_pattern)
-        print(f"Found files: {json_files}")  # Debug: Print the found files
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        print(f"Input pattern: {input_pattern}")
+        json_files = sorted(glob.glob(input_pattern))
+        print(f"Found {len(json_files)} files")
         if not json_files:
             raise FileNotFoundError(f"No JSON files found matching pattern: {input_pattern}")
 
-        Path(output_dir).mkdir(parents=True, exist_ok=True)
-
-        for input_file in json_files:
-            print(f"Processing file: {input_file}")
-            try:
-                with open(input_file, "r", encoding="utf-8") as f:
-                    try:
-                        data = json.load(f)
-                        if not isinstance(data, list):  # Check if data is a list 
-                            data = [data]  # Wrap single object in a list
-                        print(f"Data loaded: {data}")
-                    except json.JSONDecodeError as e:
-                        print(f"Warning: JSONDecodeError in {input_file}: {e}")
-                        continue
-
-                if not data:
-                    print(f"Warning: No data in {input_file}")
-                    continue
-
-                df = pd.DataFrame(data)
-                if df.empty:
-                    print(f"Warning: Empty DataFrame after creation from {input_file}")
-                    continue
-
-                print(f"DataFrame columns: {df.columns}")
-                if "content" not in df.columns:
-                    print(f"Warning: 'content' column missing in {input_file}")
-                    continue
+        df = load_frame(json_files)
+        df = df.dropna(subset=["content"])
+        total = len(df)
 
-                df.dropna(subset=["content"], inplace=True)
-                print(f"DataFrame length after dropna: {len(df)}")
+        df["content"] = clean_content(df["content"].astype(object))
+        df = df.drop_duplicates(subset=["content"])
+        print(f"Rows: {total} loaded, {len(df)} after global drop_duplicates")
+        if len(df) == 0:
+            print("Warning: Empty DataFrame after cleaning")
+            return None
 
-                def clean_text(text):
-                    if not isinstance(text, str):
-                        return ""
-                    text = re.sub(r"<.*?>", "", text)
-                    text = re.sub(r"[^\u0D00-\u0D7F\s]", "", text)
-                    text = re.sub(r"\s+", " ", text).strip()
-                    return text
+        urls = df["url"] if "url" in df.columns else pd.Series(pd.NA, index=df.index, dtype=object)
+        df["domain"] = url_domains(urls.astype(object))
 
-                df["content"] = df["content"].apply(clean_text)
-                df.drop_duplicates(subset=["content"], inplace=True)
-                print(f"DataFrame length after drop_duplicates: {len(df)}")
-
-                if len(df) == 0:
-                    print(f"Warning: Empty DataFrame after cleaning in {input_file}")
-                    continue
-
-                base_name = Path(input_file).stem
-                output_file = Path(output_dir) / f"{base_name}_cleaned.csv"
-                df.to_csv(output_file, index=False, encoding="utf-8")
-                print(f"Data from {input_file} saved to: {output_file}")
-
-            except Exception as e:
-                print(f"Error processing {input_file}: {e}")
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        extension = "arrow" if output_format == "arrow" else "parquet"
+        ds.write_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            output_dir,
+            format=FORMATS[output_format],
+            partitioning=["domain"],
+            partitioning_flavor="hive",
+            basename_template=f"part-{{i}}.{extension}",
+            existing_data_behavior="delete_matching",
+        )
+        print(f"{len(df)} rows in {df['domain'].nunique()} domains saved to: {output_dir}")
+        return df
 
     except FileNotFoundError as e:
         print(f"FileNotFoundError: {e}")
     except Exception as e:
         print(f"Overall Error: {e}")
 
-# Example Usage (Relative Paths - Recommended):
-input_pattern = "C:\\Users\\Administrator\\Documents\\GitHub\\Text cleaning\\data\\sample input\\*.json"  # Matches all .json files in the 'data' directory
-output_directory = "C:\\Users\Administrator\\Documents\GitHub\\Text cleaning\\test_folder\\test_output"
-clean_data(input_pattern, output_directory)
-
+def main():
+    parser = argparse.ArgumentParser(description="Clean crawled JSON into a domain-partitioned dataset")
+    parser.add_argument("--input", default="C:\\Users\\Administrator\\Documents\\GitHub\\Text cleaning\\data\\sample input\\*.json")
+    parser.add_argument("--output", default="C:\\Users\\Administrator\\Documents\\GitHub\\Text cleaning\\test_folder\\test_output")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    args = parser.parse_args()
+    clean_data(args.input, args.output, args.format)
 
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
-from transformers import pipeline
+"""
+Correct Malayalam text: add missing full stops, split run-together words
+and fill masked words with a fill-mask model, saving the result as CSV.
+
+Usage (from the repository root):
+    python -m test_folder.missing
+"""
 import pandas as pd
 import re
 from indicnlp.tokenize import indic_tokenize
@@ -6,6 +12,12 @@ import logging
 # from spellchecker import SpellChecker
 import os
 
+from scripts.inference_cache import InferenceCache
+from scripts.inference_service import ADDRESS_ENV, InferenceClient, fill_mask_loader
+
+FILL_MASK_MODEL = "ai4bharat/IndicBART"
+FILL_MASK_PARAMS = {"task": "fill-mask", "prediction": 0}
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -15,11 +27,24 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # except Exception as e:
 #     raise RuntimeError(f"Failed to initialize spellchecker: {e}")
 
-# Initialize the fill-mask pipeline
-try:
-    fill_mask = pipeline("fill-mask", model="ai4bharat/IndicBART")
-except Exception as e:
-    raise RuntimeError(f"Failed to initialize fill-mask pipeline: {e}")
+# The fill-mask model is loaded on first use. If $INFERENCE_SERVICE points at a
+# running `python -m scripts.inference_service serve --fill-mask ...`, requests
+# go to that shared process instead of loading a copy here.
+_fill_mask_batch = None
+
+def get_fill_mask():
+    """Returns a batch function: list of masked texts -> list of filled sequences."""
+    global _fill_mask_batch
+    if _fill_mask_batch is None:
+        if os.environ.get(ADDRESS_ENV):
+            client = InferenceClient()
+            _fill_mask_batch = lambda texts: client.call("fill-mask", texts)
+        else:
+            try:
+                _fill_mask_batch = fill_mask_loader(FILL_MASK_MODEL)()
+            except Exception as e:
+                raise RuntimeError(f"Failed to initialize fill-mask pipeline: {e}")
+    return _fill_mask_batch
 
 def correct_sentence(sentence):
     """Corrects spelling errors in a Malayalam sentence."""
@@ -45,13 +70,15 @@ def correct_sentence(sentence):
         logging.error(f"Error during spell correction: {e}")
         raise RuntimeError("Error during spell correction.") from e
 
-def fill_missing_word(text):
-    """Fills the missing word indicated by the <mask> token in the text."""
+def fill_missing_word(text, cache=None):
+    """Fills the missing word indicated by the <mask> token in the text.
+    With an InferenceCache, repeated inputs are answered from the cache."""
     if "<mask>" not in text:
         raise ValueError("The input text must contain the <mask> token for the model to fill in.")
     try:
-        predictions = fill_mask(text)
-        return predictions[0]["sequence"]
+        if cache is not None:
+            return cache.cached(FILL_MASK_MODEL, FILL_MASK_PARAMS, [text], get_fill_mask())[0]
+        return get_fill_mask()([text])[0]
     except Exception as e:
         logging.error(f"Error during mask filling: {e}")
         raise RuntimeError("Error during mask filling.") from e
@@ -90,7 +117,7 @@ def insert_mask(text):
     else:
         return f"<mask> {text}"
 
-def clean_and_correct_text(text, language='ml'):
+def clean_and_correct_text(text, language='ml', cache=None):
     """
     Combines all preprocessing steps for Malayalam text
     """
@@ -111,7 +138,7 @@ def clean_and_correct_text(text, language='ml'):
             logging.info(f"After Inserting Mask: {text}")
         
         # Step 4: Fill missing words
-        text = fill_missing_word(text)
+        text = fill_missing_word(text, cache=cache)
         logging.info(f"After Filling Missing Words: {text}")
         
         # Step 5: Add missing punctuation
@@ -139,11 +166,13 @@ if __name__ == "__main__":
         "കേരളം ഒരു മനോഹരമായ സ്ഥാലമണു.",
         "രാജ്ഭവനില് വിദ്യാരംഭം തീയതി നീട്ടി കേരള രാജ്ഭവനില് വിദ്യാരംഭം."
     ]
+    cache = InferenceCache("inference_cache.sqlite")
     
     for text in test_texts:
         try:
-            corrected_text = clean_and_correct_text(text, language='ml')
+            corrected_text = clean_and_correct_text(text, language='ml', cache=cache)
             logging.info(f"Corrected Text: {corrected_text}")
             save_to_csv(corrected_text)
         except Exception as e:
-            logging.error(f"An error occurred: {e}")
\ No newline at end of file
+            logging.error(f"An error occurred: {e}")
+    logging.info(cache.summary())
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from scripts.clean_text import process_directory
+
+WORDS = ["മഴ", "കടൽ", "പുഴ", "മല", "കാട്", "വീട്"]
+
+
+def write_jsonl(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def cleaned_urls(output_dir):
+    with open(output_dir / "a_cleaned.jsonl", encoding='utf-8') as f:
+        return [json.loads(line)["url"] for line in f]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rerun_after_edit_keeps_other_records(tmp_path, workers):
+    input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+    input_dir.mkdir()
+    records = [{"url": f"u{i}", "content": f"{word} വലുതാണ്. {word} മനോഹരമാണ്."} for i, word in enumerate(WORDS)]
+    write_jsonl(input_dir / "a.jsonl", records)
+
+    def run():
+        process_directory(str(input_dir), str(output_dir), workers=workers, split_bytes=1,
+                          dedup_index_path=str(output_dir / "index.sqlite"))
+        return cleaned_urls(output_dir)
+
+    assert run() == [record["url"] for record in records]
+    # Lengthening the first record moves every later record to a new line offset
+    records[0]["content"] = "പൂവ് ചുവന്നതാണ്. " + records[0]["content"]
+    write_jsonl(input_dir / "a.jsonl", records)
+    assert run() == [record["url"] for record in records]
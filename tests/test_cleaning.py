@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+from scripts.cleaning import EQUIVALENCE_STAGES, EQUIVALENCE_TEXTS, CleaningPipeline
+from scripts.jsonio import iter_records
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test_folder", "samplekaggle.jsonl")
+
+
+@pytest.fixture(scope="module")
+def texts():
+    records = [record for record in iter_records(SAMPLE) if isinstance(record, dict)]
+    return [record.get("content", record.get("text", "")) for record in records] + EQUIVALENCE_TEXTS
+
+
+@pytest.mark.parametrize("stages", EQUIVALENCE_STAGES, ids="+".join)
+def test_pipeline_matches_reference(texts, stages):
+    assert CleaningPipeline(stages).check_equivalence(texts) == []
@@ -0,0 +1,6 @@
+from benchmarks.import_time import DEFAULT_BUDGET_MS, budget_failures, median_import_ms
+
+
+def test_main_import_within_budget():
+    total_ms, times = median_import_ms("main", runs=3)
+    assert budget_failures(total_ms, times, DEFAULT_BUDGET_MS) == []